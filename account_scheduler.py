@@ -0,0 +1,238 @@
+"""
+Service account scheduler
+- Keeps a per-worker view of each ServiceAccount's health: requests in flight,
+  consecutive failures, captcha blocks, expired cookies and the last known
+  Chegg balance
+- acquire() hands out the least-loaded healthy account of a pool instead of
+  always the first/random one; release() records how the request went
+- The posting quota (questions_posted < ACCOUNT_QUESTION_LIMIT) is reserved
+  with a conditional UPDATE, so concurrent posts can't overshoot it
+- refresh_balances() (scheduler job) pulls used/limit from chegg_api.get_account_balance
+  and clears cookie-expired marks for accounts that work again
+
+Pools:
+  'unblur' - accounts owned by a super admin (solution fetching)
+  'post'   - every account still under the question limit (Homework Helper)
+"""
+
+import os
+import time
+import threading
+import concurrent.futures
+from models import db, User, ServiceAccount
+import chegg_api
+
+# Auto-rotation: an account is retired from posting after this many questions
+ACCOUNT_QUESTION_LIMIT = int(os.getenv('ACCOUNT_QUESTION_LIMIT', '20'))
+
+# After this many failures in a row an account sits out FAILURE_COOLDOWN seconds
+FAILURE_THRESHOLD = 3
+FAILURE_COOLDOWN = 120
+
+CAPTCHA_COOLDOWN = int(os.getenv('ACCOUNT_CAPTCHA_COOLDOWN', '900'))
+
+BALANCE_WORKERS = 5
+
+# Error kinds for release(); any other error counts as a plain failure
+COOKIE_EXPIRED = 'cookie_expired'  # Chegg answered 401
+BLOCKED = 'blocked'                # Chegg answered 403 (captcha)
+
+POOLS = ('unblur', 'post')
+
+
+class AccountHealth:
+    __slots__ = ('in_flight', 'failures', 'cooldown_until', 'cookie_expired', 'cookie_hash',
+                 'remaining', 'balance_checked_at', 'last_used', 'last_error')
+
+    def __init__(self):
+        self.in_flight = 0
+        self.failures = 0
+        self.cooldown_until = 0
+        self.cookie_expired = False
+        self.cookie_hash = None
+        self.remaining = None  # Chegg balance, None until refresh_balances() has seen the account
+        self.balance_checked_at = None
+        self.last_used = 0
+        self.last_error = None
+
+    def available(self, now):
+        return not self.cookie_expired and now >= self.cooldown_until
+
+
+_health = {}
+_lock = threading.Lock()
+
+
+def _get_health(account):
+    """Health entry for an account (caller holds _lock). A new cookie clears the expired mark."""
+    health = _health.get(account.id)
+    if health is None:
+        health = _health[account.id] = AccountHealth()
+    cookie_hash = hash(account.cookie_data)
+    if health.cookie_hash != cookie_hash:
+        health.cookie_hash = cookie_hash
+        health.cookie_expired = False
+    return health
+
+
+def _candidates(pool):
+    if pool == 'unblur':
+        return ServiceAccount.query.join(User, ServiceAccount.owner_id == User.id)\
+                                   .filter(User.role == 'super_admin').all()
+    return ServiceAccount.query.filter(ServiceAccount.questions_posted < ACCOUNT_QUESTION_LIMIT)\
+                               .order_by(ServiceAccount.id.asc()).all()
+
+
+def _rank(accounts, pool, now, posting):
+    """Accounts in the order they should be tried: healthy and least loaded first"""
+    ranked = []
+    for account in accounts:
+        health = _get_health(account)
+        if health.cookie_expired:
+            continue
+        if posting and health.remaining == 0:
+            continue
+        quota_left = ACCOUNT_QUESTION_LIMIT - (account.questions_posted or 0) if pool == 'post' else 0
+        ranked.append(((not health.available(now), health.in_flight, -quota_left, health.last_used), account))
+    ranked.sort(key=lambda item: item[0])
+    return [account for _, account in ranked]
+
+
+def _reserve_post(account):
+    """Take one question slot of the account, unless another request took the last one"""
+    taken = ServiceAccount.query.filter(
+        ServiceAccount.id == account.id,
+        ServiceAccount.questions_posted < ACCOUNT_QUESTION_LIMIT
+    ).update({'questions_posted': ServiceAccount.questions_posted + 1}, synchronize_session=False)
+    db.session.commit()
+    if taken:
+        db.session.refresh(account)
+    return bool(taken)
+
+
+def acquire(pool, reserve_post=False):
+    """
+    Pick an account from a pool and count it as in flight. Every successful
+    acquire() must be paired with release().
+    reserve_post: also take one of the account's ACCOUNT_QUESTION_LIMIT question slots
+    Returns: (account, None) or (None, error_message)
+    """
+    if pool not in POOLS:
+        raise ValueError(f"Unknown account pool: {pool}")
+
+    accounts = _candidates(pool)
+    with _lock:
+        ranked = _rank(accounts, pool, time.time(), reserve_post)
+
+    for account in ranked:
+        if reserve_post and not _reserve_post(account):
+            continue
+        with _lock:
+            health = _get_health(account)
+            health.in_flight += 1
+            health.last_used = time.time()
+        return account, None
+
+    if pool == 'unblur':
+        return None, "No Unblur Accounts Available. Contact Admin."
+    return None, "All Chegg accounts have reached their question limit. Please contact the Super Admin to add new accounts."
+
+
+def release(account, error=None, refund_post=False, kind=None):
+    """
+    Finish a request made with an acquired account.
+    error: the error string the Chegg call returned (None on success)
+    kind: COOKIE_EXPIRED / BLOCKED when the call knows why it failed (the error text is never parsed)
+    refund_post: give back the question slot taken by acquire(reserve_post=True)
+    """
+    if refund_post:
+        ServiceAccount.query.filter(
+            ServiceAccount.id == account.id,
+            ServiceAccount.questions_posted > 0
+        ).update({'questions_posted': ServiceAccount.questions_posted - 1}, synchronize_session=False)
+        db.session.commit()
+
+    now = time.time()
+    with _lock:
+        health = _get_health(account)
+        health.in_flight = max(0, health.in_flight - 1)
+        if not error:
+            health.failures = 0
+            health.last_error = None
+            return
+
+        health.last_error = str(error)[:200]
+        if kind == COOKIE_EXPIRED:
+            health.cookie_expired = True
+            print(f"[Accounts] '{account.name}' cookie expired, skipping it until the cookie changes")
+        elif kind == BLOCKED:
+            health.cooldown_until = now + CAPTCHA_COOLDOWN
+            print(f"[Accounts] '{account.name}' hit a captcha, cooling down {CAPTCHA_COOLDOWN}s")
+        else:
+            health.failures += 1
+            if health.failures >= FAILURE_THRESHOLD:
+                health.cooldown_until = now + FAILURE_COOLDOWN
+                print(f"[Accounts] '{account.name}' failed {health.failures} times in a row, cooling down {FAILURE_COOLDOWN}s")
+
+
+def refresh_balances():
+    """
+    Refresh the Chegg balance of every account (scheduler job, needs an app context).
+    Returns: number of accounts whose balance was read
+    """
+    accounts = [(a.id, a.name, a.cookie_data, a.proxy) for a in ServiceAccount.query.all()]
+    if not accounts:
+        return 0
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=BALANCE_WORKERS) as executor:
+        futures = {executor.submit(chegg_api.get_account_balance, cookie, proxy): (account_id, name, cookie)
+                   for account_id, name, cookie, proxy in accounts}
+        results = []
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                results.append((futures[future], future.result()))
+            except Exception as e:
+                results.append((futures[future], {"error": str(e)}))
+
+    refreshed = 0
+    now = time.time()
+    with _lock:
+        live_ids = {account_id for account_id, _, _, _ in accounts}
+        for stale_id in set(_health) - live_ids:
+            del _health[stale_id]
+
+        for (account_id, name, cookie), balance in results:
+            health = _health.get(account_id)
+            if health is None:
+                health = _health[account_id] = AccountHealth()
+                health.cookie_hash = hash(cookie)
+            if "error" in balance:
+                health.last_error = f"Balance check: {balance['error']}"
+                continue
+            if "used" in balance and balance.get("limit"):
+                health.remaining = max(0, balance["limit"] - balance["used"])
+            elif "remaining" in balance:
+                health.remaining = balance["remaining"]
+            health.balance_checked_at = now
+            if health.cookie_expired:
+                print(f"[Accounts] '{name}' answers again, clearing its cookie-expired mark")
+            health.cookie_expired = False
+            refreshed += 1
+    return refreshed
+
+
+def snapshot():
+    """Health of every account seen by this worker, for the admin dashboard"""
+    now = time.time()
+    with _lock:
+        return {
+            account_id: {
+                'in_flight': h.in_flight,
+                'failures': h.failures,
+                'cooling_down': now < h.cooldown_until,
+                'cookie_expired': h.cookie_expired,
+                'remaining': h.remaining,
+                'last_error': h.last_error
+            }
+            for account_id, h in _health.items()
+        }
@@ -0,0 +1,223 @@
+"""
+Super admin dashboard panels
+/lone-admin/ renders only the page shell and the header counts; each list on it
+(users, service accounts, job feed, student verifications, feedback) is a JSON
+panel loaded when its section is opened, one keyset-paginated page at a time
+(utils/pagination.py), with filtering and search done in SQL.
+
+summary_counts() gathers every header count in one query and is memoized on
+flask.g, so the page and anything else in the same request share the result.
+"""
+from flask import Blueprint, jsonify, request, url_for, g
+from flask_login import login_required, current_user
+from sqlalchemy import select, func, or_
+from sqlalchemy.orm import joinedload
+from models import db, User, ServiceAccount, Job, Feedback
+from account_scheduler import ACCOUNT_QUESTION_LIMIT
+from utils.pagination import paginate, page_size
+
+admin_panels_bp = Blueprint('admin_panels', __name__, url_prefix='/lone-admin/api')
+
+STAFF_ROLES = ('admin', 'super_admin')
+USER_ROLES = ('admin', 'user', 'tutor')
+
+
+def super_admin_required(f):
+    """Decorator to require super_admin role"""
+    from functools import wraps
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or current_user.role != 'super_admin':
+            return jsonify({"error": "Unauthorized"}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _count(model, *criteria):
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+
+def summary_counts(owner_id):
+    """Header counts of the super admin dashboard (one query per request)"""
+    cached = g.get('_admin_summary')
+    if cached is not None:
+        return cached
+    row = db.session.execute(select(
+        _count(User, User.role == 'admin').label('admins'),
+        _count(User, User.role.notin_(STAFF_ROLES)).label('users'),
+        _count(User, User.student_type == 'disabled', User.is_verified == False).label('pending_verifications'),
+        _count(Job).label('jobs'),
+        _count(ServiceAccount, ServiceAccount.owner_id == owner_id).label('my_accounts'),
+        _count(ServiceAccount).label('accounts'),
+        _count(ServiceAccount, ServiceAccount.questions_posted >= ACCOUNT_QUESTION_LIMIT).label('exhausted_accounts'),
+        _count(Feedback, Feedback.is_approved == False).label('pending_feedback'),
+        _count(Feedback, Feedback.is_approved == True).label('approved_feedback'),
+    )).one()
+    g._admin_summary = dict(row._mapping)
+    return g._admin_summary
+
+
+def _page_response(key, items, next_cursor):
+    return jsonify({key: items, "next_cursor": next_cursor})
+
+
+def _date(value, fmt='%Y-%m-%d'):
+    return value.strftime(fmt) if value else None
+
+
+# --- HEADER COUNTS ---
+@admin_panels_bp.route('/summary', methods=['GET'])
+@login_required
+@super_admin_required
+def summary():
+    return jsonify(dict(summary_counts(current_user.id), account_limit=ACCOUNT_QUESTION_LIMIT))
+
+
+# --- USERS (by role, searchable) ---
+@admin_panels_bp.route('/users', methods=['GET'])
+@login_required
+@super_admin_required
+def users():
+    role = request.args.get('role', 'admin')
+    search = request.args.get('q', '').strip()
+
+    query = User.query
+    if role in USER_ROLES:
+        query = query.filter(User.role == role)
+    elif role == 'all':
+        query = query.filter(User.role != 'super_admin')
+    else:
+        return jsonify({"error": "Unknown role"}), 400
+    if search:
+        pattern = f"%{search}%"
+        query = query.filter(or_(User.username.ilike(pattern), User.email.ilike(pattern),
+                                 User.full_name.ilike(pattern)))
+
+    try:
+        rows, next_cursor = paginate(query, [User.id], request.args.get('cursor'),
+                                     page_size(request.args.get('limit')))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return _page_response("users", [{
+        "id": u.id,
+        "username": u.username,
+        "full_name": u.full_name,
+        "email": u.email,
+        "role": u.role,
+        "credits": u.credits,
+        "created_at": _date(u.created_at),
+    } for u in rows], next_cursor)
+
+
+# --- SERVICE ACCOUNTS (unblur pool, user accounts, Chegg rotation usage) ---
+@admin_panels_bp.route('/accounts', methods=['GET'])
+@login_required
+@super_admin_required
+def accounts():
+    owner = request.args.get('owner', 'all')
+    exhausted = request.args.get('exhausted')
+
+    query = ServiceAccount.query
+    if owner == 'mine':
+        query = query.filter(ServiceAccount.owner_id == current_user.id)
+    elif owner == 'others':
+        query = query.filter(ServiceAccount.owner_id != current_user.id)
+    elif owner != 'all':
+        return jsonify({"error": "Unknown owner filter"}), 400
+    if exhausted == '1':
+        query = query.filter(ServiceAccount.questions_posted >= ACCOUNT_QUESTION_LIMIT)
+    elif exhausted == '0':
+        query = query.filter(or_(ServiceAccount.questions_posted < ACCOUNT_QUESTION_LIMIT,
+                                 ServiceAccount.questions_posted.is_(None)))
+
+    try:
+        rows, next_cursor = paginate(query, [ServiceAccount.id], request.args.get('cursor'),
+                                     page_size(request.args.get('limit')))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return _page_response("accounts", [{
+        "id": a.id,
+        "name": a.name,
+        "owner_id": a.owner_id,
+        "has_proxy": bool(a.proxy),
+        "questions_posted": a.questions_posted or 0,
+        "exhausted": (a.questions_posted or 0) >= ACCOUNT_QUESTION_LIMIT,
+    } for a in rows], next_cursor)
+
+
+# --- GLOBAL JOB FEED ---
+@admin_panels_bp.route('/jobs', methods=['GET'])
+@login_required
+@super_admin_required
+def jobs():
+    query = db.session.query(Job, User).join(User, Job.user_id == User.id)
+    status = request.args.get('status')
+    if status:
+        query = query.filter(Job.status == status)
+
+    try:
+        rows, next_cursor = paginate(query, [Job.timestamp, Job.id], request.args.get('cursor'),
+                                     page_size(request.args.get('limit')),
+                                     key=lambda row: (row.Job.timestamp, row.Job.id))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return _page_response("jobs", [{
+        "id": job.id,
+        "username": user.username,
+        "user_role": user.role,
+        "subject": job.subject,
+        "status": job.status,
+        "timestamp": _date(job.timestamp, '%Y-%m-%d %H:%M'),
+    } for job, user in rows], next_cursor)
+
+
+# --- STUDENT VERIFICATION (disabled students waiting for approval) ---
+@admin_panels_bp.route('/verifications', methods=['GET'])
+@login_required
+@super_admin_required
+def verifications():
+    query = User.query.filter_by(student_type='disabled', is_verified=False)
+    try:
+        rows, next_cursor = paginate(query, [User.id], request.args.get('cursor'),
+                                     page_size(request.args.get('limit')))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return _page_response("users", [{
+        "id": u.id,
+        "username": u.username,
+        "full_name": u.full_name,
+        "email": u.email,
+        "parent_name": u.parent_name,
+        "parent_phone": u.parent_phone,
+        "address": u.address,
+        "certificate_url": url_for('uploaded_file', filename=u.disability_certificate_path)
+                           if u.disability_certificate_path else None,
+    } for u in rows], next_cursor)
+
+
+# --- FEEDBACK (pending review / approved) ---
+@admin_panels_bp.route('/feedback', methods=['GET'])
+@login_required
+@super_admin_required
+def feedback():
+    approved = request.args.get('approved') == '1'
+    query = Feedback.query.options(joinedload(Feedback.user)).filter(Feedback.is_approved == approved)
+    try:
+        rows, next_cursor = paginate(query, [Feedback.created_at, Feedback.id], request.args.get('cursor'),
+                                     page_size(request.args.get('limit')))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return _page_response("feedback", [{
+        "id": f.id,
+        "content": f.content,
+        "username": f.user.username,
+        "user_role": f.user.role,
+        "profile_picture_url": url_for('static', filename=f.user.profile_picture)
+                               if f.user.profile_picture else None,
+        "created_at": _date(f.created_at),
+    } for f in rows], next_cursor)
@@ -6,18 +6,14 @@ SETUP:
   2. Get a free key from: https://aistudio.google.com/apikey
   3. ChatGPT is in TEST MODE — it returns a placeholder until you add OPENAI_API_KEY
 """
-import os
-import re
 import requests
-import json
-from dotenv import load_dotenv
+from utils import ai_client
+import metrics
+from utils.keyword_matcher import KeywordMatcher
 
-# Load environment variables
-load_dotenv()
-
-# ─── API Keys ───────────────────────────────────────────────────────
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
+# ─── API Keys (loaded once by the shared AI client) ─────────────────
+GEMINI_API_KEY = ai_client.GEMINI_API_KEY
+OPENAI_API_KEY = ai_client.OPENAI_API_KEY
 
 # ─── Model Configuration ────────────────────────────────────────────
 # Models verified available for this API key:
@@ -27,8 +23,6 @@ GEMINI_MODELS = [
     'gemini-2.0-flash',        # Advanced, might hit quota
     'gemini-pro'               # Classic fallback
 ]
-GEMINI_API_BASE = 'https://generativelanguage.googleapis.com/v1beta/models'
-
 GPT_MODEL = 'gpt-3.5-turbo'  # Will be used when OPENAI_API_KEY is set
 GPT_TEST_MODE = not bool(OPENAI_API_KEY)  # Auto-detect test mode
 
@@ -52,14 +46,13 @@ CATEGORY_KEYWORDS = {
 }
 
 
+# Built once at import; rebuild with KeywordMatcher(...) if CATEGORY_KEYWORDS changes
+CATEGORY_MATCHER = KeywordMatcher(CATEGORY_KEYWORDS)
+
+
 def categorize_query(query: str) -> str:
     """Auto-categorize query based on keywords"""
-    query_lower = query.lower()
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in query_lower:
-                return category
-    return 'general'
+    return CATEGORY_MATCHER.match(query, default='general')
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -108,20 +101,14 @@ def get_gemini_response(question: str, context: list = None) -> tuple:
     # Try each model in order until one works
     for model_name in GEMINI_MODELS:
         try:
-            url = f'{GEMINI_API_BASE}/{model_name}:generateContent?key={GEMINI_API_KEY}'
-
-            response = requests.post(
-                url,
-                headers={'Content-Type': 'application/json'},
-                json=payload,
-                timeout=30
-            )
+            response = ai_client.gemini_generate(model_name, payload, timeout=30)
 
             # If quota exceeded (429 or 403), try next model
             if response.status_code in (429, 403):
                 error_data = response.json()
                 last_error = error_data.get('error', {}).get('message', f'HTTP {response.status_code}')
                 print(f"[AI Tutor] {model_name} quota exceeded, trying next model...")
+                metrics.AI_FALLBACKS.labels(feature='ai_tutor', model=model_name, reason='quota').inc()
                 continue
 
             if response.status_code != 200:
@@ -131,11 +118,10 @@ def get_gemini_response(question: str, context: list = None) -> tuple:
 
             data = response.json()
 
-            candidates = data.get('candidates', [])
-            if not candidates:
+            if not data.get('candidates'):
                 return None, "Gemini returned an empty response. Try rephrasing your question."
 
-            text = candidates[0].get('content', {}).get('parts', [{}])[0].get('text', '')
+            text = ai_client.extract_gemini_text(data)
             if not text:
                 return None, "Gemini returned an empty response."
 
@@ -144,11 +130,13 @@ def get_gemini_response(question: str, context: list = None) -> tuple:
 
         except requests.exceptions.Timeout:
             last_error = f"{model_name} timed out"
+            metrics.AI_FALLBACKS.labels(feature='ai_tutor', model=model_name, reason='timeout').inc()
             continue
         except requests.exceptions.ConnectionError:
             return None, "Could not connect to Gemini API. Check your internet connection."
         except Exception as e:
             last_error = str(e)
+            metrics.AI_FALLBACKS.labels(feature='ai_tutor', model=model_name, reason='error').inc()
             continue
 
     # All models failed
@@ -177,9 +165,6 @@ def get_chatgpt_response(question: str, context: list = None) -> tuple:
         )
 
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=OPENAI_API_KEY)
-
         messages = [{"role": "system", "content": SYSTEM_PROMPT}]
 
         # Add conversation context
@@ -189,14 +174,14 @@ def get_chatgpt_response(question: str, context: list = None) -> tuple:
 
         messages.append({"role": "user", "content": question})
 
-        response = client.chat.completions.create(
+        answer = ai_client.openai_chat(
+            messages,
             model=GPT_MODEL,
-            messages=messages,
             max_tokens=2000,
             temperature=0.7
         )
 
-        return response.choices[0].message.content, None
+        return answer, None
 
     except ImportError:
         return None, "OpenAI library not installed. Run: pip install openai"
@@ -274,28 +259,19 @@ def generate_quiz(subject: str, grade: str, difficulty: str = 'hard') -> list:
     for attempt in range(2):
         for model_name in GEMINI_MODELS:
             try:
-                url = f'{GEMINI_API_BASE}/{model_name}:generateContent?key={GEMINI_API_KEY}'
-                response = requests.post(
-                    url,
-                    headers={'Content-Type': 'application/json'},
-                    json=payload,
-                    timeout=45
-                )
+                response = ai_client.gemini_generate(model_name, payload, timeout=45)
 
                 if response.status_code in (429, 403):
                     print(f"[Quiz] {model_name} quota exceeded, trying next...")
+                    metrics.AI_FALLBACKS.labels(feature='quiz', model=model_name, reason='quota').inc()
                     continue
 
                 if response.status_code != 200:
                     print(f"[Quiz] {model_name} error: HTTP {response.status_code}")
+                    metrics.AI_FALLBACKS.labels(feature='quiz', model=model_name, reason='error').inc()
                     continue
 
-                data = response.json()
-                candidates = data.get('candidates', [])
-                if not candidates:
-                    continue
-
-                text = candidates[0].get('content', {}).get('parts', [{}])[0].get('text', '')
+                text = ai_client.extract_gemini_text(response.json())
                 if not text:
                     continue
 
@@ -333,12 +309,15 @@ def generate_quiz(subject: str, grade: str, difficulty: str = 'hard') -> list:
 
             except json_mod.JSONDecodeError as e:
                 print(f"[Quiz] JSON parse error on {model_name}: {e}")
+                metrics.AI_FALLBACKS.labels(feature='quiz', model=model_name, reason='invalid_json').inc()
                 continue
             except requests.exceptions.Timeout:
                 print(f"[Quiz] {model_name} timed out")
+                metrics.AI_FALLBACKS.labels(feature='quiz', model=model_name, reason='timeout').inc()
                 continue
             except Exception as e:
                 print(f"[Quiz] Unexpected error: {e}")
+                metrics.AI_FALLBACKS.labels(feature='quiz', model=model_name, reason='error').inc()
                 continue
 
     print("[Quiz] All attempts failed to generate valid quiz")
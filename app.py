@@ -1,31 +1,43 @@
-from flask import Flask, render_template, redirect, url_for, request, flash, jsonify, send_from_directory, Response
+from dotenv import load_dotenv
+load_dotenv() # Load environment variables from .env (before the local imports, several read settings on import)
+
+from flask import Flask, render_template, stream_template, stream_with_context, redirect, url_for, request, flash, jsonify, send_from_directory, Response
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from urllib.parse import urlparse
 from werkzeug.utils import secure_filename
+from markupsafe import escape
 import os
 # ----------------------------------------------
-from models import db, User, ServiceAccount, Job, ChatHistory, ChatConversation, Document, DocumentUnlock, Tutor, TutoringSession, Grade, Subject, Feedback, Notification, Subscription, VideoCourse, CourseVideo, CoursePurchase
-from sqlalchemy import func, or_
+from models import db, User, ServiceAccount, Job, ChatHistory, ChatConversation, Document, DocumentUnlock, Tutor, TutoringSession, Grade, Subject, Feedback, Notification, VideoCourse, CourseVideo, CoursePurchase
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 import chegg_api
 import time
 import hashlib
-from sqlalchemy import desc
 from datetime import datetime
-from dotenv import load_dotenv
 from flask_apscheduler import APScheduler
+from flask_migrate import Migrate, upgrade
 import concurrent.futures
 import concurrent.futures
 from chegg_api import check_if_solved, notify_super_admin
 from auth_routes import auth_bp, configure_oauth
 from utils.validators import validate_password
 from utils.otp_helper import verify_otp
+from trending import get_trending_topics
+from stats import get_totals, get_day_stats
+import db_config
+import perf
+import metrics
+import exports
+import notifications
 import os
-load_dotenv() # Load environment variables from .env
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev_default_secret_key')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///chegg_bot.db')
+# Pool sizing per worker class, SQLite WAL/PRAGMAs (see db_config.py)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = db_config.engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 
 UPLOAD_FOLDER = 'static/uploads'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -45,6 +57,10 @@ def ads_txt():
     return send_from_directory(app.root_path, 'ads.txt')
 
 db.init_app(app)
+db_config.init_engine(app, db)
+perf.init_app(app, db)  # PERF_INSTRUMENTATION=1: Server-Timing, [PERF] log lines, /lone-admin/perf
+# Schema changes go through migrations/ (flask db upgrade)
+migrate = Migrate(app, db, render_as_batch=True)  # batch mode: SQLite can't ALTER most constraints
 login_manager = LoginManager()
 login_manager.login_view = 'login'
 login_manager.login_view = 'login'
@@ -74,6 +90,10 @@ app.register_blueprint(video_courses_bp)
 from quiz_routes import quiz_bp
 app.register_blueprint(quiz_bp)
 
+# --- REGISTER SUPER ADMIN PANELS BLUEPRINT ---
+from admin_panels import admin_panels_bp, summary_counts
+app.register_blueprint(admin_panels_bp)
+
 # --- SOCKETIO FOR VIDEO TUTORING ---
 from signaling import init_socketio
 socketio = init_socketio(app)
@@ -83,38 +103,34 @@ RECENT_POSTS = {}
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    # The active subscription comes along, feature checks read it (entitlements.py)
+    return db.session.get(User, int(user_id), options=[joinedload(User.active_subscription)])
     
 from chegg_processor_web import chegg_processor
 from mayank import answer_generator
-import random
-
-# --- HELPER: ROTATE SUPER ADMIN ACCOUNTS ---
-def get_super_admin_account():
-    """Finds a working ServiceAccount owned by a Super Admin."""
-    super_admins = User.query.filter_by(role='super_admin').all()
-    if not super_admins:
-        return None
-    super_admin_ids = [u.id for u in super_admins]
-    accounts = ServiceAccount.query.filter(ServiceAccount.owner_id.in_(super_admin_ids)).all()
-    if not accounts:
-        return None
-    return random.choice(accounts)
-
-ACCOUNT_QUESTION_LIMIT = 20
-
-def get_auto_account():
-    """Auto-select the first ServiceAccount with questions_posted < LIMIT, ordered by ID.
-    Returns (account, None) on success, (None, error_message) on failure."""
-    account = ServiceAccount.query.filter(
-        ServiceAccount.questions_posted < ACCOUNT_QUESTION_LIMIT
-    ).order_by(ServiceAccount.id.asc()).first()
-    
-    if account:
-        return account, None
-    
-    # All accounts exhausted
-    return None, "All Chegg accounts have reached their question limit. Please contact the Super Admin to add new accounts."
+import solution_cache
+from utils.single_flight import SingleFlight
+from utils.pagination import paginate
+import account_scheduler
+import credit_ledger
+import entitlements
+from account_scheduler import ACCOUNT_QUESTION_LIMIT
+
+# One upstream Chegg fetch per question at a time (across greenlets and, via lease files, workers)
+unblur_flight = SingleFlight(lock_dir=os.path.join(solution_cache.CACHE_DIR, 'locks'), lease_ttl=60)
+
+def _stream_solution(solution):
+    """Yield the rendered solution in chunks and cache the full HTML once it's complete"""
+    chunks = []
+    try:
+        for chunk in answer_generator.generate_html_iter(solution['question_data']):
+            chunks.append(chunk)
+            yield chunk
+    except Exception as e:
+        print(f"[Unblur] Render failed for {solution['question_id']}: {e}")
+        yield f"<div class='p-4 bg-red-50 text-red-600 rounded'>Error formatting solution: {escape(str(e))}</div>"
+        return
+    solution_cache.put(solution['question_id'], solution['question_data'], ''.join(chunks))
 
 # --- NEW ROUTE: UNBLUR INTERFACE ---
 @app.route('/unblur', methods=['GET', 'POST'])
@@ -133,47 +149,75 @@ def unblur():
             flash("Upgrade your plan to unlock Unlimited Unblurs, or upload documents to earn credits!", "warning")
             return redirect(url_for('payments.pricing'))
 
-        # 3. Get Super Admin Account (Rotation)
-        account = get_super_admin_account()
+        # 3. Repeat unblurs are served from the solution cache (no Chegg account needed)
+        raw_id, question_id = solution_cache.resolve_question_id(url, chegg_processor.extract_uuid_from_url)
+        cached_html = solution_cache.get_html(question_id, answer_generator.generate_html_string) if question_id else None
 
-        if not account:
-            flash("System Error: No Unblur Accounts Available. Contact Admin.")
-            return redirect(url_for('unblur'))
-
-        # 4. Process
-        credit_deducted = False
-        if not current_user.can_access('unblur') and current_user.credits >= 1:
-             current_user.credits -= 1
-             credit_deducted = True
-             db.session.commit()
+        # 4. Process (wallet credit reserved up front, refunded if the unblur fails)
+        credit_entry = None
+        if not current_user.can_access('unblur'):
+            credit_entry, credit_err = credit_ledger.reserve(current_user.id, reason='Unblur')
+            if not credit_entry:
+                flash("Upgrade your plan to unlock Unlimited Unblurs, or upload documents to earn credits!", "warning")
+                return redirect(url_for('payments.pricing'))
 
         try:
-            result, error = chegg_processor.get_question_data(url, account.cookie_data, account.proxy)
-            
-            if error:
-                # Refund if credit was used
-                if credit_deducted:
-                    current_user.credits += 1
-                    db.session.commit()
-                    flash(f"Error: {error}. Credit refunded.")
-                else:
-                    flash(f"Error: {error}")
-                return redirect(url_for('unblur'))
-            
-            # ... (HTML generation) ...
-            final_html = answer_generator.generate_html_string(result['question_data'])
+            if cached_html:
+                solution = None
+            else:
+                # Students sharing one link: a single upstream fetch, everyone gets its result.
+                # The fetched data is cached right away; the HTML is added once a render finishes.
+                def fetch_solution():
+                    account, acc_err = account_scheduler.acquire('unblur')
+                    if not account:
+                        return None, f"System Error: {acc_err}"
+                    try:
+                        result, error = chegg_processor.get_question_data(url, account.cookie_data, account.proxy, question_id=question_id)
+                    except Exception as e:
+                        account_scheduler.release(account, str(e))
+                        raise
+                    account_scheduler.release(account, error, kind=getattr(error, 'kind', None))
+                    if error:
+                        return None, error
+                    solution_cache.put(result['question_id'], result['question_data'], None, legacy_id=raw_id)
+                    return result, None
+
+                def cached_elsewhere():
+                    _, resolved_id = solution_cache.resolve_question_id(url, chegg_processor.extract_uuid_from_url)
+                    entry = solution_cache.get(resolved_id) if resolved_id else None
+                    return ({'question_id': entry['question_id'], 'question_data': entry['question_data']}, None) if entry else None
+
+                (solution, error), _ = unblur_flight.do(raw_id or url, fetch_solution, check=cached_elsewhere)
+                
+                if error:
+                    # Refund if credit was used
+                    if credit_entry:
+                        credit_ledger.refund(credit_entry, reason='Unblur failed')
+                        flash(f"Error: {error}. Credit refunded.")
+                    else:
+                        flash(f"Error: {error}")
+                    return redirect(url_for('unblur'))
 
             # Log Job
-            job = Job(user_id=current_user.id, subject="Unblur Request", content=url, status="Completed", result_message="Unblurred Successfully")
+            job = Job(user_id=current_user.id, subject="Unblur Request", content=url, status="Completed",
+                      result_message="Unblurred Successfully (cached)" if cached_html else "Unblurred Successfully")
             db.session.add(job)
             db.session.commit()
-            
-            return render_template('view_answer.html', html_content=final_html, original_url=url)
+            if credit_entry:
+                credit_ledger.commit(credit_entry)
+
+            if cached_html:
+                return render_template('view_answer.html', html_chunks=[cached_html], original_url=url)
+
+            # Fresh solutions are streamed step by step, then cached. The DB session is closed
+            # before the body is sent, so load what base.html reads from current_user now.
+            db.session.refresh(current_user._get_current_object())
+            return stream_template('view_answer.html', html_chunks=_stream_solution(solution), original_url=url)
             
         except Exception as e:
-            if credit_deducted:
-                current_user.credits += 1
-                db.session.commit()
+            if credit_entry:
+                db.session.rollback()
+                credit_ledger.refund(credit_entry, reason='Unblur failed')
                 flash(f"Processing Failed: {str(e)}. Credit refunded.")
             else:
                 flash(f"Processing Failed: {str(e)}")
@@ -194,7 +238,7 @@ def api_process_image():
         return jsonify({"error": "No file selected"}), 400
 
     # Auto-select account
-    account, err = get_auto_account()
+    account, err = account_scheduler.acquire('post')
     if not account:
         return jsonify({"error": err}), 400
 
@@ -202,6 +246,7 @@ def api_process_image():
     filename = secure_filename(f"{int(time.time())}_{file.filename}")
     local_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     file.save(local_path)
+    metrics.record_upload('question_image', local_path)
 
     try:
         # Upload
@@ -209,11 +254,13 @@ def api_process_image():
         
         if not chegg_url:
             os.remove(local_path)
+            account_scheduler.release(account, "Image upload failed")
             return jsonify({"error": "Failed to upload to Chegg."}), 500
 
         # OCR
         ocr_text = chegg_api.ocr_analyze_image(account.cookie_data, chegg_url, account.proxy)
         os.remove(local_path)
+        account_scheduler.release(account)
 
         return jsonify({
             "success": True,
@@ -223,6 +270,7 @@ def api_process_image():
 
     except Exception as e:
         if os.path.exists(local_path): os.remove(local_path)
+        account_scheduler.release(account, str(e))
         return jsonify({"error": str(e)}), 500
 
 # --- API Route for Finding Subjects ---
@@ -236,11 +284,16 @@ def api_get_suggested_subjects():
         return jsonify({"error": "Question too short"})
 
     # Auto-select account
-    account, err = get_auto_account()
+    account, err = account_scheduler.acquire('post')
     if not account:
         return jsonify({"error": err})
 
-    suggestions = chegg_api.get_subjects_from_text(account.cookie_data, question_text, account.proxy)
+    try:
+        suggestions = chegg_api.get_subjects_from_text(account.cookie_data, question_text, account.proxy)
+    except Exception as e:
+        account_scheduler.release(account, str(e))
+        raise
+    account_scheduler.release(account)
     return jsonify({"subjects": suggestions})
 
 
@@ -363,40 +416,10 @@ def super_admin_dashboard():
 
         return redirect(url_for('super_admin_dashboard'))
 
-    # Data for the dashboard
-    all_admins = User.query.filter_by(role='admin').all()
-    all_users = User.query.filter(User.role != 'super_admin', User.role != 'admin').all()
-    
-    # Filter accounts: Separate "Unblur/My Accounts" from "User Accounts"
-    my_accounts = ServiceAccount.query.filter_by(owner_id=current_user.id).all()
-    other_accounts = ServiceAccount.query.filter(ServiceAccount.owner_id != current_user.id).all()
-    
-    global_jobs = db.session.query(Job, User).join(User, Job.user_id == User.id).order_by(Job.timestamp.desc()).limit(100).all()
-
-    # Fetch pending feedbacks for approval
-    pending_feedbacks = Feedback.query.filter_by(is_approved=False).order_by(Feedback.created_at.desc()).all()
-    
-    # Fetch approved feedbacks for management (limit last 50 to avoid clutter)
-    approved_feedbacks = Feedback.query.filter_by(is_approved=True).order_by(Feedback.created_at.desc()).limit(50).all()
-    
-    # Fetch Pending Verification Users (Disabled Students)
-    pending_users = User.query.filter_by(student_type='disabled', is_verified=False).all()
-
-    # Chegg Study Accounts (for Homework Helper auto-rotation)
-    chegg_accounts = ServiceAccount.query.order_by(ServiceAccount.id.asc()).all()
-    exhausted_accounts = [a for a in chegg_accounts if a.questions_posted >= ACCOUNT_QUESTION_LIMIT]
-
-    return render_template('super_admin.html', 
-                           admins=all_admins, 
-                           users=all_users, 
-                           my_accounts=my_accounts,      # Pass my accounts separately
-                           other_accounts=other_accounts, # Pass others separately
-                           jobs=global_jobs,
-                           pending_feedbacks=pending_feedbacks,
-                           approved_feedbacks=approved_feedbacks,
-                           pending_users=pending_users,
-                           chegg_accounts=chegg_accounts,
-                           exhausted_accounts=exhausted_accounts,
+    # Only the header counts are rendered here; the lists are JSON panels loaded
+    # when their section is opened (admin_panels.py)
+    return render_template('super_admin.html',
+                           counts=summary_counts(current_user.id),
                            account_limit=ACCOUNT_QUESTION_LIMIT)
 
 # --- NEW: User Verification Route ---
@@ -439,10 +462,11 @@ def index():
     if current_user.is_authenticated:
         return redirect(url_for('dashboard'))
     
-    # Fetch stats for landing page
-    student_count = User.query.filter_by(role='user').count()
-    resource_count = Document.query.count()
-    questions_solved = Job.query.filter_by(status='Completed').count() * 5 + 1200 # Fake boost for demo
+    # Fetch stats for landing page (cached counters, see stats.py)
+    totals = get_totals()
+    student_count = totals['users']
+    resource_count = totals['documents']
+    questions_solved = totals['completed_jobs'] * 5 + 1200 # Fake boost for demo
     
     # Fetch approved feedbacks
     feedbacks = Feedback.query.filter_by(is_approved=True).order_by(Feedback.created_at.desc()).limit(10).all()
@@ -681,36 +705,8 @@ def setup_database():
     })
 
 
-# --- HELPER: GET TRENDING TOPICS ---
-from datetime import timedelta
-
-def get_trending_topics():
-    """Get most searched topics for dashboard analytics"""
-    from datetime import datetime
-    
-    # Get category counts
-    category_counts = db.session.query(
-        ChatHistory.category,
-        func.count(ChatHistory.id).label('count')
-    ).group_by(ChatHistory.category).order_by(func.count(ChatHistory.id).desc()).limit(5).all()
-    
-    # Get recent popular questions (last 7 days)
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    
-    popular_questions = db.session.query(
-        ChatHistory.question,
-        ChatHistory.category,
-        func.count(ChatHistory.id).label('count')
-    ).filter(
-        ChatHistory.timestamp >= week_ago
-    ).group_by(ChatHistory.question, ChatHistory.category).order_by(
-        func.count(ChatHistory.id).desc()
-    ).limit(5).all()
-    
-    return {
-        "categories": [{"name": c[0], "count": c[1]} for c in category_counts],
-        "popular_questions": [{"question": q[0][:80], "category": q[1], "count": q[2]} for q in popular_questions]
-    }
+# Rows per page of the dashboard / Chegg tool job and session history
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '20'))
 
 @app.route('/dashboard', methods=['GET', 'POST'])
 @login_required
@@ -740,12 +736,12 @@ def dashboard():
              return redirect(url_for('dashboard'))
         
         # Check quota against credit pool AND wallet
-        if current_user.role not in ['admin', 'super_admin'] and current_user.active_subscription_id:
-             sub = Subscription.query.get(current_user.active_subscription_id)
+        charges_credits = current_user.role not in ['admin', 'super_admin'] and current_user.active_subscription_id
+        if charges_credits:
+             left = entitlements.for_user(current_user)
              # If Plan exhausted AND Wallet empty -> Block
-             if sub.expert_credits_used >= sub.expert_credits and current_user.credits <= 0:
-                 remaining_plan = max(0, sub.expert_credits - sub.expert_credits_used)
-                 flash(f"Not enough expert credits! Plan: {remaining_plan}, Wallet: {current_user.credits}")
+             if left.pools['expert'] <= 0 and left.wallet <= 0:
+                 flash(f"Not enough expert credits! Plan: {left.pools['expert']}, Wallet: {left.wallet}")
                  return redirect(url_for('dashboard'))
 
         # Validation
@@ -761,29 +757,27 @@ def dashboard():
             flash("Please upload an image.")
             return redirect(url_for('dashboard'))
 
-        # Auto-select account (first available with < 20 questions)
-        account, acc_err = get_auto_account()
-        if not account:
-            flash(acc_err)
-            return redirect(url_for('dashboard'))
-
         try:
             title, subj_id, grp_id = raw_subject.split('|')
         except ValueError:
             flash("Invalid Subject.")
             return redirect(url_for('dashboard'))
 
-        # Increment Usage (once, not twice)
-        credit_source = None
-        if current_user.role not in ['admin', 'super_admin'] and current_user.active_subscription_id:
-            sub = Subscription.query.get(current_user.active_subscription_id)
-            if sub.expert_credits_used < sub.expert_credits:
-                sub.expert_credits_used += 1
-                credit_source = 'plan'
-            elif current_user.credits > 0:
-                current_user.credits -= 1
-                credit_source = 'wallet'
-            db.session.commit()
+        # Reserve the credit (plan pool first, then wallet); settled once the post went through
+        credit_entry = None
+        if charges_credits:
+            credit_entry, credit_err = credit_ledger.reserve(current_user.id, 'expert', reason='Expert question')
+            if not credit_entry:
+                flash("Not enough expert credits!")
+                return redirect(url_for('dashboard'))
+
+        # Least-loaded account with question slots left; one slot is reserved for this post
+        account, acc_err = account_scheduler.acquire('post', reserve_post=True)
+        if not account:
+            if credit_entry:
+                credit_ledger.refund(credit_entry, reason='No posting account')
+            flash(acc_err)
+            return redirect(url_for('dashboard'))
         
         # Post question (single post only)
         if post_mode == 'image':
@@ -792,15 +786,21 @@ def dashboard():
             if content and content.strip():
                 html_body += f"<div><p>{content}</p></div>"
             html_body += f"<div><img src='{final_image_url}' /></div>"
-            
-            success, msg = chegg_api.post_question_v3(
-                account.cookie_data, html_body, int(subj_id), account.proxy
-            )
         else:
             job_desc = content
-            success, msg = chegg_api.post_question_to_chegg(
-                account.cookie_data, content, title, int(subj_id), int(grp_id), account.proxy
-            )
+
+        # A crash here must still hand the account's question slot back below
+        try:
+            if post_mode == 'image':
+                success, msg = chegg_api.post_question_v3(
+                    account.cookie_data, html_body, int(subj_id), account.proxy
+                )
+            else:
+                success, msg = chegg_api.post_question_to_chegg(
+                    account.cookie_data, content, title, int(subj_id), int(grp_id), account.proxy
+                )
+        except Exception as e:
+            success, msg = False, f"Posting Error: {e}"
 
         job = Job(user_id=current_user.id, subject=title, content=job_desc, status="Processing", service_account_name=account.name)
         db.session.add(job)
@@ -812,33 +812,27 @@ def dashboard():
                 job.chegg_link = msg
                 job.status = "Pending"
             
-            # Increment account usage counter
-            account.questions_posted += 1
-            db.session.commit()
+            # The question slot was taken by acquire(reserve_post=True)
+            account_scheduler.release(account)
+            if credit_entry:
+                credit_ledger.commit(credit_entry)
             
             # Notify super admin if account just hit limit
             if account.questions_posted >= ACCOUNT_QUESTION_LIMIT:
-                super_admins = User.query.filter_by(role='super_admin').all()
-                for sa in super_admins:
-                    notif = Notification(
-                        user_id=sa.id,
-                        message=f"⚠️ Chegg account '{account.name}' has reached {ACCOUNT_QUESTION_LIMIT} questions! Please replace it.",
-                        link=url_for('super_admin_dashboard')
-                    )
-                    db.session.add(notif)
+                notifications.notify_super_admins(
+                    f"⚠️ Chegg account '{account.name}' has reached {ACCOUNT_QUESTION_LIMIT} questions! Please replace it.",
+                    link=url_for('super_admin_dashboard'),
+                    dedup_key=f"account-limit:{account.id}"
+                )
                 db.session.commit()
             
             flash("Question posted successfully!")
         else:
             job.status = "Failed"
+            account_scheduler.release(account, msg, refund_post=True)
             # Refund Usage
-            if current_user.role not in ['admin', 'super_admin'] and current_user.active_subscription_id:
-                sub = Subscription.query.get(current_user.active_subscription_id)
-                if credit_source == 'plan':
-                    sub.expert_credits_used = max(0, sub.expert_credits_used - 1)
-                elif credit_source == 'wallet':
-                    current_user.credits += 1
-                db.session.commit()
+            if credit_entry:
+                credit_ledger.refund(credit_entry, reason='Post failed')
                 
             flash(f"Failed to post: {msg}")
 
@@ -846,10 +840,11 @@ def dashboard():
         db.session.commit()
         return redirect(url_for('dashboard'))
 
-    my_jobs = Job.query.filter_by(user_id=current_user.id).order_by(Job.timestamp.desc()).all()
+    # First page of each history; the rest is fetched while scrolling (/api/history/...)
+    my_jobs, jobs_cursor = _job_history_page()
     
     # Get tutoring sessions for the student
-    my_sessions = TutoringSession.query.filter_by(student_id=current_user.id).order_by(TutoringSession.created_at.desc()).all()
+    my_sessions, sessions_cursor = _session_history_page()
     
     # Get trending topics for analytics
     trending = get_trending_topics()
@@ -857,9 +852,64 @@ def dashboard():
     return render_template('dashboard.html',
                            user=current_user,
                            jobs=my_jobs,
+                           jobs_cursor=jobs_cursor,
                            sessions=my_sessions,
+                           sessions_cursor=sessions_cursor,
                            trending=trending)
 
+# --- JOB / SESSION HISTORY (keyset pages, newest first) ---
+
+def _job_history_page(cursor=None):
+    """Returns: (jobs, next_cursor) for the current user; raises ValueError on a bad cursor"""
+    query = Job.query.filter_by(user_id=current_user.id)
+    return paginate(query, [Job.timestamp, Job.id], cursor, HISTORY_PAGE_SIZE)
+
+def _session_history_page(cursor=None):
+    """Returns: (sessions, next_cursor) for the current student; raises ValueError on a bad cursor"""
+    query = TutoringSession.query.options(joinedload(TutoringSession.tutor))\
+                                 .filter_by(student_id=current_user.id)
+    return paginate(query, [TutoringSession.created_at, TutoringSession.id], cursor, HISTORY_PAGE_SIZE)
+
+@app.route('/api/history/jobs')
+@login_required
+def api_job_history():
+    try:
+        jobs, next_cursor = _job_history_page(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "jobs": [{
+            "id": job.id,
+            "subject": job.subject,
+            "status": job.status,
+            "content": job.content,
+            "result_message": job.result_message,
+            "service_account_name": job.service_account_name,
+            "timestamp": str(job.timestamp),  # Same form as the server-rendered rows (UTC, no zone)
+        } for job in jobs],
+        "next_cursor": next_cursor
+    })
+
+@app.route('/api/history/sessions')
+@login_required
+def api_session_history():
+    try:
+        sessions, next_cursor = _session_history_page(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "sessions": [{
+            "id": s.id,
+            "date": s.created_at.strftime('%Y-%m-%d'),
+            "tutor_name": s.tutor.display_name if s.tutor else 'Unknown',
+            "duration_minutes": s.duration_minutes or 0,
+            "recording_url": f"/{s.recording_path}" if s.recording_path else None,
+        } for s in sessions],
+        "next_cursor": next_cursor
+    })
+
 @app.route('/admin', methods=['GET', 'POST'])
 @login_required
 def admin():
@@ -876,15 +926,13 @@ def admin():
 
             if username == current_user.username:
                 # ADMIN FUNDING THEMSELVES
-                current_user.credits += amount
-                db.session.commit()
+                credit_ledger.grant(current_user.id, amount, reason=f"Added by {current_user.username}")
                 flash(f"Added {amount} credits to your own account.")
             else:
                 # FUNDING MANAGED USER
                 u = User.query.filter_by(username=username, manager_id=current_user.id).first()
                 if u:
-                    u.credits += amount
-                    db.session.commit()
+                    credit_ledger.grant(u.id, amount, reason=f"Added by {current_user.username}")
                     flash(f"Added {amount} credits to {username}")
                 else:
                     flash(f"User {username} not found in your managed list.")
@@ -971,10 +1019,11 @@ def chegg_tools():
     # (Adjust query if you only want specific accounts shown)
     accounts = ServiceAccount.query.all() 
     
-    # 2. Fetch User History
-    jobs = Job.query.filter_by(user_id=current_user.id).order_by(desc(Job.timestamp)).limit(50).all()
+    # 2. Fetch User History (first page; the rest loads on scroll from /api/history/jobs)
+    jobs, jobs_cursor = _job_history_page()
+    job_count = Job.query.filter_by(user_id=current_user.id).count()
     
-    return render_template('chegg_tools.html', accounts=accounts, jobs=jobs)
+    return render_template('chegg_tools.html', accounts=accounts, jobs=jobs, jobs_cursor=jobs_cursor, job_count=job_count)
 
 # --- AI TUTOR ROUTES ---
 from ai_tutor import get_ai_response
@@ -1080,12 +1129,7 @@ def api_ai_tutor_chat():
     
     # Increment Usage (if not admin)
     if current_user.role not in ['admin', 'super_admin'] and current_user.active_subscription_id:
-        sub = Subscription.query.get(current_user.active_subscription_id)
-        if sub.ai_credits_used < sub.ai_credits:
-            sub.ai_credits_used += 1
-        elif current_user.credits > 0:
-            current_user.credits -= 1
-        db.session.commit()
+        credit_ledger.charge(current_user.id, 'ai', reason='AI tutor')
     
     # Save to history
     if response_text:
@@ -1230,9 +1274,9 @@ def library_upload():
         # Award credit to uploader (20 uploads = 1 credit)
         total_uploads = Document.query.filter_by(user_id=current_user.id).count()
         if total_uploads > 0 and total_uploads % 20 == 0:
-            current_user.credits += 1
             db.session.commit()
-            flash(f'Document uploaded successfully! 🎉 You reached {total_uploads} uploads and earned 1 credit! Total credits: {current_user.credits}')
+            balance = credit_ledger.grant(current_user.id, 1, reason='Upload reward')
+            flash(f'Document uploaded successfully! 🎉 You reached {total_uploads} uploads and earned 1 credit! Total credits: {balance}')
         else:
             db.session.commit()
             uploads_until_credit = 20 - (total_uploads % 20)
@@ -1256,6 +1300,34 @@ def library_upload():
 
 # --- SUPER ADMIN DATA REPORTS & EXPORT ---
 
+@app.route('/api/admin/db_pool')
+@login_required
+def api_admin_db_pool():
+    """Connection pool checkouts/waits of the worker that serves the request"""
+    if current_user.role != 'super_admin':
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify(db_config.pool_stats())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint (METRICS_TOKEN bearer token, or a super admin session)"""
+    if not metrics.authorized(request, current_user):
+        return Response('Unauthorized', status=401)
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+@app.route('/lone-admin/perf', methods=['GET', 'POST'])
+@login_required
+def super_admin_perf():
+    """Slowest routes of the worker that serves the request (needs PERF_INSTRUMENTATION=1)"""
+    if current_user.role != 'super_admin':
+        return redirect(url_for('dashboard'))
+    if request.method == 'POST':
+        perf.reset()
+        return redirect(url_for('super_admin_perf'))
+    return render_template('perf.html', enabled=perf.PERF_ENABLED, routes=perf.slowest_routes(),
+                           pool=db_config.pool_stats(), pid=os.getpid())
+
 @app.route('/api/admin/stats')
 @login_required
 def api_admin_stats():
@@ -1271,194 +1343,62 @@ def api_admin_stats():
     except ValueError:
         return jsonify({"error": "Invalid date format"}), 400
 
-    # 1. Total Counts
-    total_students = User.query.filter(User.role != 'admin', User.role != 'super_admin').count()
-    total_tutors = Tutor.query.count()
-    
-    # 2. Daily Counts
-    # SQLite stores datetime, so we filter by range or cast. 
-    # Simpler: Filter by >= date and < date + 1 day
-    next_day = query_date + timedelta(days=1)
-    
-    daily_students = User.query.filter(
-        User.role != 'admin', 
-        User.role != 'super_admin',
-        User.created_at >= query_date,
-        User.created_at < next_day
-    ).count()
-
-    daily_tutors = Tutor.query.filter(
-        Tutor.created_at >= query_date,
-        Tutor.created_at < next_day
-    ).count()
-    
-    # 3. Active Plans Count
-    active_plans = Subscription.query.filter_by(is_active=True).count()
+    # Totals come from the stats cache; the day is live for today/yesterday, older days from daily_stats
+    totals = get_totals()
+    day = get_day_stats(query_date)
 
     return jsonify({
         "total": {
-            "students": total_students,
-            "tutors": total_tutors,
-            "active_plans": active_plans
+            "students": totals['students'],
+            "tutors": totals['tutors'],
+            "active_plans": totals['active_plans']
         },
         "daily": {
             "date": date_str,
-            "students": daily_students,
-            "tutors": daily_tutors
+            "students": day['signups'],
+            "tutors": day['tutor_signups'],
+            "active_plans": day['active_plans']
         }
     })
 
-@app.route('/admin/export/students')
-@login_required
-def admin_export_students():
-    try:
-        if current_user.role != 'super_admin':
-            return redirect(url_for('dashboard'))
+def _admin_export(report):
+    """CSV is streamed straight away; PDF/XLSX are built in the background (exports.py)"""
+    if current_user.role != 'super_admin':
+        return redirect(url_for('dashboard'))
 
-        from fpdf import FPDF
-        import io
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt == 'csv':
+        filename = f"{report}_report_{datetime.utcnow().strftime('%Y%m%d')}.csv"
+        return Response(stream_with_context(exports.stream_csv(report)), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment;filename={filename}'})
 
-        # Fetch Data
-        students = User.query.filter(User.role != 'admin', User.role != 'super_admin').order_by(User.created_at.desc()).all()
+    filename, error = exports.start(app, report, fmt, current_user.id)
+    if error:
+        flash(error, 'warning')
+    else:
+        flash(f"Generating the {report} {fmt.upper()} report. You'll get a notification with the download link.", 'info')
+    return redirect(url_for('super_admin_dashboard'))
 
-        # Create PDF
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=10)
-        
-        # Title
-        pdf.set_font("Arial", style="B", size=16)
-        pdf.cell(0, 10, txt="Students Hub - All Students Report", ln=True, align='C')
-        pdf.set_font("Arial", size=10)
-        pdf.cell(0, 10, txt=f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}", ln=True, align='C')
-        pdf.ln(10)
-
-        # Table Header
-        pdf.set_font("Arial", style="B", size=9)
-        # ID(10), Name(40), Type(20), Parent(30), Phone(25), Plan(30), Joined(30)
-        col_widths = [10, 40, 20, 30, 25, 30, 30]
-        headers = ["ID", "Name", "Type", "Parent", "Phone", "Active Plan", "Joined"]
-        
-        for i, h in enumerate(headers):
-            pdf.cell(col_widths[i], 10, h, border=1)
-        pdf.ln()
-
-        # Table Body
-        pdf.set_font("Arial", size=8)
-        for s in students:
-            # Get Plan Info
-            plan_name = "Free"
-            if s.active_subscription_id:
-                sub = Subscription.query.get(s.active_subscription_id)
-                if sub and sub.is_active:
-                    plan_name = sub.plan_type.replace('_', ' ').title()
-
-            row = [
-                str(s.id),
-                s.full_name or s.username,
-                s.student_type.capitalize() if s.student_type else "General",
-                s.parent_name or "-",
-                s.parent_phone or "-",
-                plan_name,
-                s.created_at.strftime('%Y-%m-%d')
-            ]
-            
-            # Check if row fits, else add page
-            if pdf.get_y() > 270:
-                pdf.add_page()
-                # Reprint Header
-                pdf.set_font("Arial", style="B", size=9)
-                for i, h in enumerate(headers):
-                    pdf.cell(col_widths[i], 10, h, border=1)
-                pdf.ln()
-                pdf.set_font("Arial", size=8)
-
-            for i, data in enumerate(row):
-                # Truncate if too long
-                text = str(data)
-                if len(text) > 25: text = text[:22] + "..."
-                pdf.cell(col_widths[i], 10, text, border=1)
-            pdf.ln()
-
-        # Output
-        return Response(bytes(pdf.output()), mimetype='application/pdf', 
-                        headers={'Content-Disposition': 'attachment;filename=students_report.pdf'})
-    except Exception as e:
-        print(f"PDF EXPORT ERROR: {e}")
-        return jsonify({"error": str(e)}), 500
+@app.route('/admin/export/students')
+@login_required
+def admin_export_students():
+    return _admin_export('students')
 
 @app.route('/admin/export/tutors')
 @login_required
 def admin_export_tutors():
-    try:
-        if current_user.role != 'super_admin':
-            return redirect(url_for('dashboard'))
+    return _admin_export('tutors')
 
-        from fpdf import FPDF
-
-        # Fetch Data
-        tutors = Tutor.query.order_by(Tutor.created_at.desc()).all()
-
-        # Create PDF
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=10)
-        
-        # Title
-        pdf.set_font("Arial", style="B", size=16)
-        pdf.cell(0, 10, txt="Students Hub - All Tutors Report", ln=True, align='C')
-        pdf.set_font("Arial", size=10)
-        pdf.cell(0, 10, txt=f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}", ln=True, align='C')
-        pdf.ln(10)
-
-        # Table Header
-        pdf.set_font("Arial", style="B", size=9)
-        # ID(10), Name(40), Subjects(40), Grades(40), Education(30), Status(20)
-        col_widths = [10, 40, 40, 40, 30, 20]
-        headers = ["ID", "Name", "Subjects", "Grades", "Qualification", "Status"]
-        
-        for i, h in enumerate(headers):
-            pdf.cell(col_widths[i], 10, h, border=1)
-        pdf.ln()
-
-        # Table Body
-        pdf.set_font("Arial", size=8)
-        for t in tutors:
-            status = "Active" if t.is_active else "Inactive"
-            if not t.is_approved: status = "Pending"
-
-            row = [
-                str(t.id),
-                t.display_name,
-                t.subjects or "-",
-                t.teaching_grades or "-",
-                t.qualification or "-",
-                status
-            ]
-            
-            # Check if row fits
-            if pdf.get_y() > 270:
-                pdf.add_page()
-                # Reprint Header
-                pdf.set_font("Arial", style="B", size=9)
-                for i, h in enumerate(headers):
-                    pdf.cell(col_widths[i], 10, h, border=1)
-                pdf.ln()
-                pdf.set_font("Arial", size=8)
-
-            for i, data in enumerate(row):
-                 # Truncate
-                text = str(data)
-                if len(text) > 25: text = text[:22] + "..."
-                pdf.cell(col_widths[i], 10, text, border=1)
-            pdf.ln()
-
-        # Output
-        return Response(bytes(pdf.output(dest='S')), mimetype='application/pdf', 
-                        headers={'Content-Disposition': 'attachment;filename=tutors_report.pdf'})
-    except Exception as e:
-        print(f"PDF EXPORT ERROR: {e}")
-        return jsonify({"error": str(e)}), 500
+@app.route('/admin/exports/<filename>')
+@login_required
+def admin_download_export(filename):
+    """Finished background exports (linked from the 'Export ready' notification)"""
+    if current_user.role != 'super_admin':
+        return redirect(url_for('dashboard'))
+    if not exports.file_path(filename):
+        flash("That export has expired or doesn't exist. Please generate it again.", 'warning')
+        return redirect(url_for('super_admin_dashboard'))
+    return send_from_directory(exports.export_dir(), filename, as_attachment=True)
 
 
 @app.route('/library/document/<int:doc_id>')
@@ -1496,12 +1436,11 @@ def api_library_unlock(doc_id):
     if existing or doc.user_id == current_user.id:
         return jsonify({"success": True, "message": "Already unlocked"})
     
-    # Check credits
-    if current_user.credits < 1:
+    # Deduct credit (only if the wallet still holds one) and create unlock record
+    credit_entry, credit_err = credit_ledger.charge(current_user.id, reason=f'Document unlock #{doc_id}')
+    if not credit_entry:
         return jsonify({"error": "Not enough credits! You need 1 credit to unlock."})
-    
-    # Deduct credit and create unlock record
-    current_user.credits -= 1
+
     unlock = DocumentUnlock(user_id=current_user.id, document_id=doc_id)
     doc.downloads += 1
     
@@ -1638,10 +1577,13 @@ def run_chegg_checker():
     with app.app_context():
         # 1. 🔍 Get all pending jobs
         pending_jobs = Job.query.filter_by(status='Pending').all()
+        metrics.PENDING_JOBS.set(len(pending_jobs))
         if not pending_jobs:
             # print("   (No pending jobs to check)")
             return
 
+        batch_start = time.perf_counter()
+
         print(f"🕵️ Checker running for {len(pending_jobs)} pending jobs...")
         
         # 2. 🚀 Setup Parallel Execution
@@ -1663,17 +1605,19 @@ def run_chegg_checker():
                     results_to_process.append((job, status))
                 except Exception as exc:
                     print(f"   --> JOB #{job.id} generated an exception: {exc}")
+                    metrics.CHECKER_JOBS.labels(result='error').inc()
 
         # 4. Update DB in Main Thread (SQLite is sensitive to threads)
         notifications_to_add = []
         
         for job, status in results_to_process:
+            metrics.CHECKER_JOBS.labels(result=status.lower() if status in ('SOLVED', 'UNSOLVED', 'CAPTCHA') else 'error').inc()
             if status == 'SOLVED':
                 job.status = 'Solved'
-                # Create Notification
-                notifications_to_add.append(Notification(
-                    user_id=job.user_id,
-                    message=f"Solution Ready: {job.subject}",
+                # Create Notification (also bumps the user's unread counter)
+                notifications_to_add.append(notifications.notify(
+                    job.user_id,
+                    f"Solution Ready: {job.subject}",
                     link=job.chegg_link
                 ))
                 print(f"   --> JOB #{job.id} SOLVED! Notification queued.")
@@ -1690,9 +1634,6 @@ def run_chegg_checker():
             else:
                 print(f"   --> JOB #{job.id} Error during check.")
 
-        if notifications_to_add:
-            db.session.add_all(notifications_to_add)
-            
         try:
             db.session.commit()
             if notifications_to_add:
@@ -1701,6 +1642,8 @@ def run_chegg_checker():
             db.session.rollback()
             print(f"   --> DB Commit Error: {e}")
         
+        metrics.CHECKER_BATCH_SECONDS.observe(time.perf_counter() - batch_start)
+
         # LOGGING TO FILE
         try:
             with open("logs/checker_run.log", "a") as f:
@@ -1710,6 +1653,66 @@ def run_chegg_checker():
                 
         print("--- Check Complete ---")
 
+# --- QUIZ BANK REFILL BACKGROUND TASK ---
+
+def run_quiz_bank_refill():
+    """Background task to top up quiz question pools below the low-water mark."""
+    from quiz_bank import refill_low_pools
+    with app.app_context():
+        try:
+            refill_low_pools()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[Quiz Bank] Refill failed: {e}")
+
+# --- TRENDING TOPICS BACKGROUND TASK ---
+
+def run_trending_refresh():
+    """Background task to fold new AI Tutor questions into the trending tables."""
+    from trending import refresh_trending
+    with app.app_context():
+        try:
+            refresh_trending()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[Trending] Refresh failed: {e}")
+
+# --- STATS ROLLUP BACKGROUND TASK ---
+
+def run_stats_refresh():
+    """Background task to store the newest final day in daily_stats and refresh the stats caches."""
+    from stats import refresh_stats
+    with app.app_context():
+        try:
+            refresh_stats()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[Stats] Refresh failed: {e}")
+
+# --- NOTIFICATION RETENTION BACKGROUND TASK ---
+
+def run_notification_compact():
+    """Background task to drop old read notifications and re-sync unread counters."""
+    with app.app_context():
+        try:
+            deleted, fixed = notifications.compact_notifications()
+            if deleted or fixed:
+                print(f"[Notifications] Deleted {deleted} old read notifications, fixed {fixed} unread counters")
+        except Exception as e:
+            db.session.rollback()
+            print(f"[Notifications] Compaction failed: {e}")
+
+# --- SERVICE ACCOUNT BALANCE BACKGROUND TASK ---
+
+def run_account_refresh():
+    """Background task to refresh Chegg balances / cookie health of the service accounts."""
+    with app.app_context():
+        try:
+            account_scheduler.refresh_balances()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[Accounts] Balance refresh failed: {e}")
+
 # --- NOTIFICATION ROUTES ---
 
 @app.route('/get-notifications')
@@ -1729,16 +1732,17 @@ def get_notifications():
             'timestamp': n.timestamp.isoformat()
         } for n in notifs]
         
-        return jsonify(data)
+        # Badge count comes from the denormalized counter, not from the 20 rows above
+        return jsonify({'notifications': data, 'unread': current_user.unread_notifications})
     except Exception as e:
         print(f"Error fetching notifications: {e}")
-        return jsonify([])
+        return jsonify({'notifications': [], 'unread': 0})
 
 @app.route('/mark-all-read', methods=['POST'])
 @login_required
 def mark_all_read():
     try:
-        Notification.query.filter_by(user_id=current_user.id, is_read=False).update({'is_read': True})
+        notifications.mark_all_read(current_user.id)
         db.session.commit()
         return jsonify({'success': True})
     except Exception as e:
@@ -1747,10 +1751,15 @@ def mark_all_read():
 
 # Initialize Scheduler
 scheduler.add_job(id='Scheduled Task', func=run_chegg_checker, trigger="interval", minutes=1)
+scheduler.add_job(id='Quiz Bank Refill', func=run_quiz_bank_refill, trigger="interval", minutes=10)
+scheduler.add_job(id='Trending Refresh', func=run_trending_refresh, trigger="interval", minutes=5)
+scheduler.add_job(id='Stats Rollup', func=run_stats_refresh, trigger="interval", minutes=5)
+scheduler.add_job(id='Notification Retention', func=run_notification_compact, trigger="interval", hours=6)
+scheduler.add_job(id='Account Balance Refresh', func=run_account_refresh, trigger="interval", minutes=15)
 scheduler.init_app(app)
 if __name__ == '__main__':
     scheduler.start()
     with app.app_context():
-        db.create_all()
+        upgrade()
     # Use socketio.run for WebSocket support in video tutoring
     socketio.run(app, debug=True, port=5000)
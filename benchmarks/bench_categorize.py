@@ -0,0 +1,126 @@
+"""
+Benchmark: AI Tutor query categorization and math-pattern detection.
+
+Compares the old per-keyword loop with a single compiled regex alternation
+and with utils.keyword_matcher.KeywordMatcher, on a short question and on
+long pasted questions (keyword found late / not at all).
+
+Usage (from the repo root):
+    python benchmarks/bench_categorize.py [--repeat 2000]
+"""
+import os
+import re
+import sys
+import random
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_tutor import CATEGORY_KEYWORDS, categorize_query
+from utils.keyword_matcher import KeywordMatcher
+from mayank import COMPLEX_MATH_PATTERNS, SIMPLE_MATH_PATTERNS
+
+
+def legacy_categorize(query):
+    query_lower = query.lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in query_lower:
+                return category
+    return 'general'
+
+
+def build_alternation(keyword_sets):
+    """One lookahead regex over every keyword (keeps overlap + priority semantics)"""
+    labels = list(keyword_sets)
+    groups = '|'.join(
+        f"(?P<k{i}>{'|'.join(re.escape(k) for k in keyword_sets[label])})"
+        for i, label in enumerate(labels)
+    )
+    regex = re.compile(f'(?=(?:{groups}))', re.IGNORECASE)
+
+    def categorize(query):
+        best = None
+        for m in regex.finditer(query):
+            idx = int(m.lastgroup[1:])
+            if best is None or idx < best:
+                best = idx
+                if best == 0:
+                    break
+        return labels[best] if best is not None else 'general'
+    return categorize
+
+
+def legacy_math(text):
+    for pattern in COMPLEX_MATH_PATTERNS.patterns:
+        if re.search(pattern, text): return 'display'
+    for pattern in SIMPLE_MATH_PATTERNS.patterns:
+        if re.search(pattern, text): return 'inline'
+    return False
+
+
+def patternset_math(text):
+    if COMPLEX_MATH_PATTERNS.search(text): return 'display'
+    if SIMPLE_MATH_PATTERNS.search(text): return 'inline'
+    return False
+
+
+def make_inputs():
+    random.seed(42)
+    filler = ['the', 'block', 'of', 'mass', 'slides', 'down', 'a', 'frictionless', 'incline',
+              'with', 'velocity', 'beam', 'is', 'loaded', 'by', 'force', 'at', 'angle']
+    long_text = ' '.join(random.choice(filler) for _ in range(2000))
+    return {
+        'short (hit)': 'Explain the concept of entropy in thermodynamics',
+        'long, no keyword': long_text,
+        'long, late keyword': long_text + ' what is the tension in the rope',
+    }
+
+
+def bench(label, funcs, inputs, repeat):
+    print(f"\n{label}")
+    print(f"  {'input':<30}" + ''.join(f'{name:>20}' for name in funcs))
+    for input_name, text in inputs.items():
+        results = {name: f(text) for name, f in funcs.items()}
+        if len(set(map(str, results.values()))) != 1:
+            print(f"  !! results differ on '{input_name}': {results}")
+        row = f"  {input_name + f' ({len(text)}c)':<30}"
+        for f in funcs.values():
+            seconds = timeit.timeit(lambda: f(text), number=repeat)
+            row += f'{seconds / repeat * 1e6:>17.1f} us'
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    inputs = make_inputs()
+    word_matcher = KeywordMatcher(CATEGORY_KEYWORDS, word_boundary=True)
+
+    bench('categorize_query (per call)', {
+        'legacy loop': legacy_categorize,
+        'regex alternation': build_alternation(CATEGORY_KEYWORDS),
+        'KeywordMatcher': categorize_query,
+    }, inputs, args.repeat)
+
+    bench('whole-word categorization (per call)', {
+        'KeywordMatcher(wb)': lambda t: word_matcher.match(t, default='general'),
+    }, inputs, args.repeat)
+
+    math_inputs = {
+        'plain text': 'Hello world',
+        'equation': 'x = 5',
+        'subscripts': 'F_net = m a and v^2 = 2 a s',
+        'long prose': 'The block slides down the incline with constant speed ' * 40,
+    }
+    bench('is_mathematical_expression (per call)', {
+        'legacy re.search': legacy_math,
+        'PatternSet': patternset_math,
+    }, math_inputs, args.repeat * 5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""
+Benchmark: Chegg solution render time (mayank.AnswerGenerator.generate_html_string).
+
+Replays every benchmarks/fixtures/solutions/*.json question_data fixture and reports
+  - per solution: median render time over --repeat runs, output size, and the
+    memory allocation peak of one render (tracemalloc)
+  - per block type: how many blocks, total and mean process_block_enhanced time, output bytes
+  - the time spent in the math helpers per text fragment
+
+Times are also given in "calibration units": a fixed pure-Python loop timed
+on the same machine. A saved baseline compares those scores (not milliseconds),
+so one baseline works across CI runners of different speeds.
+
+Usage (from the repo root):
+    python benchmarks/bench_render.py [--repeat 20] [--workers 4 --min-blocks 1]
+    python benchmarks/bench_render.py --profile [--top 30]      # cProfile, cumulative time
+    python benchmarks/bench_render.py --tracemalloc [--top 30]  # top allocation sites
+    python benchmarks/bench_render.py --save-baseline benchmarks/baselines/render.json
+    python benchmarks/bench_render.py --baseline benchmarks/baselines/render.json [--threshold 1.3]
+
+--baseline exits with status 1 if any solution (or the total) is more than
+--threshold times slower than the baseline. Solutions that render in well under
+a millisecond are reported but not gated, their timings are mostly noise.
+--workers renders heavy blocks in a process pool (mayank.RENDER_WORKERS); the
+pool only pays off on multi-core machines and solutions with many drawings.
+"""
+import os
+import io
+import sys
+import glob
+import json
+import time
+import pstats
+import cProfile
+import argparse
+import logging
+import statistics
+import tracemalloc
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures', 'solutions')
+
+import mayank
+from mayank import answer_generator
+
+# Baseline scores below this (about 0.3 ms on a typical runner) are too noisy to gate on
+MIN_GATED_SCORE = 0.02
+
+FRAGMENTS = ['F_net = m a', 'v^2 = u^2 + 2as', 'M = 5 KN-m', '(a+b)/2', 'E_k = \\frac{1}{2}mv^2',
+             'The block slides down the incline', '3.2 kg/m-s', 'R = 10Omega']
+
+
+def time_call(fn, arg, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def calibrate():
+    """Median seconds of a fixed pure-Python workload, used to normalize timings"""
+    def work(_):
+        return sum(len(str(i)) for i in range(100000))
+    return time_call(work, None, 7)
+
+
+def load_fixtures():
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            fixtures.append((os.path.basename(path)[:-5], json.load(f)))
+    return fixtures
+
+
+def answer_blocks(question_data):
+    """Blocks in the order iter_sqna_content_html renders them"""
+    content = answer_generator.format_answer_content(question_data)
+    blocks = []
+    if "stepByStep" in content and "steps" in content["stepByStep"]:
+        for step in content["stepByStep"]["steps"]:
+            blocks.extend(step.get("blocks") or [])
+    if "finalAnswer" in content and "blocks" in content["finalAnswer"]:
+        blocks.extend(content["finalAnswer"].get("blocks") or [])
+    blocks.extend(content.get("blocks") or [])
+    return blocks
+
+
+def measure_peak_memory(question_data):
+    """Peak bytes allocated during one render"""
+    tracemalloc.start()
+    try:
+        answer_generator.generate_html_string(question_data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def bench_solutions(fixtures, repeat, calibration):
+    print(f"{'solution':<24}{'bytes':>10}{'median ms':>12}{'score':>10}{'peak KB':>10}")
+    results = {}
+    total = 0.0
+    for name, question_data in fixtures:
+        html = answer_generator.generate_html_string(question_data)
+        seconds = time_call(answer_generator.generate_html_string, question_data, repeat)
+        peak = measure_peak_memory(question_data)
+        total += seconds
+        results[name] = seconds / calibration
+        print(f"{name:<24}{len(html):>10}{seconds * 1000:>12.2f}{results[name]:>10.3f}{peak / 1024:>10.1f}")
+    results['total'] = total / calibration
+    print(f"{'total':<24}{'':>10}{total * 1000:>12.2f}{results['total']:>10.3f}")
+    return results
+
+
+def bench_block_types(fixtures, repeat):
+    stats = defaultdict(lambda: [0, 0.0, 0])  # type -> [blocks, seconds, output bytes]
+    for _, question_data in fixtures:
+        for block in answer_blocks(question_data):
+            block_type = block.get('type', 'UNKNOWN')
+            seconds = time_call(answer_generator.process_block_enhanced, block, repeat)
+            entry = stats[str(block_type)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += len(answer_generator.process_block_enhanced(block))
+
+    print(f"\n{'block type':<24}{'blocks':>8}{'total ms':>12}{'mean us':>12}{'out bytes':>12}")
+    for block_type, (count, seconds, size) in sorted(stats.items(), key=lambda item: -item[1][1]):
+        print(f"{block_type:<24}{count:>8}{seconds * 1000:>12.3f}{seconds / count * 1e6:>12.1f}{size:>12}")
+
+
+def bench_fragments(repeat):
+    rounds = repeat * 500 // len(FRAGMENTS)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for frag in FRAGMENTS:
+            answer_generator.is_mathematical_expression(frag)
+            answer_generator.clean_math_expression(frag)
+    per_call = (time.perf_counter() - start) / (rounds * len(FRAGMENTS))
+    print(f"\nis_mathematical_expression + clean_math_expression: {per_call * 1e6:.2f} us per fragment")
+
+
+def profile(fixtures, repeat, top):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(repeat):
+        for _, question_data in fixtures:
+            answer_generator.generate_html_string(question_data)
+    profiler.disable()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(top)
+    print(out.getvalue())
+
+
+def trace_allocations(fixtures, top):
+    # Warm up first so one-off caches (re's template cache, bs4 setup) aren't reported
+    for _, question_data in fixtures:
+        answer_generator.generate_html_string(question_data)
+
+    tracemalloc.start(10)
+    try:
+        before = tracemalloc.take_snapshot()
+        outputs = [answer_generator.generate_html_string(question_data) for _, question_data in fixtures]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del outputs
+    print(f"Top {top} sites still holding memory after rendering every fixture (output included):")
+    for stat in after.compare_to(before, 'lineno')[:top]:
+        print(f"  {stat}")
+
+
+def compare_baseline(results, baseline_path, threshold):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['scores']
+
+    regressions = []
+    print(f"\n{'solution':<24}{'baseline':>10}{'now':>10}{'ratio':>8}")
+    for name, score in results.items():
+        if name not in baseline:
+            print(f"{name:<24}{'-':>10}{score:>10.3f}{'new':>8}")
+            continue
+        ratio = score / baseline[name] if baseline[name] else 1.0
+        gated = baseline[name] >= MIN_GATED_SCORE
+        if gated and ratio > threshold:
+            regressions.append(name)
+        note = '  REGRESSION' if name in regressions else '' if gated else '  (not gated)'
+        print(f"{name:<24}{baseline[name]:>10.3f}{score:>10.3f}{ratio:>8.2f}{note}")
+
+    if regressions:
+        print(f"\n{len(regressions)} render time(s) more than {threshold}x the baseline: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nAll render times within {threshold}x of the baseline")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--min-blocks', type=int, default=mayank.PARALLEL_RENDER_MIN_BLOCKS)
+    parser.add_argument('--profile', action='store_true', help='print a cProfile report instead of timings')
+    parser.add_argument('--tracemalloc', action='store_true', help='print the top allocation sites instead of timings')
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--baseline', help='fail if slower than this saved baseline')
+    parser.add_argument('--threshold', type=float, default=1.3)
+    parser.add_argument('--save-baseline', help='write the scores of this run to a baseline file')
+    args = parser.parse_args()
+
+    mayank.RENDER_WORKERS = args.workers
+    mayank.PARALLEL_RENDER_MIN_BLOCKS = args.min_blocks
+
+    # Keep mayank's own logging setup (INFO, as in production) so level-gated debug logging
+    # costs here what it costs there; only the handler output is dropped
+    for handler in logging.getLogger().handlers:
+        handler.setStream(open(os.devnull, 'w'))
+    fixtures = load_fixtures()
+
+    if args.profile:
+        profile(fixtures, args.repeat, args.top)
+        return
+    if args.tracemalloc:
+        trace_allocations(fixtures, args.top)
+        return
+
+    calibration = calibrate()
+    print(f"calibration: {calibration * 1000:.2f} ms per unit\n")
+    results = bench_solutions(fixtures, args.repeat, calibration)
+    bench_block_types(fixtures, args.repeat)
+    bench_fragments(args.repeat)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({'repeat': args.repeat, 'scores': {name: round(score, 4) for name, score in results.items()}},
+                      f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.save_baseline}")
+    if args.baseline:
+        compare_baseline(results, args.baseline, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
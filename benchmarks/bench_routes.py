@@ -0,0 +1,321 @@
+"""
+Benchmark: end-to-end route latency on a seeded database.
+
+Runs the routes in ROUTES through Flask's test client against a database filled
+by seed_data.py, logged in as the seeded accounts (bench_student / bench_super).
+Outbound calls are stubbed: Chegg (chegg_api, chegg_processor), Gemini/OpenAI
+(utils.ai_client) and Stripe return canned responses, and any other HTTP request
+made through requests fails the route instead of reaching the network.
+
+Per route it reports
+  - p50 / p99 latency over --repeat requests (after --warmup requests)
+  - SQL statements per request (median)
+  - peak memory allocated by one request (tracemalloc, separate pass)
+Latencies are also given as scores in calibration units (see bench_render.py),
+which is what a saved baseline compares, together with the query counts.
+
+Usage (from the repo root):
+    python benchmarks/bench_routes.py [--scale small] [--repeat 50]
+    python benchmarks/bench_routes.py --database-url sqlite:////tmp/load.db --no-seed   # seeded earlier
+    python benchmarks/bench_routes.py --save-baseline           # benchmarks/baselines/routes-<commit>.json
+    python benchmarks/bench_routes.py --baseline benchmarks/baselines/routes-abc1234.json [--threshold 1.3]
+
+--baseline exits with status 1 if any route's p50 score is more than --threshold
+times the baseline's, or if it runs more SQL statements than it did then.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import tempfile
+import contextlib
+import statistics
+import subprocess
+import tracemalloc
+from datetime import date
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+BASELINES = os.path.join(ROOT, 'benchmarks', 'baselines')
+FIXTURE = os.path.join(ROOT, 'benchmarks', 'fixtures', 'solutions', 'sqna_text_math.json')
+
+# Baseline scores below this are too noisy to gate on (as in bench_render.py)
+MIN_GATED_SCORE = 0.02
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='benchmark this database instead of a fresh SQLite one')
+    parser.add_argument('--no-seed', action='store_true', help='the database is already migrated and seeded')
+    parser.add_argument('--scale', default='small', help='seed_data.py scale for a fresh database')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', help='comma-separated route names to run')
+    parser.add_argument('--baseline', help='fail if slower than this saved baseline')
+    parser.add_argument('--threshold', type=float, default=1.3)
+    parser.add_argument('--save-baseline', nargs='?', const='',
+                        help='write this run to a baseline file (default: benchmarks/baselines/routes-<commit>.json)')
+    return parser.parse_args()
+
+
+args = parse_args()
+if not args.database_url:
+    workdir = tempfile.mkdtemp(prefix='bench_routes_')
+    args.database_url = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ.setdefault('SOLUTION_CACHE_DIR', os.path.join(workdir, 'solutions'))
+os.environ['DATABASE_URL'] = args.database_url
+
+import requests
+import stripe
+from sqlalchemy import event
+from flask_migrate import upgrade
+import app as app_module
+from app import app
+from models import db
+import ai_tutor
+import chegg_api
+from utils import ai_client
+import seed_data
+from seed_data import SUPER_ADMIN_ID, STUDENT_ID
+
+STUDENT, SUPER_ADMIN = STUDENT_ID, SUPER_ADMIN_ID
+_counter = {'n': 0}
+
+
+def _next():
+    _counter['n'] += 1
+    return _counter['n']
+
+
+# (name, method, path, login as, request kwargs); callables are evaluated per request
+ROUTES = [
+    ('landing', 'GET', '/', None, {}),
+    ('dashboard', 'GET', '/dashboard', STUDENT, {}),
+    ('notifications', 'GET', '/get-notifications', STUDENT, {}),
+    ('library', 'GET', '/library', STUDENT, {}),
+    ('library search', 'GET', '/api/library/search?q=enzyme', STUDENT, {}),
+    ('ai tutor page', 'GET', '/ai-tutor', STUDENT, {}),
+    ('ai tutor chat', 'POST', '/api/ai-tutor/chat', STUDENT, {'json': {'question': 'Explain the derivative of x^2'}}),
+    ('unblur (cached)', 'POST', '/unblur', STUDENT,
+     {'data': {'chegg_url': 'https://www.chegg.com/homework-help/questions-and-answers/bench-q1'}}),
+    ('unblur (fresh)', 'POST', '/unblur', STUDENT,
+     {'data': lambda: {'chegg_url': f'https://www.chegg.com/homework-help/questions-and-answers/bench-q{_next() + 1000}'}}),
+    ('courses', 'GET', '/courses/', STUDENT, {}),
+    ('school', 'GET', '/school/', STUDENT, {}),
+    ('tutor browse', 'GET', '/tutoring/browse?subject=Physics', STUDENT, {}),
+    ('pricing', 'GET', '/pricing', STUDENT, {}),
+    ('stripe checkout', 'POST', '/checkout/stripe/pro_499', STUDENT, {}),
+    ('super admin', 'GET', '/lone-admin/', SUPER_ADMIN, {}),
+    ('admin users panel', 'GET', '/lone-admin/api/users?role=user&q=student', SUPER_ADMIN, {}),
+    ('admin jobs panel', 'GET', '/lone-admin/api/jobs', SUPER_ADMIN, {}),
+    ('admin stats', 'GET', lambda: f'/api/admin/stats?date={date.today():%Y-%m-%d}', SUPER_ADMIN, {}),
+]
+
+
+# ─── Stubs ──────────────────────────────────────────────────────────────
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+def install_stubs():
+    with open(FIXTURE, encoding='utf-8') as f:
+        question_data = json.load(f)
+
+    def get_question_data(url, cookie_data, proxy=None, question_id=None):
+        number = url.rsplit('-q', 1)[-1]
+        return {'question_id': f'00000000-0000-0000-0000-{int(number):012d}', 'question_data': question_data,
+                'html_link': url}, None
+
+    answer = {'candidates': [{'content': {'parts': [{'text': 'CATEGORY: math\nThe derivative of x^2 is 2x.'}]}}]}
+    app_module.chegg_processor.get_question_data = get_question_data
+    ai_client.gemini_generate = lambda model_name, payload, timeout=30: _FakeResponse(answer)
+    ai_client.gemini_generate_text = lambda model_name, parts, *a, **kw: ('The derivative of x^2 is 2x.', None)
+    ai_client.openai_chat = lambda *a, **kw: 'The derivative of x^2 is 2x.'
+    ai_tutor.GEMINI_API_KEY = 'bench'
+
+    chegg_api.post_question_v3 = lambda *a, **kw: (True, 'https://www.chegg.com/homework-help/questions-and-answers/q1')
+    chegg_api.post_question_to_chegg = lambda *a, **kw: (True, 'https://www.chegg.com/homework-help/questions-and-answers/q1')
+    chegg_api.check_if_solved = app_module.check_if_solved = lambda url: False
+    chegg_api.notify_super_admin = app_module.notify_super_admin = lambda message, link=None: None
+
+    stripe.checkout.Session.create = lambda **kw: SimpleNamespace(id='cs_bench', url='https://checkout.stripe.com/c/pay/cs_bench')
+
+    def no_network(self, method, url, *a, **kw):
+        raise RuntimeError(f"benchmark made an unstubbed {method} request to {url}")
+    requests.Session.request = no_network
+
+
+# ─── Measurement ────────────────────────────────────────────────────────
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *a, **kw):
+        self.count += 1
+
+
+def calibrate():
+    """Median seconds of a fixed pure-Python workload (same as bench_render.py)"""
+    samples = []
+    for _ in range(7):
+        start = time.perf_counter()
+        sum(len(str(i)) for i in range(100000))
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def make_client(user_id):
+    client = app.test_client()
+    if user_id:
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+    return client
+
+
+def call(client, method, path, kwargs):
+    path = path() if callable(path) else path
+    kwargs = {key: value() if callable(value) else value for key, value in kwargs.items()}
+    response = client.open(path, method=method, **kwargs)
+    response.get_data()  # Drain streamed bodies
+    response.close()
+    return response.status_code
+
+
+def bench_route(route, counter, repeat, warmup):
+    name, method, path, user_id, kwargs = route
+    client = make_client(user_id)
+    status = None
+    for _ in range(warmup):
+        status = call(client, method, path, kwargs)
+
+    samples, queries = [], []
+    for _ in range(repeat):
+        counter.count = 0
+        start = time.perf_counter()
+        status = call(client, method, path, kwargs)
+        samples.append(time.perf_counter() - start)
+        queries.append(counter.count)
+
+    tracemalloc.start()
+    try:
+        call(client, method, path, kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    samples.sort()
+    return {
+        'status': status,
+        'p50': statistics.median(samples),
+        'p99': samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        'queries': int(statistics.median(queries)),
+        'peak_kb': peak / 1024,
+    }
+
+
+def run(routes, repeat, warmup, calibration):
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+    print(f"{'route':<20}{'status':>7}{'p50 ms':>9}{'p99 ms':>9}{'score':>8}{'queries':>9}{'peak KB':>10}")
+    results = {}
+    for route in routes:
+        with contextlib.redirect_stdout(io.StringIO()):  # The routes' own print() logging
+            result = bench_route(route, counter, repeat, warmup)
+        result['score'] = result['p50'] / calibration
+        results[route[0]] = result
+        print(f"{route[0]:<20}{result['status']:>7}{result['p50'] * 1000:>9.2f}{result['p99'] * 1000:>9.2f}"
+              f"{result['score']:>8.3f}{result['queries']:>9}{result['peak_kb']:>10.0f}")
+    return results
+
+
+# ─── Baselines ──────────────────────────────────────────────────────────
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def save_baseline(path, results, calibration):
+    commit = git_commit()
+    path = path or os.path.join(BASELINES, f'routes-{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    routes = {name: {'p50_ms': round(r['p50'] * 1000, 3), 'p99_ms': round(r['p99'] * 1000, 3),
+                     'score': round(r['score'], 4), 'queries': r['queries'], 'peak_kb': round(r['peak_kb'], 1)}
+              for name, r in results.items()}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'commit': commit, 'database': db_dialect(), 'scale': None if args.no_seed else args.scale,
+                   'repeat': args.repeat, 'calibration_ms': round(calibration * 1000, 3), 'routes': routes},
+                  f, indent=2, sort_keys=True)
+    print(f"\nBaseline written to {path}")
+
+
+def compare_baseline(results, baseline_path, threshold):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\ncompared with {baseline.get('commit', '?')} ({baseline_path})")
+    print(f"{'route':<20}{'score':>8}{'now':>8}{'ratio':>8}{'queries':>9}{'now':>6}")
+    regressions = []
+    for name, result in results.items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            print(f"{name:<20}{'(new route)':>16}")
+            continue
+        ratio = result['score'] / before['score'] if before['score'] else 1.0
+        slower = before['score'] >= MIN_GATED_SCORE and ratio > threshold
+        more_queries = result['queries'] > before['queries']
+        note = '  SLOWER' if slower else ''
+        note += '  MORE QUERIES' if more_queries else ''
+        if slower or more_queries:
+            regressions.append(name)
+        print(f"{name:<20}{before['score']:>8.3f}{result['score']:>8.3f}{ratio:>8.2f}"
+              f"{before['queries']:>9}{result['queries']:>6}{note}")
+    if regressions:
+        print(f"\n{len(regressions)} route(s) regressed: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nAll routes within {threshold}x of the baseline, no new queries")
+
+
+def db_dialect():
+    with app.app_context():
+        return db.engine.dialect.name
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    install_stubs()
+    with app.app_context():
+        if not args.no_seed:
+            upgrade()
+            seed_data.seed(db, seed_data.derived_counts(**seed_data.SCALES[args.scale]))
+
+    routes = ROUTES
+    if args.only:
+        wanted = {name.strip() for name in args.only.split(',')}
+        routes = [route for route in ROUTES if route[0] in wanted]
+
+    calibration = calibrate()
+    print(f"\ncalibration: {calibration * 1000:.2f} ms per unit\n")
+    results = run(routes, args.repeat, args.warmup, calibration)
+
+    if args.save_baseline is not None:
+        save_baseline(args.save_baseline, results, calibration)
+    if args.baseline:
+        compare_baseline(results, args.baseline, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
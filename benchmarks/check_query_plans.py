@@ -0,0 +1,184 @@
+"""
+Query-plan check for the hot query paths of app.py and the blueprints.
+
+Builds a throwaway SQLite database with the migrations (flask db upgrade), seeds
+it with the small scale of seed_data.py, runs ANALYZE, then EXPLAINs every query in
+HOT_QUERIES. Exits with status 1 if any of them reads a table with a full scan
+instead of an index. Queries are built with the same filters and ordering as the
+routes; add new hot queries to HOT_QUERIES together with their index.
+
+Usage (from the repo root):
+    python benchmarks/check_query_plans.py [--verbose]
+    python benchmarks/check_query_plans.py --database-url postgresql://... --no-seed
+
+On PostgreSQL the check runs with enable_seqscan off, so a "Seq Scan" in the
+plan means no usable index exists (not that the planner preferred a scan of a
+small table).
+"""
+import os
+import re
+import sys
+import tempfile
+import argparse
+import logging
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='check this database instead of a seeded SQLite copy')
+    parser.add_argument('--no-seed', action='store_true', help="don't run migrations or insert rows")
+    parser.add_argument('--verbose', action='store_true', help='print every plan')
+    return parser.parse_args()
+
+
+args = parse_args()
+if not args.database_url:
+    args.database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='query_plans_'), 'plans.db')
+os.environ['DATABASE_URL'] = args.database_url
+
+from sqlalchemy import desc, text, tuple_
+from flask_migrate import upgrade
+from app import app
+import seed_data
+from models import (db, User, ServiceAccount, Job, Notification, ChatConversation, ChatHistory, Document,
+                    DocumentUnlock, Feedback, Tutor, TutoringSession, SchoolClass, ClassAttendance, Subscription,
+                    CourseVideo, CoursePurchase)
+
+
+def seed():
+    # Small scale of the load-test dataset, enough rows for the planner to prefer indexes
+    seed_data.seed(db, seed_data.derived_counts(**seed_data.SCALES['small']), seed=7, verbose=False)
+
+
+def hot_queries():
+    """(name, query) pairs mirroring the route queries, for user 7 / tutor 3 / grade 4"""
+    user_id, tutor_id, grade_id = 7, 3, 4
+    today = date.today()
+    return [
+        # app.py
+        ('dashboard jobs', Job.query.filter_by(user_id=user_id).order_by(Job.timestamp.desc(), Job.id.desc()).limit(21)),
+        ('dashboard jobs page', Job.query.filter_by(user_id=user_id)
+                                         .filter(tuple_(Job.timestamp, Job.id) < tuple_(datetime(2030, 1, 1), 500))
+                                         .order_by(Job.timestamp.desc(), Job.id.desc()).limit(21)),
+        ('admin jobs', Job.query.filter_by(user_id=user_id).order_by(desc(Job.timestamp)).limit(50)),
+        ('pending job poller', Job.query.filter_by(status='Pending')),
+        ('solved count', Job.query.filter_by(status='Completed').with_entities(db.func.count())),
+        ('super admin job feed', db.session.query(Job, User).join(User, Job.user_id == User.id)
+                                           .order_by(Job.timestamp.desc()).limit(100)),
+        ('notifications', Notification.query.filter_by(user_id=user_id).order_by(Notification.timestamp.desc()).limit(20)),
+        ('unread notifications', Notification.query.filter_by(user_id=user_id, is_read=False)),
+        ('admin alert dedupe', db.session.query(Notification.id).filter_by(user_id=1, dedup_key='account-limit:3',
+                                                                            is_read=False).limit(1)),
+        ('notification retention', db.session.query(Notification.id)
+                                             .filter(Notification.is_read == True,
+                                                     Notification.timestamp < datetime(2025, 1, 1)).limit(5000)),
+        ('chat sidebar', ChatConversation.query.filter_by(user_id=user_id).order_by(ChatConversation.updated_at.desc())),
+        ('chat conversation', ChatHistory.query.filter_by(conversation_id=11).order_by(ChatHistory.timestamp.asc())),
+        ('chat history api', ChatHistory.query.filter_by(user_id=user_id, ai_provider='gemini')
+                                              .order_by(ChatHistory.timestamp.desc()).limit(50)),
+        ('library', Document.query.filter_by(is_approved=True).order_by(Document.timestamp.desc()).limit(50)),
+        ('library by type', Document.query.filter_by(is_approved=True, doc_type='exam')
+                                          .order_by(Document.timestamp.desc()).limit(50)),
+        ('duplicate upload', Document.query.filter_by(user_id=user_id, file_hash='00ff')),
+        ('upload count', Document.query.filter_by(user_id=user_id).with_entities(db.func.count())),
+        ('unlocked documents', DocumentUnlock.query.filter_by(user_id=user_id)),
+        ('document unlocked', DocumentUnlock.query.filter_by(user_id=user_id, document_id=12)),
+        ('landing feedback', Feedback.query.filter_by(is_approved=True).order_by(Feedback.created_at.desc()).limit(10)),
+        ('student sessions', TutoringSession.query.filter_by(student_id=user_id)
+                                                  .order_by(TutoringSession.created_at.desc(), TutoringSession.id.desc())
+                                                  .limit(21)),
+        ('student sessions page', TutoringSession.query.filter_by(student_id=user_id)
+                                                       .filter(tuple_(TutoringSession.created_at, TutoringSession.id)
+                                                               < tuple_(datetime(2030, 1, 1), 500))
+                                                       .order_by(TutoringSession.created_at.desc(), TutoringSession.id.desc())
+                                                       .limit(21)),
+        ('managed users', User.query.filter_by(manager_id=50)),
+        ('login by email', User.query.filter(User.email == 'user7@example.com')),
+        ('admins', User.query.filter_by(role='admin')),
+        ('my service accounts', ServiceAccount.query.filter_by(owner_id=50)),
+        # stats.py (filling in a daily_stats row)
+        ('day signups', User.query.filter(User.created_at >= today, User.created_at < today + timedelta(days=1))
+                                  .with_entities(db.func.count())),
+        ('day tutor signups', Tutor.query.filter(Tutor.created_at >= today, Tutor.created_at < today + timedelta(days=1))
+                                         .with_entities(db.func.count())),
+        # payments.py
+        ('active subscription', Subscription.query.filter_by(user_id=user_id, is_active=True)),
+        # tutoring.py
+        ('tutor recent sessions', TutoringSession.query.filter_by(tutor_id=tutor_id)
+                                                       .order_by(TutoringSession.created_at.desc()).limit(10)),
+        ('tutor pending sessions', TutoringSession.query.filter_by(tutor_id=tutor_id, status='pending')
+                                                        .order_by(TutoringSession.created_at.desc())),
+        ('tutor reviews', TutoringSession.query.filter(TutoringSession.tutor_id == tutor_id,
+                                                       TutoringSession.student_rating.isnot(None))
+                                               .order_by(TutoringSession.created_at.desc()).limit(10)),
+        ('tutor upcoming classes', SchoolClass.query.filter_by(teacher_id=tutor_id)
+                                                    .filter(SchoolClass.scheduled_date >= today)
+                                                    .order_by(SchoolClass.scheduled_date, SchoolClass.start_time)),
+        # school.py
+        ('grade timetable', SchoolClass.query.filter_by(grade_id=grade_id)
+                                             .order_by(SchoolClass.scheduled_date, SchoolClass.start_time)),
+        ("today's classes", SchoolClass.query.filter_by(grade_id=grade_id, scheduled_date=today)
+                                             .order_by(SchoolClass.start_time)),
+        ('attendance record', ClassAttendance.query.filter_by(class_id=12, student_id=user_id)),
+        ('attendance count', ClassAttendance.query.filter_by(class_id=12).with_entities(db.func.count())),
+        # video_courses.py
+        ('course purchases', db.session.query(CoursePurchase.course_id)
+                                       .filter(CoursePurchase.user_id == user_id,
+                                               CoursePurchase.course_id.in_([1, 2, 3]))),
+        ('course videos', CourseVideo.query.filter_by(course_id=4).order_by(CourseVideo.display_order)),
+    ]
+
+
+def explain(query):
+    """Returns: list of plan lines"""
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    if db.engine.dialect.name == 'sqlite':
+        return [row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+    return [row[0] for row in db.session.execute(text('EXPLAIN ' + sql))]
+
+
+def full_scans(plan):
+    """Tables read without an index, according to the plan"""
+    if db.engine.dialect.name == 'sqlite':
+        # "SCAN job" is a full scan; "SCAN job USING INDEX ..." walks an index in order
+        return [m.group(1) for m in (re.match(r'SCAN (\w+)$', line.strip()) for line in plan) if m]
+    return [m.group(1) for m in (re.search(r'Seq Scan on (\w+)', line) for line in plan) if m]
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    with app.app_context():
+        if not args.no_seed:
+            upgrade()
+            seed()
+        if db.engine.dialect.name == 'sqlite':
+            db.session.execute(text('ANALYZE'))
+        else:
+            db.session.execute(text('SET enable_seqscan = off'))
+
+        failures = []
+        for name, query in hot_queries():
+            plan = explain(query)
+            scans = full_scans(plan)
+            sorts = any('TEMP B-TREE' in line or line.strip().startswith('Sort') for line in plan)
+            status = 'FULL SCAN ' + ', '.join(scans) if scans else 'ok' + (' (sorts)' if sorts else '')
+            print(f"{name:<28}{status}")
+            if args.verbose or scans:
+                for line in plan:
+                    print(f"    {line}")
+            if scans:
+                failures.append(name)
+        db.session.rollback()
+
+    if failures:
+        print(f"\n{len(failures)} hot queries do a full scan: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nAll hot queries use an index")
+
+
+if __name__ == '__main__':
+    main()
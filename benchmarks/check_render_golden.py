@@ -0,0 +1,70 @@
+"""
+Golden-output check for the Chegg solution renderer (mayank.AnswerGenerator).
+
+Renders every benchmarks/fixtures/solutions/*.json question_data fixture with
+generate_html_string and compares it byte-for-byte to the stored .html next to it.
+Run it before and after touching mayank.py; regenerate the goldens with --update
+only when an output change is intended (and bump solution_cache.RENDER_VERSION).
+
+Usage (from the repo root):
+    python benchmarks/check_render_golden.py [--update]
+"""
+import os
+import sys
+import glob
+import json
+import difflib
+import argparse
+import logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures', 'solutions')
+
+from mayank import answer_generator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--update', action='store_true', help='rewrite the golden .html files')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    failures = 0
+    for path in sorted(glob.glob(os.path.join(FIXTURES, '*.json'))):
+        name = os.path.basename(path)[:-5]
+        golden_path = path[:-5] + '.html'
+        with open(path, encoding='utf-8') as f:
+            question_data = json.load(f)
+        html = answer_generator.generate_html_string(question_data)
+
+        if args.update:
+            with open(golden_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(html)
+            print(f"  updated  {name}")
+            continue
+
+        try:
+            with open(golden_path, encoding='utf-8', newline='') as f:
+                expected = f.read()
+        except OSError:
+            print(f"  MISSING  {name} (run with --update)")
+            failures += 1
+            continue
+
+        if html == expected:
+            print(f"  ok       {name} ({len(html)} bytes)")
+        else:
+            failures += 1
+            print(f"  CHANGED  {name}")
+            diff = difflib.unified_diff(expected.splitlines(), html.splitlines(), 'golden', 'rendered', lineterm='', n=1)
+            for line in list(diff)[:20]:
+                print(f"           {line[:160]}")
+
+    if failures:
+        print(f"\n{failures} fixture(s) differ from the golden output")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
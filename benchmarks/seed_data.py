@@ -0,0 +1,376 @@
+"""
+Load-test dataset generator.
+
+Fills an empty database (migrated with `flask db upgrade`) with synthetic rows
+for every model in models.py plus school.GlobalSubject, at one of the SCALES
+below or at custom counts. Rows are inserted in batches with executemany, and
+ids are assigned here so foreign keys line up without lookups.
+
+Fixed accounts for benchmarks (password "bench" for all three):
+    id 1  bench_super    super_admin
+    id 2  bench_admin    admin, manages every 20th user
+    id 3  bench_student  student on the school plan, enrolled in grade 1, with enough
+                         wallet credits for any number of benchmark requests
+Every other row is spread over all users at random (seeded, so runs repeat).
+
+Usage (from the repo root):
+    python benchmarks/seed_data.py --database-url sqlite:////tmp/load.db --scale large
+    python benchmarks/seed_data.py --database-url postgresql://... --users 50000 --jobs 200000
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+from datetime import datetime, date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Row counts of the big tables; the others are derived from these
+SCALES = {
+    'small': {'users': 1000, 'jobs': 10000, 'chat_messages': 5000},
+    'medium': {'users': 10000, 'jobs': 100000, 'chat_messages': 50000},
+    'large': {'users': 100000, 'jobs': 1000000, 'chat_messages': 500000},
+}
+
+BATCH_SIZE = 5000
+
+SUPER_ADMIN_ID, ADMIN_ID, STUDENT_ID = 1, 2, 3
+BENCH_PASSWORD = 'bench'
+
+SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'English', 'History', 'Economics', 'Computer Science']
+CATEGORIES = ['math', 'physics', 'chemistry', 'biology', 'coding', 'writing', 'general']
+JOB_STATUSES = ['Completed', 'Completed', 'Completed', 'Pending', 'Failed', 'Solved']
+WORDS = ('derivative integral velocity molecule enzyme equation matrix theorem circuit essay market '
+         'photosynthesis algorithm momentum voltage probability reaction cell economy revolution').split()
+
+
+def derived_counts(users, jobs, chat_messages):
+    return {
+        'users': users,
+        'jobs': jobs,
+        'chat_messages': chat_messages,
+        'conversations': max(1, chat_messages // 8),
+        'notifications': jobs // 2,
+        'documents': max(50, users // 5),
+        'unlocks': users,
+        'feedback': max(10, users // 50),
+        'tutors': max(10, users // 200),
+        'tutoring_sessions': max(50, users // 4),
+        'grades': 12,
+        'classes': max(100, users // 20),
+        'attendance': max(200, users // 2),
+        'subscriptions': max(3, users // 4),
+        'courses': 40,
+        'course_purchases': max(20, users // 10),
+        'quiz_questions': 2000,
+        'quiz_attempts': max(20, users // 5),
+        'service_accounts': 30,
+        'ledger_entries': jobs // 4,
+    }
+
+
+def _text(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+class Seeder:
+    def __init__(self, db, counts, seed=42, verbose=True):
+        self.db = db
+        self.c = counts
+        self.rng = random.Random(seed)
+        self.now = datetime.utcnow()
+        self.verbose = verbose
+
+    def when(self, days=180):
+        return self.now - timedelta(seconds=self.rng.randint(0, days * 86400))
+
+    def user(self):
+        return self.rng.randint(1, self.c['users'])
+
+    def insert(self, model, rows):
+        """Insert a row generator in batches. Returns: rows inserted"""
+        from sqlalchemy import insert
+        start = time.perf_counter()
+        total = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                self.db.session.execute(insert(model), batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            self.db.session.execute(insert(model), batch)
+            total += len(batch)
+        self.db.session.commit()
+        if self.verbose:
+            print(f"  {model.__tablename__:<24}{total:>10} rows  {time.perf_counter() - start:>7.1f}s")
+        return total
+
+    # ─── Reference data ─────────────────────────────────────────────────
+    def seed_school(self):
+        from models import Grade, Subject
+        from school import GlobalSubject
+        self.insert(GlobalSubject, ({'id': i, 'name': name} for i, name in enumerate(SUBJECTS, 1)))
+        self.insert(Grade, ({'id': i, 'name': f'Class {i}', 'display_order': i} for i in range(1, self.c['grades'] + 1)))
+        self.subject_ids = {}
+        rows = []
+        for grade_id in range(1, self.c['grades'] + 1):
+            for name in SUBJECTS[:6]:
+                rows.append({'id': len(rows) + 1, 'grade_id': grade_id, 'name': name})
+                self.subject_ids.setdefault(grade_id, []).append(len(rows))
+        self.insert(Subject, iter(rows))
+
+    def seed_users(self):
+        from models import User, Subscription
+        from werkzeug.security import generate_password_hash
+        password = generate_password_hash(BENCH_PASSWORD)
+        n_subs = self.c['subscriptions']
+        fixed = {SUPER_ADMIN_ID: ('bench_super', 'super_admin'), ADMIN_ID: ('bench_admin', 'admin'),
+                 STUDENT_ID: ('bench_student', 'user')}
+
+        def users():
+            for i in range(1, self.c['users'] + 1):
+                username, role = fixed.get(i, (f'student{i}', 'user'))
+                yield {
+                    'id': i, 'username': username, 'password': password, 'role': role,
+                    'credits': 1000000 if i == STUDENT_ID else self.rng.randint(0, 10), 'email': f'{username}@example.com',
+                    'full_name': f'Student {i}', 'manager_id': ADMIN_ID if i % 20 == 0 and i > 3 else None,
+                    'grade_id': 1 if i == STUDENT_ID else self.rng.randint(1, self.c['grades']),
+                    # Users 3..n_subs+2 hold subscription id (user id - 2)
+                    'active_subscription_id': i - 2 if 3 <= i < n_subs + 3 else None,
+                    'student_type': 'grade', 'is_verified': True, 'created_at': self.when(365),
+                }
+        self.insert(User, users())
+
+        plans = [('basic_299', 10, 10, 20), ('pro_499', 10, 15, 30), ('school_1200', 10, 20, 20)]
+        def subscriptions():
+            for sub_id in range(1, n_subs + 1):
+                plan_type, tutor, expert, ai = plans[2] if sub_id == 1 else self.rng.choice(plans)
+                start = self.when(25)
+                yield {
+                    'id': sub_id, 'user_id': sub_id + 2, 'plan_type': plan_type, 'start_date': start,
+                    'end_date': start + timedelta(days=30), 'is_active': True,
+                    'tutor_credits': tutor, 'expert_credits': expert, 'ai_credits': ai,
+                    'tutor_credits_used': self.rng.randint(0, tutor), 'expert_credits_used': self.rng.randint(0, expert),
+                    'ai_credits_used': self.rng.randint(0, ai),
+                }
+        self.insert(Subscription, subscriptions())
+
+    # ─── Activity ───────────────────────────────────────────────────────
+    def seed_accounts_and_jobs(self):
+        from models import ServiceAccount, Job, Notification
+        self.insert(ServiceAccount, ({'id': i, 'name': f'chegg{i}', 'cookie_data': json.dumps({'session': f'c{i}'}),
+                                      'owner_id': SUPER_ADMIN_ID if i % 3 else ADMIN_ID,
+                                      'questions_posted': self.rng.randint(0, 20)}
+                                     for i in range(1, self.c['service_accounts'] + 1)))
+
+        def jobs():
+            for _ in range(self.c['jobs']):
+                status = self.rng.choice(JOB_STATUSES)
+                yield {'user_id': self.user(), 'subject': self.rng.choice(SUBJECTS), 'content': _text(self.rng, 20),
+                       'status': status, 'result_message': 'Question posted' if status != 'Failed' else 'Posting Error',
+                       'timestamp': self.when(), 'service_account_name': f'chegg{self.rng.randint(1, 30)}',
+                       'chegg_link': 'https://www.chegg.com/homework-help/questions-and-answers/q123'}
+        self.insert(Job, jobs())
+
+        self.insert(Notification, ({'user_id': self.user(), 'message': f'Solution Ready: {self.rng.choice(SUBJECTS)}',
+                                    'link': '/dashboard', 'is_read': self.rng.random() < 0.7, 'timestamp': self.when()}
+                                   for _ in range(self.c['notifications'])))
+        # Bulk inserts bypass notifications.notify(), so fill in the unread counters
+        from notifications import sync_unread_counts
+        sync_unread_counts()
+        self.db.session.commit()
+
+    def seed_chat(self):
+        from models import ChatConversation, ChatHistory, TrendingCategory, TrendingQuestion, JobCursor
+        n_conv = self.c['conversations']
+        conv_users = [self.user() for _ in range(n_conv)]
+        self.insert(ChatConversation, ({'id': i, 'user_id': conv_users[i - 1], 'title': _text(self.rng, 5),
+                                        'created_at': self.when(), 'updated_at': self.when(30)}
+                                       for i in range(1, n_conv + 1)))
+
+        def messages():
+            for i in range(1, self.c['chat_messages'] + 1):
+                conv_id = self.rng.randint(1, n_conv)
+                yield {'id': i, 'user_id': conv_users[conv_id - 1], 'conversation_id': conv_id, 'ai_provider': 'ai_tutor',
+                       'question': f'Explain {_text(self.rng, 6)}', 'answer': _text(self.rng, 80),
+                       'category': self.rng.choice(CATEGORIES), 'timestamp': self.when()}
+        self.insert(ChatHistory, messages())
+
+        # Trending tables as refresh_trending() leaves them after catching up
+        self.insert(TrendingCategory, ({'category': cat, 'count': self.c['chat_messages'] // len(CATEGORIES)}
+                                       for cat in CATEGORIES))
+        today = date.today()
+        def trending():
+            for day in range(7):
+                for k in range(50):
+                    question = f'Explain {WORDS[k % len(WORDS)]} {k}'
+                    yield {'day': today - timedelta(days=day), 'question': question, 'category': CATEGORIES[k % len(CATEGORIES)],
+                           'question_hash': hashlib.sha256(f'{day}-{question}'.encode()).hexdigest(),
+                           'count': self.rng.randint(1, 40)}
+        self.insert(TrendingQuestion, trending())
+        self.insert(JobCursor, iter([{'name': 'trending', 'last_id': self.c['chat_messages']}]))
+
+    def seed_library(self):
+        from models import Document, DocumentUnlock, Feedback
+        n_docs = self.c['documents']
+        self.insert(Document, ({'id': i, 'user_id': self.user(), 'title': f'{self.rng.choice(SUBJECTS)} {_text(self.rng, 4)}',
+                                'description': _text(self.rng, 25), 'doc_type': self.rng.choice(['notes', 'exam', 'paper', 'assignment']),
+                                'file_path': f'uploads/library/doc{i}.pdf', 'file_type': 'pdf',
+                                'extracted_text': _text(self.rng, 200), 'downloads': self.rng.randint(0, 500),
+                                'is_approved': self.rng.random() < 0.95, 'timestamp': self.when(),
+                                'file_hash': hashlib.sha256(f'doc{i}'.encode()).hexdigest()}
+                               for i in range(1, n_docs + 1)))
+        self.insert(DocumentUnlock, ({'user_id': self.user(), 'document_id': self.rng.randint(1, n_docs), 'timestamp': self.when()}
+                                     for _ in range(self.c['unlocks'])))
+        self.insert(Feedback, ({'user_id': self.user(), 'content': _text(self.rng, 15), 'rating': self.rng.randint(3, 5),
+                                'is_approved': self.rng.random() < 0.6, 'created_at': self.when()}
+                               for _ in range(self.c['feedback'])))
+
+    def seed_tutoring(self):
+        from models import Tutor, TutoringSession, SchoolClass, ClassAttendance
+        n_tutors = self.c['tutors']
+        self.insert(Tutor, ({'id': i, 'email': f'tutor{i}@example.com', 'password': 'x', 'full_name': f'Tutor {i}',
+                             'display_name': f'Tutor {i}', 'bio': _text(self.rng, 30), 'subjects': ', '.join(self.rng.sample(SUBJECTS, 3)),
+                             'teaching_grades': 'Class 9, Class 10, Higher Education', 'is_approved': i % 10 != 0,
+                             'is_available': self.rng.random() < 0.5, 'rating': round(self.rng.uniform(3.5, 5), 1),
+                             'created_at': self.when(365)}
+                            for i in range(1, n_tutors + 1)))
+        self.insert(TutoringSession, ({'room_id': f'room-{i}', 'student_id': self.user(), 'tutor_id': self.rng.randint(1, n_tutors),
+                                       'question': _text(self.rng, 12), 'subject': self.rng.choice(SUBJECTS),
+                                       'status': self.rng.choice(['pending', 'active', 'completed', 'completed', 'completed']),
+                                       'duration_minutes': self.rng.randint(0, 60), 'credits_paid': 1,
+                                       'student_rating': self.rng.choice([None, 3, 4, 5, 5]), 'created_at': self.when()}
+                                      for i in range(self.c['tutoring_sessions'])))
+
+        today = date.today()
+        def classes():
+            for i in range(1, self.c['classes'] + 1):
+                grade_id = self.rng.randint(1, self.c['grades'])
+                hour = self.rng.randint(8, 17)
+                yield {'id': i, 'grade_id': grade_id, 'subject_id': self.rng.choice(self.subject_ids[grade_id]),
+                       'teacher_id': self.rng.randint(1, n_tutors), 'room_id': f'class-{i}',
+                       'status': 'upcoming', 'scheduled_date': today + timedelta(days=self.rng.randint(-60, 30)),
+                       'start_time': f'{hour:02d}:00', 'end_time': f'{hour + 1:02d}:00'}
+        self.insert(SchoolClass, classes())
+        self.insert(ClassAttendance, ({'class_id': self.rng.randint(1, self.c['classes']), 'student_id': self.user(),
+                                       'joined_at': self.when(), 'duration_minutes': self.rng.randint(5, 60)}
+                                      for _ in range(self.c['attendance'])))
+
+    def seed_payments(self):
+        from models import Transaction, CreditLedger, VideoCourse, CourseVideo, CoursePurchase
+        n_subs = self.c['subscriptions']
+        self.insert(Transaction, ({'user_id': sub_id + 2, 'amount': 299.0, 'provider': 'stripe',
+                                   'transaction_id': f'txn_{sub_id}', 'created_at': self.when(30)}
+                                  for sub_id in range(1, n_subs + 1)))
+        self.insert(CreditLedger, ({'user_id': self.user(), 'entry_type': 'charge', 'source': 'wallet', 'amount': -1,
+                                    'reason': 'Unblur', 'created_at': self.when()}
+                                   for _ in range(self.c['ledger_entries'])))
+
+        n_courses = self.c['courses']
+        self.insert(VideoCourse, ({'id': i, 'title': f'{SUBJECTS[i % len(SUBJECTS)]} Masterclass {i}', 'description': _text(self.rng, 20),
+                                   'price': 0 if i % 8 == 0 else 499, 'display_order': i, 'created_by': SUPER_ADMIN_ID}
+                                  for i in range(1, n_courses + 1)))
+        self.insert(CourseVideo, ({'course_id': course_id, 'title': f'Lesson {k}', 'file_path': f'uploads/courses/{course_id}/{k}.mp4',
+                                   'file_size_mb': 120.0, 'duration_seconds': 900, 'display_order': k}
+                                  for course_id in range(1, n_courses + 1) for k in range(1, 11)))
+        self.insert(CoursePurchase, ({'user_id': self.user(), 'course_id': self.rng.randint(1, n_courses), 'amount_paid': 499.0,
+                                      'transaction_id': f'course_{i}'}
+                                     for i in range(self.c['course_purchases'])))
+
+    def seed_quizzes(self):
+        from models import QuizQuestion, QuizSession, QuizSessionQuestion, QuizAttempt, QuizResponse
+        n_questions = self.c['quiz_questions']
+        question_subject = {}
+        def questions():
+            for i in range(1, n_questions + 1):
+                subject = SUBJECTS[i % len(SUBJECTS)]
+                question_subject[i] = subject
+                yield {'id': i, 'subject': subject, 'grade': f'Class {i % 12 + 1}', 'difficulty': 'hard',
+                       'question': f'Q{i}: {_text(self.rng, 15)}?',
+                       'options_json': json.dumps({'A': 'one', 'B': 'two', 'C': 'three', 'D': 'four'}),
+                       'answer': self.rng.choice('ABCD'), 'explanation': _text(self.rng, 20),
+                       'content_hash': hashlib.sha256(f'quiz{i}'.encode()).hexdigest()}
+        self.insert(QuizQuestion, questions())
+
+        n_attempts = self.c['quiz_attempts']
+        owners = [self.user() for _ in range(n_attempts)]
+        subjects = [self.rng.choice(SUBJECTS) for _ in range(n_attempts)]
+        picks = [self.rng.sample(range(1, n_questions + 1), 10) for _ in range(n_attempts)]
+        self.insert(QuizSession, ({'id': i, 'user_id': owners[i - 1], 'subject': subjects[i - 1], 'grade': 'Class 10',
+                                   'start_time': self.when(), 'is_completed': True} for i in range(1, n_attempts + 1)))
+        self.insert(QuizSessionQuestion, ({'session_id': i, 'question_id': q, 'position': pos}
+                                          for i in range(1, n_attempts + 1) for pos, q in enumerate(picks[i - 1])))
+        self.insert(QuizAttempt, ({'id': i, 'user_id': owners[i - 1], 'subject': subjects[i - 1], 'score': self.rng.randint(0, 10),
+                                   'total_questions': 10, 'timestamp': self.when()} for i in range(1, n_attempts + 1)))
+        self.insert(QuizResponse, ({'attempt_id': i, 'user_id': owners[i - 1], 'question_id': q, 'subject': subjects[i - 1],
+                                    'position': pos, 'user_ans': self.rng.choice('ABCD'), 'is_correct': self.rng.random() < 0.6}
+                                   for i in range(1, n_attempts + 1) for pos, q in enumerate(picks[i - 1])))
+
+    def run(self):
+        start = time.perf_counter()
+        self.seed_school()
+        self.seed_users()
+        self.seed_accounts_and_jobs()
+        self.seed_chat()
+        self.seed_library()
+        self.seed_tutoring()
+        self.seed_payments()
+        self.seed_quizzes()
+        if self.db.engine.dialect.name == 'postgresql':
+            # Explicit ids don't advance the serial sequences
+            from sqlalchemy import text
+            for table in self.db.metadata.sorted_tables:
+                if 'id' in table.c and table.c.id.autoincrement:
+                    self.db.session.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), "
+                        f"COALESCE((SELECT MAX(id) FROM \"{table.name}\"), 1))"))
+            self.db.session.commit()
+        if self.verbose:
+            print(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+
+def seed(db, counts, seed=42, verbose=True):
+    """Fill an empty, migrated database (needs an app context)"""
+    from models import User
+    if db.session.query(User.id).first() is not None:
+        raise RuntimeError("Database already has users; seed an empty database")
+    Seeder(db, counts, seed=seed, verbose=verbose).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--jobs', type=int)
+    parser.add_argument('--chat-messages', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-migrate', action='store_true', help="don't run flask db upgrade first")
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url
+    from flask_migrate import upgrade
+    from app import app
+    from models import db
+
+    base = dict(SCALES[args.scale])
+    for key in ('users', 'jobs', 'chat_messages'):
+        if getattr(args, key) is not None:
+            base[key] = getattr(args, key)
+    counts = derived_counts(**base)
+
+    with app.app_context():
+        if not args.no_migrate:
+            upgrade()
+        seed(db, counts, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
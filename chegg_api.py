@@ -6,7 +6,10 @@ import os
 import re
 from typing import Dict, Any, List
 from bs4 import BeautifulSoup
-from models import db, User, Notification
+from models import db, User
+from notifications import notify, dedup_key_for
+import perf
+import metrics
 
 # --- NOTIFICATION & CHECKER HELPERS ---
 
@@ -18,17 +21,9 @@ def notify_super_admin(message, link=None):
         # We assume ID 1 is the "Main Main" admin/owner
         admin = User.query.get(1) 
         if admin:
-            # Check if we recently sent this exact alert to avoid spamming 100 times
-            exists = Notification.query.filter_by(
-                user_id=admin.id, 
-                message=message, 
-                is_read=False
-            ).first()
-            
-            if not exists:
+            # The dedup key skips this exact alert while the last one is still unread (avoids spamming 100 times)
+            if notify(admin.id, message, link, dedup_key=dedup_key_for(message)) is not None:
                 print(f"🚨 ALERTING ADMIN: {message}")
-                notif = Notification(user_id=admin.id, message=message, link=link)
-                db.session.add(notif)
                 db.session.commit()
     except Exception as e:
         print(f"Failed to notify admin: {e}")
@@ -47,9 +42,9 @@ def check_if_solved(chegg_url):
     }
     
     try:
-        print(f"🕵️ DEBUG: Checking URL: {chegg_url}")
+        perf.debug(f"Checking URL: {chegg_url}")
         response = requests.get(chegg_url, headers=headers, timeout=15)
-        print(f"🕵️ DEBUG: Status Code: {response.status_code}")
+        perf.debug(f"Status Code: {response.status_code}")
         
         page_text = response.text.lower()
         
@@ -58,8 +53,10 @@ def check_if_solved(chegg_url):
            "captcha" in page_text or \
            "verify you are human" in page_text or \
            "access denied" in page_text:
-            print(f"⚠️ DEBUG: Captcha detected!")
+            perf.debug("Captcha detected!")
+            metrics.record_chegg_request(None, 'check', captcha=True)
             return 'CAPTCHA'
+        metrics.record_chegg_request(None, 'check')
 
         soup = BeautifulSoup(response.text, 'html.parser')
         
@@ -69,7 +66,7 @@ def check_if_solved(chegg_url):
         if json_ld_script:
             try:
                 data = json.loads(json_ld_script.string)
-                # print(f"🕵️ DEBUG: Found JSON-LD") # Uncomment if needed
+                # perf.debug("Found JSON-LD") # Uncomment if needed
                 
                 # The JSON-LD usually defines a QAPage with a mainEntity of type Question
                 question_data = data.get('mainEntity', {})
@@ -78,36 +75,36 @@ def check_if_solved(chegg_url):
                     # Check "answerCount"
                     answer_count = question_data.get('answerCount', 0)
                     if answer_count > 0:
-                        print(f"✅ DEBUG: Solved (JSON-LD answerCount: {answer_count})")
+                        perf.debug(f"Solved (JSON-LD answerCount: {answer_count})")
                         return 'SOLVED'
                         
                     # Check "acceptedAnswer" object presence
                     if question_data.get('acceptedAnswer'):
-                       print(f"✅ DEBUG: Solved (JSON-LD acceptedAnswer found)")
+                       perf.debug("Solved (JSON-LD acceptedAnswer found)")
                        return 'SOLVED'
                        
                     # If we found the Question object but no answer indicators, it's Unsolved
-                    print(f"⏳ DEBUG: Unsolved (JSON-LD present but no answer)")
+                    perf.debug("Unsolved (JSON-LD present but no answer)")
                     return 'UNSOLVED'
                     
             except json.JSONDecodeError:
-                print(f"❌ DEBUG: JSON-LD Decode Error")
+                perf.debug("JSON-LD Decode Error")
                 pass # Fallback to text search if JSON parsing fails
 
         # --- 3. TEXT FALLBACK ---
         if "this question hasn't been solved yet" in page_text or \
            "we don't have a solution for this question" in page_text:
-            print(f"⏳ DEBUG: Unsolved (Text Match)")
+            perf.debug("Unsolved (Text Match)")
             return 'UNSOLVED'
 
         if "expert answer" in page_text or "best answer" in page_text:
              # Verify it's not "Get an expert answer" (upsell)
              if "get an expert answer" not in page_text:
-                 print(f"✅ DEBUG: Solved (Text Match: 'expert answer')")
+                 perf.debug("Solved (Text Match: 'expert answer')")
                  return 'SOLVED'
              
         # If we are unsure, return Unsolved so we check again.
-        print(f"⏳ DEBUG: Unsolved (Fallback - No positive match)")
+        perf.debug("Unsolved (Fallback - No positive match)")
         return 'UNSOLVED'
 
     except Exception as e:
@@ -217,9 +214,11 @@ def safe_post(url: str, headers: Dict[str, str], payload: Dict[str, Any], proxy:
             
         if resp.status_code in [200, 201]:
             return resp.status_code, resp.json()
+        metrics.CHEGG_POST_FAILURES.labels(proxy=metrics.proxy_label(proxy), reason=f'http_{resp.status_code}').inc()
         return resp.status_code, resp.text
     except Exception as e:
         print(f"[API ERROR] Connection Failed (Proxy used: {proxy}): {e}")
+        metrics.CHEGG_POST_FAILURES.labels(proxy=metrics.proxy_label(proxy), reason='connection').inc()
         return None, str(e)
 
 # --- FEATURE 1.5: GET MY QUESTIONS (Fallback) ---
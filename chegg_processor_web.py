@@ -3,10 +3,21 @@ import json
 import re
 import logging
 from bs4 import BeautifulSoup
+import perf
+import metrics
 
 # Configure logging
 logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
 
+
+class FetchError(str):
+    """Error message that also says why the fetch failed (kind: an account_scheduler error kind or None)"""
+    def __new__(cls, message, kind=None):
+        error = super().__new__(cls, message)
+        error.kind = kind
+        return error
+
+
 class CheggProcessorWeb:
     def __init__(self):
         self.base_url = "https://gateway.chegg.com/one-graph/graphql"
@@ -66,17 +77,20 @@ class CheggProcessorWeb:
             
         return None
 
-    def get_question_data(self, url, cookie_data, proxy=None):
-        """Main entry point to fetch question data."""
+    def get_question_data(self, url, cookie_data, proxy=None, question_id=None):
+        """
+        Main entry point to fetch question data.
+        question_id: UUID already resolved by the caller (e.g. a cached legacy ID), skips URL parsing
+        """
         session = self._get_session(cookie_data, proxy)
-        question_id = self.extract_uuid_from_url(url)
+        question_id = question_id or self.extract_uuid_from_url(url)
         
         if not question_id:
             return None, "Invalid URL format."
 
         # 1. Handle Legacy IDs (Numeric)
         if question_id.isdigit():
-            print(f"DEBUG: Processing Legacy ID: {question_id}")
+            perf.debug(f"Processing Legacy ID: {question_id}")
             
             # Method A: Try API Conversion (Often fails now)
             payload = {
@@ -90,11 +104,11 @@ class CheggProcessorWeb:
                 new_uuid = data.get('data', {}).get('questionByLegacyId', {}).get('uuid')
                 
                 if new_uuid:
-                    print(f"DEBUG: API Conversion Success -> {new_uuid}")
+                    perf.debug(f"API Conversion Success -> {new_uuid}")
                     question_id = new_uuid
                 else:
                     # Method B: Scrape Page for UUID (Robust Fallback)
-                    print("DEBUG: API Conversion failed. Scraping page source...")
+                    perf.debug("API Conversion failed. Scraping page source...")
                     page_headers = session.headers.copy()
                     page_headers['Accept'] = 'text/html,application/xhtml+xml'
                     page_resp = session.get(url, headers=page_headers, timeout=15)
@@ -115,7 +129,7 @@ class CheggProcessorWeb:
                             break
                     
                     if found_uuid:
-                        print(f"DEBUG: Scrape Success -> {found_uuid}")
+                        perf.debug(f"Scrape Success -> {found_uuid}")
                         question_id = found_uuid
                     else:
                         return None, "Could not resolve Legacy ID to UUID (Page Scrape failed)."
@@ -124,7 +138,7 @@ class CheggProcessorWeb:
                 return None, f"Legacy ID Resolution Error: {str(e)}"
 
         # 2. Fetch Question Data (Using NEW Hashes)
-        print(f"DEBUG: Fetching content for UUID: {question_id}")
+        perf.debug(f"Fetching content for UUID: {question_id}")
         
         # ATTEMPT 1: QnaById (New Hash)
         payload_primary = {
@@ -140,18 +154,19 @@ class CheggProcessorWeb:
         
         try:
             resp = session.post(self.base_url, json=payload_primary, timeout=15)
+            metrics.record_chegg_request(proxy, 'question', captcha=resp.status_code == 403)
             
             if resp.status_code == 401:
-                return None, "Account Cookie Expired"
+                return None, FetchError("Account Cookie Expired", kind='cookie_expired')
             if resp.status_code == 403:
-                return None, "Account Blocked (Captcha)"
+                return None, FetchError("Account Blocked (Captcha)", kind='blocked')
                 
             data = resp.json()
             q_data = data.get('data', {}).get('questionByUuid', {})
 
             # ATTEMPT 2: QuestionByUuidAuthorId (New Hash - Fallback)
             if not q_data:
-                print("DEBUG: Primary query empty, trying Fallback (AuthorId)...")
+                perf.debug("Primary query empty, trying Fallback (AuthorId)...")
                 payload_secondary = {
                     'operationName': 'QuestionByUuidAuthorId',
                     'variables': {'uuid': question_id},
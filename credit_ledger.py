@@ -0,0 +1,166 @@
+"""
+Credit ledger
+- Plan credits (Subscription.<pool>_credits_used < <pool>_credits) and wallet credits
+  (User.credits) are spent with conditional UPDATE ... RETURNING statements, so
+  concurrent requests can't overspend or lose each other's updates
+- charge() spends one credit, plan pool first and wallet second, like the old inline code
+- reserve() spends it provisionally; commit() settles it, refund() gives it back to
+  the pool/wallet it came from (also usable on a plain charge)
+- grant() adds wallet credits (admin top-ups, upload rewards)
+- Every movement is appended to credit_ledger; balances() reads the current
+  numbers in one query
+
+Each balance change and its ledger row are written in one savepoint, so a failure
+undoes only that pair and leaves the caller's other pending changes alone (a charge
+that finds no credits changes nothing). A successful movement is then committed, so
+a reservation is settled before slow work such as a Chegg fetch starts, and the user's
+entitlements snapshot is dropped so later checks in the request see the new numbers.
+"""
+
+from sqlalchemy import update, select
+from models import db, User, Subscription, CreditLedger
+import entitlements
+
+# pool -> (used column, allowance column) on Subscription
+POOLS = {
+    'ai': ('ai_credits_used', 'ai_credits'),
+    'expert': ('expert_credits_used', 'expert_credits'),
+    'tutor': ('tutor_credits_used', 'tutor_credits'),
+}
+
+
+def _active_subscription_id(user_id):
+    return select(User.active_subscription_id).where(User.id == user_id).scalar_subquery()
+
+
+def _take_plan_credit(user_id, pool):
+    """Returns: the subscription id the credit was taken from, or None if the pool is used up"""
+    used_name, allowance_name = POOLS[pool]
+    used = getattr(Subscription, used_name)
+    return db.session.execute(
+        update(Subscription)
+        .where(Subscription.id == _active_subscription_id(user_id), used < getattr(Subscription, allowance_name))
+        .values({used_name: used + 1})
+        .returning(Subscription.id)
+    ).scalar()
+
+
+def _take_wallet_credit(user_id, amount=1):
+    """Returns: the new wallet balance, or None if the wallet doesn't hold amount credits"""
+    return db.session.execute(
+        update(User)
+        .where(User.id == user_id, User.credits >= amount)
+        .values(credits=User.credits - amount)
+        .returning(User.credits)
+    ).scalar()
+
+
+def _record(user_id, entry_type, source, amount, pool=None, subscription_id=None, reason=None, ref_id=None):
+    """Ledger row for a balance change (call inside the savepoint that made the change)"""
+    entry = CreditLedger(user_id=user_id, entry_type=entry_type, source=source, amount=amount, pool=pool,
+                         subscription_id=subscription_id, reason=(reason or '')[:100] or None, ref_id=ref_id)
+    db.session.add(entry)
+    return entry
+
+
+def _settle(user_id):
+    db.session.commit()
+    entitlements.invalidate(user_id)
+
+
+def _spend(user_id, entry_type, pool, reason):
+    if pool is not None and pool not in POOLS:
+        raise ValueError(f"Unknown credit pool: {pool}")
+
+    entry = None
+    with db.session.begin_nested():
+        if pool:
+            subscription_id = _take_plan_credit(user_id, pool)
+            if subscription_id is not None:
+                entry = _record(user_id, entry_type, 'plan', -1, pool=pool, subscription_id=subscription_id, reason=reason)
+
+        if entry is None and _take_wallet_credit(user_id) is not None:
+            entry = _record(user_id, entry_type, 'wallet', -1, pool=pool, reason=reason)
+
+    if entry is None:
+        return None, "Not enough credits"
+    _settle(user_id)
+    return entry, None
+
+
+def charge(user_id, pool=None, reason=None):
+    """
+    Spend one credit: from the subscription's pool ('ai', 'expert', 'tutor') while it
+    has allowance left, else from the wallet. pool=None spends wallet credits only.
+    Returns: (ledger entry, None) or (None, error_message)
+    """
+    return _spend(user_id, 'charge', pool, reason)
+
+
+def reserve(user_id, pool=None, reason=None):
+    """
+    Like charge(), for work that can still fail: settle the returned entry with
+    commit() on success or refund() on failure.
+    Returns: (ledger entry, None) or (None, error_message)
+    """
+    return _spend(user_id, 'reserve', pool, reason)
+
+
+def commit(entry):
+    """Mark a reservation as final (the credit stays spent)"""
+    with db.session.begin_nested():
+        _record(entry.user_id, 'commit', entry.source, 0, pool=entry.pool,
+                subscription_id=entry.subscription_id, reason=entry.reason, ref_id=entry.id)
+    _settle(entry.user_id)
+
+
+def refund(entry, reason=None):
+    """Give a reserved/charged credit back to the pool or wallet it came from"""
+    with db.session.begin_nested():
+        if entry.source == 'plan':
+            used_name, _ = POOLS[entry.pool]
+            used = getattr(Subscription, used_name)
+            db.session.execute(
+                update(Subscription)
+                .where(Subscription.id == entry.subscription_id, used > 0)
+                .values({used_name: used - 1})
+            )
+        else:
+            db.session.execute(update(User).where(User.id == entry.user_id).values(credits=User.credits + 1))
+        _record(entry.user_id, 'refund', entry.source, 1, pool=entry.pool, subscription_id=entry.subscription_id,
+                reason=reason or entry.reason, ref_id=entry.id)
+    _settle(entry.user_id)
+
+
+def grant(user_id, amount, reason=None):
+    """
+    Add wallet credits.
+    Returns: the new wallet balance
+    """
+    with db.session.begin_nested():
+        balance = db.session.execute(
+            update(User).where(User.id == user_id).values(credits=User.credits + amount).returning(User.credits)
+        ).scalar()
+        _record(user_id, 'grant', 'wallet', amount, reason=reason)
+    _settle(user_id)
+    return balance
+
+
+def balances(user_id):
+    """
+    Wallet and plan credits left, read in one query.
+    Returns: {'wallet': n, 'ai': n, 'expert': n, 'tutor': n} (plan pools are 0 without a subscription)
+    """
+    columns = [User.credits]
+    for used_name, allowance_name in POOLS.values():
+        columns.append(getattr(Subscription, allowance_name) - getattr(Subscription, used_name))
+    row = db.session.query(*columns)\
+                    .outerjoin(Subscription, Subscription.id == User.active_subscription_id)\
+                    .filter(User.id == user_id).first()
+    if row is None:
+        return None
+
+    result = {'wallet': row[0] or 0}
+    for pool, left in zip(POOLS, row[1:]):
+        result[pool] = max(0, left or 0)
+    return result
@@ -0,0 +1,154 @@
+"""
+Database engine configuration
+- engine_options(uri) builds SQLALCHEMY_ENGINE_OPTIONS for the configured database:
+    SQLite:     busy timeout on connect; WAL, synchronous=NORMAL, busy_timeout and
+                mmap_size are set on every new connection (see init_engine)
+    PostgreSQL: pool size/overflow sized for the worker class, pre-ping, recycle
+                and checkout timeout
+- init_engine(app) hooks the SQLite PRAGMAs onto the engine
+- The connection pool times every checkout; pool_stats() reports checkouts,
+  time spent waiting for a connection, timeouts and the pool's current state
+
+Worker class: DB_WORKER_CLASS ('eventlet', 'gthread' or 'sync'); when unset,
+'eventlet' if eventlet has patched sockets (the Socket.IO worker), else 'gthread'.
+Every setting can be overridden with the DB_* variables below. They are read when
+engine_options() / init_engine() run, so values from .env apply.
+"""
+
+import os
+import sys
+import time
+import threading
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Defaults of the DB_* overrides
+DB_POOL_RECYCLE = 1800         # Seconds; below typical server/proxy idle timeouts
+DB_POOL_TIMEOUT = 10           # Seconds to wait for a free connection
+SQLITE_BUSY_TIMEOUT_MS = 5000
+SQLITE_MMAP_MB = 256
+
+_stats_lock = threading.Lock()
+_stats = {'checkouts': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0, 'timeouts': 0}
+_pool = None
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with _stats_lock:
+                _stats['timeouts'] += 1
+            raise
+        waited = time.perf_counter() - start
+        with _stats_lock:
+            _stats['checkouts'] += 1
+            _stats['wait_seconds'] += waited
+            if waited > _stats['max_wait_seconds']:
+                _stats['max_wait_seconds'] = waited
+        return connection
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def pool_profile(worker):
+    """
+    (pool_size, max_overflow) for a worker class. Eventlet serves many requests per
+    process on green threads, so it needs more connections than a threaded worker.
+    """
+    if worker == 'eventlet':
+        return 10, 20
+    if worker == 'sync':
+        return 2, 2  # One request at a time, plus the scheduler jobs
+    return _env_int('GUNICORN_THREADS', 4), 4
+
+
+def worker_class():
+    configured = os.getenv('DB_WORKER_CLASS')
+    if configured:
+        return configured
+    eventlet = sys.modules.get('eventlet')
+    if eventlet is not None and eventlet.patcher.is_monkey_patched('socket'):
+        return 'eventlet'
+    return 'gthread'
+
+
+def _is_sqlite(uri):
+    return uri.startswith('sqlite')
+
+
+def _is_sqlite_memory(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URI"""
+    if _is_sqlite_memory(uri):
+        return {}  # SQLAlchemy keeps in-memory databases on a single connection
+
+    pool_size, max_overflow = pool_profile(worker_class())
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': _env_int('DB_POOL_SIZE', pool_size),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', max_overflow),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', DB_POOL_TIMEOUT),
+    }
+    if _is_sqlite(uri):
+        # sqlite3's own lock wait, in seconds (busy_timeout below covers the same for PRAGMA users)
+        options['connect_args'] = {'timeout': _env_int('DB_SQLITE_BUSY_TIMEOUT_MS', SQLITE_BUSY_TIMEOUT_MS) / 1000}
+    else:
+        options['pool_pre_ping'] = True
+        options['pool_recycle'] = _env_int('DB_POOL_RECYCLE', DB_POOL_RECYCLE)
+    return options
+
+
+def _sqlite_pragmas(busy_timeout_ms, mmap_mb):
+    """'connect' listener that sets the PRAGMAs on each new SQLite connection"""
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # WAL lets readers run while the checker/scheduler threads write
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+            cursor.execute(f"PRAGMA mmap_size={mmap_mb * 1024 * 1024}")
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def init_engine(app, db):
+    """Attach per-connection setup to the app's engine (call after db.init_app)"""
+    global _pool
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite' and not _is_sqlite_memory(str(engine.url)):
+        event.listen(engine, 'connect', _sqlite_pragmas(
+            _env_int('DB_SQLITE_BUSY_TIMEOUT_MS', SQLITE_BUSY_TIMEOUT_MS),
+            _env_int('DB_SQLITE_MMAP_MB', SQLITE_MMAP_MB)))
+    _pool = engine.pool
+    print(f"[DB] {engine.dialect.name} engine, worker class {worker_class()}, pool {_pool.status()}")
+
+
+def pool_stats():
+    """Connection pool counters for this worker (since start) and the pool's current state"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['avg_wait_ms'] = round(stats['wait_seconds'] / stats['checkouts'] * 1000, 3) if stats['checkouts'] else 0.0
+    stats['max_wait_ms'] = round(stats.pop('max_wait_seconds') * 1000, 3)
+    stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+    if isinstance(_pool, QueuePool):
+        stats.update({
+            'pool_size': _pool.size(),
+            'checked_out': _pool.checkedout(),
+            'idle': _pool.checkedin(),
+            'overflow': max(0, _pool.overflow()),
+        })
+    return stats
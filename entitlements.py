@@ -0,0 +1,113 @@
+"""
+Subscription entitlements
+- for_user(user) builds one Entitlements snapshot of the user's role, wallet and
+  active plan (pools left, plan type, expiry) and keeps it on flask.g, so every
+  feature check in a request (routes, templates, video course access) reuses it
+  instead of loading the Subscription again
+- load_user joins the active subscription in, so building the snapshot for the
+  logged-in user doesn't query at all
+- invalidate(user_id) drops the snapshot after credits or the plan change
+  (credit_ledger and payments call it), the next check rebuilds it
+"""
+
+from datetime import datetime
+from flask import g, has_app_context
+
+UNLIMITED_FEATURES = ('unblur', 'notes')
+
+# feature -> credit pool on the Subscription
+FEATURE_POOLS = {
+    'ai_tutor': 'ai',
+    'expert_ask': 'expert',
+    'video_tutor': 'tutor',
+}
+
+
+class Entitlements:
+    __slots__ = ('user_id', 'role', 'student_type', 'is_verified', 'wallet',
+                 'subscription_id', 'plan_type', 'plan_end', 'pools')
+
+    def __init__(self, user):
+        self.user_id = user.id
+        self.role = user.role
+        self.student_type = user.student_type
+        self.is_verified = user.is_verified
+        self.wallet = user.credits or 0
+
+        sub = user.active_subscription if user.active_subscription_id else None
+        if sub and sub.is_active and sub.end_date >= datetime.utcnow():
+            self.subscription_id = sub.id
+            self.plan_type = sub.plan_type
+            self.plan_end = sub.end_date
+            self.pools = {
+                'ai': max(0, (sub.ai_credits or 0) - (sub.ai_credits_used or 0)),
+                'expert': max(0, (sub.expert_credits or 0) - (sub.expert_credits_used or 0)),
+                'tutor': max(0, (sub.tutor_credits or 0) - (sub.tutor_credits_used or 0)),
+            }
+        else:
+            self.subscription_id = None
+            self.plan_type = None
+            self.plan_end = None
+            self.pools = {'ai': 0, 'expert': 0, 'tutor': 0}
+
+    @property
+    def is_staff(self):
+        return self.role in ['admin', 'super_admin']
+
+    @property
+    def has_plan(self):
+        """True if the user had an active, unexpired subscription when the snapshot was built"""
+        return self.subscription_id is not None
+
+    def can_access(self, feature):
+        """Same rules as User.can_access (which delegates here)"""
+        # 1. Super Admin / Admin Bypass
+        if self.is_staff:
+            return True
+
+        # 2. Exception: Verified Disabled Students for 'school' feature
+        if feature == 'school' and self.student_type == 'disabled' and self.is_verified:
+            return True
+
+        if not self.has_plan:
+            return False
+
+        # --- SCHOOL ACCESS (only school_1200 plan) ---
+        if feature == 'school':
+            return self.plan_type == 'school_1200'
+
+        # --- UNLIMITED FEATURES (all paid plans) ---
+        if feature in UNLIMITED_FEATURES:
+            return True
+
+        # --- Credit pool OR wallet ---
+        pool = FEATURE_POOLS.get(feature)
+        if pool:
+            return self.pools[pool] > 0 or self.wallet > 0
+
+        return False
+
+
+def for_user(user):
+    """The user's snapshot for this request (built on first use)"""
+    if not has_app_context():
+        return Entitlements(user)
+
+    cache = g.setdefault('_entitlements', {})
+    snapshot = cache.get(user.id)
+    if snapshot is None:
+        snapshot = cache[user.id] = Entitlements(user)
+    return snapshot
+
+
+def invalidate(user_id=None):
+    """Forget the snapshot of one user (or of everyone) for the rest of this request"""
+    if not has_app_context():
+        return
+    cache = g.get('_entitlements')
+    if not cache:
+        return
+    if user_id is None:
+        cache.clear()
+    else:
+        cache.pop(user_id, None)
@@ -0,0 +1,255 @@
+"""
+Admin report exports
+- REPORTS: the students and tutors reports, one query each (students join their
+  active subscription in, no per-row lookups), read in batches with yield_per
+- stream_csv(report): CSV body as a generator, for a streamed Response; memory stays
+  flat whatever the row count
+- start(app, report, fmt, user_id): PDF and XLSX files are built by a background
+  worker into EXPORT_DIR; the requesting admin gets a Notification linking to
+  /admin/exports/<file> when it's ready (or when it failed)
+- Export files older than EXPORT_TTL_HOURS are removed when a new export starts
+
+Background exports yield to other green threads every EXPORT_YIELD_ROWS rows, so a
+large PDF doesn't stall the eventlet worker that builds it.
+
+EXPORT_DIR / EXPORT_TTL_HOURS / EXPORT_WORKERS are read when first needed, so
+values from .env apply.
+"""
+
+import io
+import os
+import csv
+import time
+import secrets
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from models import db, User, Subscription, Tutor
+from notifications import notify
+
+# Defaults of the EXPORT_* settings
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exports')
+EXPORT_TTL_HOURS = 24
+EXPORT_WORKERS = 1
+
+YIELD_PER = 1000          # Rows fetched per round trip
+CSV_FLUSH_ROWS = 500      # Rows per streamed CSV chunk
+EXPORT_YIELD_ROWS = 500   # Rows between cooperative yields in background exports
+
+FORMATS = ('pdf', 'xlsx')
+
+_executor = None  # Created by the first export
+_running_lock = threading.Lock()
+_running = set()  # (user_id, report, fmt)
+
+
+def export_dir():
+    return os.getenv('EXPORT_DIR', EXPORT_DIR)
+
+
+def _get_executor():
+    global _executor
+    with _running_lock:
+        if _executor is None:
+            workers = int(os.getenv('EXPORT_WORKERS', EXPORT_WORKERS))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+        return _executor
+
+
+def _student_rows():
+    query = db.session.query(User.id, User.full_name, User.username, User.student_type, User.parent_name,
+                             User.parent_phone, User.created_at, Subscription.plan_type, Subscription.is_active)\
+                      .outerjoin(Subscription, Subscription.id == User.active_subscription_id)\
+                      .filter(User.role != 'admin', User.role != 'super_admin')\
+                      .order_by(User.created_at.desc())\
+                      .execution_options(yield_per=YIELD_PER)
+    for row in query:
+        plan_name = row.plan_type.replace('_', ' ').title() if row.plan_type and row.is_active else "Free"
+        yield [
+            str(row.id),
+            row.full_name or row.username,
+            row.student_type.capitalize() if row.student_type else "General",
+            row.parent_name or "-",
+            row.parent_phone or "-",
+            plan_name,
+            row.created_at.strftime('%Y-%m-%d') if row.created_at else "-",
+        ]
+
+
+def _tutor_rows():
+    query = db.session.query(Tutor.id, Tutor.display_name, Tutor.subjects, Tutor.teaching_grades,
+                             Tutor.qualification, Tutor.is_active, Tutor.is_approved)\
+                      .order_by(Tutor.created_at.desc())\
+                      .execution_options(yield_per=YIELD_PER)
+    for row in query:
+        status = "Active" if row.is_active else "Inactive"
+        if not row.is_approved:
+            status = "Pending"
+        yield [
+            str(row.id),
+            row.display_name or "-",
+            row.subjects or "-",
+            row.teaching_grades or "-",
+            row.qualification or "-",
+            status,
+        ]
+
+
+# report -> title, column headers, PDF column widths (mm), row generator
+REPORTS = {
+    'students': {
+        'title': "Students Hub - All Students Report",
+        'headers': ["ID", "Name", "Type", "Parent", "Phone", "Active Plan", "Joined"],
+        'widths': [10, 40, 20, 30, 25, 30, 30],
+        'rows': _student_rows,
+    },
+    'tutors': {
+        'title': "Students Hub - All Tutors Report",
+        'headers': ["ID", "Name", "Subjects", "Grades", "Qualification", "Status"],
+        'widths': [10, 40, 40, 40, 30, 20],
+        'rows': _tutor_rows,
+    },
+}
+
+
+def _csv_cell(value):
+    """Keep spreadsheet apps from running user-entered text as a formula"""
+    if len(value) > 1 and value[0] in '=+-@':
+        return "'" + value
+    return value
+
+
+def stream_csv(report):
+    """Yields the report as CSV text in chunks (needs an app context for the whole iteration)"""
+    spec = REPORTS[report]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')  # BOM, so Excel reads the file as UTF-8
+    writer.writerow(spec['headers'])
+    for count, row in enumerate(spec['rows'](), 1):
+        writer.writerow([_csv_cell(value) for value in row])
+        if count % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _rows_with_yield(spec):
+    for count, row in enumerate(spec['rows'](), 1):
+        if count % EXPORT_YIELD_ROWS == 0:
+            time.sleep(0)  # Let other green threads run (a no-op without eventlet)
+        yield row
+
+
+def _write_pdf(spec, path):
+    from fpdf import FPDF
+
+    def table_header():
+        pdf.set_font("Arial", style="B", size=9)
+        for width, header in zip(spec['widths'], spec['headers']):
+            pdf.cell(width, 10, header, border=1)
+        pdf.ln()
+        pdf.set_font("Arial", size=8)
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", style="B", size=16)
+    pdf.cell(0, 10, txt=spec['title'], ln=True, align='C')
+    pdf.set_font("Arial", size=10)
+    pdf.cell(0, 10, txt=f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}", ln=True, align='C')
+    pdf.ln(10)
+    table_header()
+
+    for row in _rows_with_yield(spec):
+        if pdf.get_y() > 270:
+            pdf.add_page()
+            table_header()
+        for width, value in zip(spec['widths'], row):
+            text = str(value)
+            if len(text) > 25:
+                text = text[:22] + "..."
+            pdf.cell(width, 10, text, border=1)
+        pdf.ln()
+    pdf.output(path)
+
+
+def _write_xlsx(spec, path):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)  # Rows go straight to the file
+    sheet = workbook.create_sheet(title=spec['title'].split(' - ')[-1][:31])
+    sheet.append(spec['headers'])
+    for row in _rows_with_yield(spec):
+        sheet.append(row)
+    workbook.save(path)
+
+
+WRITERS = {'pdf': _write_pdf, 'xlsx': _write_xlsx}
+
+
+def _prune_old_exports():
+    cutoff = time.time() - int(os.getenv('EXPORT_TTL_HOURS', EXPORT_TTL_HOURS)) * 3600
+    directory = export_dir()
+    try:
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+    except OSError as e:
+        print(f"[Exports] Cleanup failed: {e}")
+
+
+def _run(app, report, fmt, user_id, filename):
+    spec = REPORTS[report]
+    path = os.path.join(export_dir(), filename)
+    label = f"{report.title()} {fmt.upper()}"
+    start = time.perf_counter()
+    with app.app_context():
+        try:
+            WRITERS[fmt](spec, path + '.part')
+            os.replace(path + '.part', path)
+            message, link = f"Export ready: {label}", f"/admin/exports/{filename}"
+            print(f"[Exports] {filename} written in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            print(f"[Exports] {label} export failed: {e}")
+            db.session.rollback()
+            if os.path.exists(path + '.part'):
+                os.remove(path + '.part')
+            message, link = f"Export failed: {label}", None
+        finally:
+            with _running_lock:
+                _running.discard((user_id, report, fmt))
+        notify(user_id, message, link)
+        db.session.commit()
+
+
+def start(app, report, fmt, user_id):
+    """
+    Queue a background PDF/XLSX export; the user is notified when it's done.
+    Returns: (filename, None) or (None, error_message)
+    """
+    if report not in REPORTS:
+        return None, "Unknown report"
+    if fmt not in FORMATS:
+        return None, "Unknown export format"
+
+    key = (user_id, report, fmt)
+    with _running_lock:
+        if key in _running:
+            return None, "This export is already being generated"
+        _running.add(key)
+
+    os.makedirs(export_dir(), exist_ok=True)
+    _prune_old_exports()
+    filename = f"{report}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(4)}.{fmt}"
+    _get_executor().submit(_run, app, report, fmt, user_id, filename)
+    return filename, None
+
+
+def file_path(filename):
+    """Path of a finished export, or None (rejects names outside EXPORT_DIR)"""
+    if os.path.basename(filename) != filename or filename.endswith('.part'):
+        return None
+    path = os.path.join(export_dir(), filename)
+    return path if os.path.isfile(path) else None
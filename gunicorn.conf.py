@@ -0,0 +1,12 @@
+"""
+gunicorn hooks, loaded automatically when gunicorn is started from the repo root
+(e.g. gunicorn -w 4 wsgi:app). Workers, bind and the worker class stay on the command line.
+"""
+import os
+
+
+def child_exit(server, worker):
+    # Drop a dead worker's live gauge files so /metrics stops adding them up (see metrics.py)
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR') or os.getenv('prometheus_multiproc_dir'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
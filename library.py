@@ -9,11 +9,16 @@ import os
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import base64
+from utils import ai_client
+import metrics
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif', 'webp'}
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB
 
+# Gemini model used for OCR and formatting
+LIBRARY_MODEL = 'gemini-1.5-flash'
+
 # Upload folder
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads', 'library')
 
@@ -52,6 +57,7 @@ def save_uploaded_file(file, user_id):
     
     try:
         file.save(file_path)
+        metrics.record_upload('library', file_path)
         return file_path, file_type, None
     except Exception as e:
         return None, None, f"Error saving file: {str(e)}"
@@ -62,17 +68,9 @@ def extract_text_with_gemini(file_path, file_type):
     Returns: (extracted_text, error)
     """
     try:
-        import google.generativeai as genai
-        from dotenv import load_dotenv
-        load_dotenv()
-        
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
+        if not ai_client.GEMINI_API_KEY:
             return None, "Gemini API key not configured"
         
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
         if file_type == 'image':
             # Read image and convert to base64
             with open(file_path, 'rb') as f:
@@ -90,10 +88,10 @@ def extract_text_with_gemini(file_path, file_type):
             mime_type = mime_types.get(ext, 'image/jpeg')
             
             # Create image part
-            image_part = {
-                "mime_type": mime_type,
+            image_part = {"inlineData": {
+                "mimeType": mime_type,
                 "data": base64.b64encode(image_data).decode('utf-8')
-            }
+            }}
             
             prompt = """Extract ALL text from this document image. 
             Preserve the structure, headings, paragraphs, and any lists.
@@ -101,8 +99,7 @@ def extract_text_with_gemini(file_path, file_type):
             If it's notes, preserve the outline structure.
             Return only the extracted text, well formatted."""
             
-            response = model.generate_content([prompt, image_part])
-            return response.text, None
+            return ai_client.gemini_generate_text(LIBRARY_MODEL, [prompt, image_part])
             
         elif file_type == 'pdf':
             # For PDF, we need to read pages as images
@@ -121,16 +118,18 @@ def extract_text_with_gemini(file_path, file_type):
                     image.save(img_byte_arr, format='PNG')
                     img_byte_arr = img_byte_arr.getvalue()
                     
-                    image_part = {
-                        "mime_type": "image/png",
+                    image_part = {"inlineData": {
+                        "mimeType": "image/png",
                         "data": base64.b64encode(img_byte_arr).decode('utf-8')
-                    }
+                    }}
                     
                     prompt = f"""Extract ALL text from page {i+1} of this document.
                     Preserve structure, headings, and formatting."""
                     
-                    response = model.generate_content([prompt, image_part])
-                    all_text.append(f"--- Page {i+1} ---\n{response.text}")
+                    page_text, error = ai_client.gemini_generate_text(LIBRARY_MODEL, [prompt, image_part])
+                    if error:
+                        return None, f"OCR Error: {error}"
+                    all_text.append(f"--- Page {i+1} ---\n{page_text}")
                 
                 return "\n\n".join(all_text), None
                 
@@ -161,17 +160,9 @@ def format_document_content(extracted_text, doc_type, title):
         return None, "No text to format"
     
     try:
-        import google.generativeai as genai
-        from dotenv import load_dotenv
-        load_dotenv()
-        
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
+        if not ai_client.GEMINI_API_KEY:
             return extracted_text, None  # Return raw text if no API
         
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
         doc_prompts = {
             'exam': f"""Format this text as a proper exam paper titled "{title}".
                 Structure it with:
@@ -201,8 +192,10 @@ def format_document_content(extracted_text, doc_type, title):
         prompt = doc_prompts.get(doc_type, doc_prompts['notes'])
         prompt += f"\n\nContent to format:\n{extracted_text[:8000]}"  # Limit text length
         
-        response = model.generate_content(prompt)
-        return response.text, None
+        formatted, error = ai_client.gemini_generate_text(LIBRARY_MODEL, [prompt])
+        if error:
+            return extracted_text, f"Formatting error: {error}"
+        return formatted, None
         
     except Exception as e:
         return extracted_text, f"Formatting error: {str(e)}"
@@ -1,57 +1,134 @@
+import os
 import json
 import html
 import re
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from bs4 import BeautifulSoup
 import traceback
 import logging
 from typing import Union
+from utils.keyword_matcher import PatternSet
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Checked in order: any complex pattern -> display math, else any simple pattern -> inline math
+COMPLEX_MATH_PATTERNS = PatternSet([r'\\frac\{[^}]+\}\{[^}]+\}', r'[A-Za-z]_[A-Za-z0-9{].*=.*\\frac', r'[A-Za-z0-9]\^[A-Za-z0-9{].*=', r'[A-Za-z]_[A-Za-z]+\s*=\s*[+-]?\s*\\frac', r'\/[A-Za-z0-9]+'])
+SIMPLE_MATH_PATTERNS = PatternSet([r'[A-Za-z]_[A-Za-z0-9{]', r'[A-Za-z0-9]\^[A-Za-z0-9{]', r'[A-Za-z]\s*=\s*[^a-z]*[0-9]', r'\\[a-zA-Z]+', r'\^[0-9]+'])
+
+# clean_math_expression rewrite chain, compiled once and applied in order.
+# Rules whose replacement equals the match (e.g. r'_([A-Za-z]{2,})' -> r'_\1') were dropped,
+# as was r'([A-Za-z]+[0-9]*)/([0-9]+)' and the trailing KN-m/N-m rule, which can no longer match
+# after the rules before them. benchmarks/check_render_golden.py guards the output.
+_BACKTICKS_RE = re.compile(r'^`+|`+$')
+_WHITESPACE_RE = re.compile(r'\s+')
+_MATH_REWRITES_PRE = [(re.compile(p), r) for p, r in [
+    (r'_\(\s*([^)]+)\s*\)', r'_\1'),
+    (r'([A-Za-z]+)\s*/\s*([A-Za-z]+-[A-Za-z]+)', r'\\text{\1}/\\text{\2}'),
+    (r'([A-Za-z]+)-([A-Za-z]+)', r'\1 \\cdot \2'),
+    (r'(\d+\.\d+)\s*\\text\{([A-Za-z]+)\}/\\text\{([A-Za-z]+ \\cdot [A-Za-z]+)\}', r'\1 \; \\frac{\\text{\2}}{\\text{\3}}'),
+]]
+_MATH_REWRITES_POST = [(re.compile(p), r) for p, r in [
+    # Key Change: Added a rule to correctly format the Omega symbol for resistance.
+    (r'([0-9])(Omega)', r'\1 \\Omega'),
+    (r'([0-9.]+)\s*(KN-m|KN|kN-m|kN|N-m|N)', r'\1 \text{\2}'),
+    (r'-\s*frac', r'-frac'),
+    (r'\(([^)]+)\)\s*/\s*(\d+)', r'frac{\1}{\2}'),
+    (r'([A-Za-z0-9]+)/([A-Za-z0-9]+)', r'frac{\1}{\2}'),
+    (r'=\s*-\s*', r' = -'),
+    (r'=\s*\+\s*', r' = +'),
+    (r'(\d+(?:\.\d+)?)\s*([A-Za-z]+-[A-Za-z]+)', r'\1 \text{\2}'),
+]]
+
+# Table cell alignment (determine_cell_alignment)
+_CURRENCY_RE = re.compile(r'^[\$\¢\£\¥\€]?[-]?\s*\d{1,3}(?:,\d{3})*(?:\.\d{2})?$')
+_PERCENT_RE = re.compile(r'^\d+(?:\.\d+)?%$')
+_NUMBER_RE = re.compile(r'^[-]?\d{1,3}(?:,\d{3})*(?:\.\d+)?$')
+_DATE_RE = re.compile(r'^\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}$')
+
+# Copy-to-clipboard LaTeX (_convert_asciimath_to_latex_for_copy)
+_LATEX_SUBSCRIPT_RE = re.compile(r'_([A-Za-z0-9]+)')
+_LATEX_SUPERSCRIPT_RE = re.compile(r'\^([A-Za-z0-9]+)')
+
+# Optional parallel rendering of large solutions (RENDER_WORKERS=0 keeps everything on the
+# request thread). Only these block types go to the pool - the rest are cheaper to render
+# than to pickle - and only when a solution has at least PARALLEL_RENDER_MIN_BLOCKS of them.
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', '0'))
+PARALLEL_RENDER_MIN_BLOCKS = int(os.getenv('PARALLEL_RENDER_MIN_BLOCKS', '12'))
+RENDER_POOL_TIMEOUT = 30
+_POOL_BLOCK_TYPES = ('DRAWING', 'CIRCUIT', 'ACCOUNTING_TABLE', 'TABLE')
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def _get_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            # spawn, not fork: the web worker has live threads/greenlets and sockets
+            _render_pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS,
+                                               mp_context=multiprocessing.get_context('spawn'))
+        return _render_pool
+
+
+def _reset_render_pool(pool):
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is pool:
+            _render_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_blocks_in_worker(blocks, mode):
+    return [answer_generator.process_block_enhanced(block, mode=mode) for block in blocks]
+
+
+def _block_key(block):
+    return hashlib.blake2b(json.dumps(block, sort_keys=True, default=str).encode('utf-8'), digest_size=16).digest()
+
+
+class HtmlBuilder:
+    """Collects HTML/SVG fragments and joins them once, instead of repeated str +="""
+    __slots__ = ('_parts',)
+
+    def __init__(self, *chunks):
+        self._parts = list(chunks)
+
+    def add(self, *chunks):
+        self._parts.extend(chunks)
+        return self
+
+    def getvalue(self) -> str:
+        return ''.join(self._parts)
+
 class AnswerGenerator:
     def __init__(self):
         self.mathjax_delimiters = {'inline': ['`', '`'], 'display': ['``', '``']}
         self.logger = logging.getLogger(__name__)
         self.symbol_map = {"(therefore)": "\\therefore", "(sigma)": "\\sigma", "(infty)": "\\infty"}
+        self.plain_symbols = [(text, latex.replace('\\', '')) for text, latex in self.symbol_map.items()]
 
     def is_mathematical_expression(self, text: str) -> bool:
         if not text or len(text.strip()) < 2: return False
-        complex_patterns = [r'\\frac\{[^}]+\}\{[^}]+\}', r'[A-Za-z]_[A-Za-z0-9{].*=.*\\frac', r'[A-Za-z0-9]\^[A-Za-z0-9{].*=', r'[A-Za-z]_[A-Za-z]+\s*=\s*[+-]?\s*\\frac', r'\/[A-Za-z0-9]+']
-        simple_patterns = [r'[A-Za-z]_[A-Za-z0-9{]', r'[A-Za-z0-9]\^[A-Za-z0-9{]', r'[A-Za-z]\s*=\s*[^a-z]*[0-9]', r'\\[a-zA-Z]+', r'\^[0-9]+']
-        for pattern in complex_patterns:
-            if re.search(pattern, text): return 'display'
-        for pattern in simple_patterns:
-            if re.search(pattern, text): return 'inline'
+        if COMPLEX_MATH_PATTERNS.search(text): return 'display'
+        if SIMPLE_MATH_PATTERNS.search(text): return 'inline'
         return False
 
     def clean_math_expression(self, expr: str) -> str:
         if not expr or not expr.strip(): return ""
-        expr = re.sub(r'^`+|`+$', '', expr).strip()
-        expr = re.sub(r'_\(\s*([^)]+)\s*\)', r'_\1', expr)
-        expr = re.sub(r'_([A-Za-z]{2,})', r'_\1', expr)
-        expr = re.sub(r'\^([A-Za-z0-9]{2,})', r'^\1', expr)
-        expr = re.sub(r'\^([+-]?\d+)', r'^\1', expr)
-        expr = re.sub(r'\^([+-]?[A-Za-z]+)', r'^\1', expr)
-        expr = re.sub(r'([A-Za-z]+)\s*/\s*([A-Za-z]+-[A-Za-z]+)', r'\\text{\1}/\\text{\2}', expr)
-        expr = re.sub(r'([A-Za-z]+)-([A-Za-z]+)', r'\1 \\cdot \2', expr)
-        expr = re.sub(r'(\d+\.\d+)\s*\\text\{([A-Za-z]+)\}/\\text\{([A-Za-z]+ \\cdot [A-Za-z]+)\}', r'\1 \; \\frac{\\text{\2}}{\\text{\3}}', expr)
+        expr = _BACKTICKS_RE.sub('', expr).strip()
+        for pattern, repl in _MATH_REWRITES_PRE:
+            expr = pattern.sub(repl, expr)
         expr = expr.replace('*', r'\times').replace('×', r'\times')
-        # Key Change: Added a rule to correctly format the Omega symbol for resistance.
-        expr = re.sub(r'([0-9])(Omega)', r'\1 \\Omega', expr)
-        expr = re.sub(r'([0-9.]+)\s*(KN-m|KN|kN-m|kN|N-m|N)', r'\1 \text{\2}', expr)
-        expr = re.sub(r'-\s*frac', r'-frac', expr)
-        expr = re.sub(r'([A-Za-z0-9])\^([A-Za-z0-9]+)', r'\1^\2', expr)
-        expr = re.sub(r'\(([^)]+)\)\s*/\s*(\d+)', r'frac{\1}{\2}', expr)
-        expr = re.sub(r'([A-Za-z0-9]+)/([A-Za-z0-9]+)', r'frac{\1}{\2}', expr)
-        expr = re.sub(r'([A-Za-z]+[0-9]*)/([0-9]+)', r'frac{\1}{\2}', expr)
-        expr = re.sub(r'=\s*-\s*', r' = -', expr)
-        expr = re.sub(r'=\s*\+\s*', r' = +', expr)
-        expr = re.sub(r'(\d+(?:\.\d+)?)\s*([A-Za-z]+-[A-Za-z]+)', r'\1 \text{\2}', expr)
-        expr = re.sub(r'(\d+(?:\.\d+)?)\s*(KN-m|kN-m|N-m)', r'\1 \text{\2}', expr)
+        for pattern, repl in _MATH_REWRITES_POST:
+            expr = pattern.sub(repl, expr)
         if expr.count('(') > expr.count(')'): expr += ')' * (expr.count('(') - expr.count(')'))
         expr = expr.replace("Î»", "lambda").replace("\\\\", "\\")
-        for text, latex in self.symbol_map.items(): expr = expr.replace(text, latex.replace('\\', ''))
-        expr = re.sub(r'\s+', ' ', expr).strip()
+        for text, latex in self.plain_symbols: expr = expr.replace(text, latex)
+        expr = _WHITESPACE_RE.sub(' ', expr).strip()
         if not expr or expr == "{}": return ""
         return expr
 
@@ -79,7 +156,7 @@ class AnswerGenerator:
         try:
             if 'stepByStep' in parsed_body and 'steps' in parsed_body['stepByStep']:
                 for step_idx, step in enumerate(parsed_body['stepByStep'].get('steps', [])):
-                    for block in step.get('blocks', []):
+                    for block in step.get('blocks') or []:
                         block_type = block.get('type', 'UNKNOWN')
                         block_content = block.get('content', {})
                         if isinstance(block_content, str):
@@ -93,7 +170,7 @@ class AnswerGenerator:
                                      'block': {'editorContentState': {'content': editor_content}} if editor_content else block_content,
                                      'label': 'Step-by-step explanation' if block_type == 'EXPLANATION' else None, 'raw': block})
             if 'finalAnswer' in parsed_body and 'blocks' in parsed_body['finalAnswer']:
-                for block in parsed_body['finalAnswer'].get('blocks', []):
+                for block in parsed_body['finalAnswer'].get('blocks') or []:
                     block_type = block.get('type', 'UNKNOWN')
                     block_content = block.get('content', {})
                     if isinstance(block_content, str):
@@ -145,14 +222,14 @@ class AnswerGenerator:
                             if section == 'stepByStep' and section in body_v2:
                                 answer_data_structured['stepByStep'] = body_v2['stepByStep']
                                 for step_idx, step in enumerate(body_v2['stepByStep'].get('steps', [])):
-                                    for block in step.get('blocks', []):
+                                    for block in step.get('blocks') or []:
                                         self._process_block_to_structured(block, answer_data_structured, f'step {step_idx + 1}')
                             elif section == 'finalAnswer' and section in body_v2:
                                 answer_data_structured['finalAnswer'] = body_v2['finalAnswer']
-                                for block in body_v2['finalAnswer'].get('blocks', []):
+                                for block in body_v2['finalAnswer'].get('blocks') or []:
                                     self._process_block_to_structured(block, answer_data_structured, 'finalAnswer')
                             elif section == 'blocks' and section in body_v2:
-                                for block in body_v2.get('blocks', []):
+                                for block in body_v2.get('blocks') or []:
                                     self._process_block_to_structured(block, answer_data_structured, 'top-level')
                     else:
                         answer_data_structured['text'] = body_v2.get('text', "")
@@ -208,7 +285,7 @@ class AnswerGenerator:
             elif block_type == "ACCOUNTING_TABLE": return self.process_accounting_table(block, mode=mode)
             elif block_type == "TABLE": return self.process_generic_table(block, mode=mode)
             elif block_type == "DRAWING": return self.process_drawing_block(block)
-            elif block_type == "CIRCUIT": print(block); return self.process_circuit_block(block)
+            elif block_type == "CIRCUIT": return self.process_circuit_block(block)
             elif block_type == "LIST": return self._process_list_block(block, mode=mode)
             elif block_type == "HTML": return block.get("content", "") if block.get("content", "").strip() else ""
             elif block_type == "CODE_SNIPPET": return self.process_code_snippet(block)
@@ -230,7 +307,7 @@ class AnswerGenerator:
                 circuit_data = block.get("content", {})
             
             # Log the structure for debugging
-            self.logger.info(f"Processing circuit block with keys: {circuit_data.keys()}")
+            self.logger.debug(f"Processing circuit block with keys: {circuit_data.keys()}")
             
             # Extract settings and shapes
             settings = circuit_data.get("settings", {})
@@ -256,7 +333,7 @@ class AnswerGenerator:
                 }
             }
             
-            self.logger.info(f"Circuit has {len(shapes)} shapes")
+            self.logger.debug(f"Circuit has {len(shapes)} shapes")
             
             # Process using the enhanced drawing logic
             return self.process_drawing_block(drawing_block)
@@ -272,9 +349,9 @@ class AnswerGenerator:
             title = block_data.get("title", {}).get("content", [{}])[0].get("content", [{}])[0].get("text", "")
             expression = block_data.get("expression", {}).get("content", [])
             result = block_data.get("result", {}).get("content", [{}])[0].get("content", [{}])[0].get("text", "")
-            html_content = ""
+            out = HtmlBuilder()
             if title:
-                html_content += f'<p>{html.escape(title)}</p>'
+                out.add(f'<p>{html.escape(title)}</p>')
             for expr in expression:
                 expr_text = expr.get("content", [{}])[0].get("text", "")
                 if expr_text.strip() and expr_text.strip() != "{}":
@@ -282,18 +359,18 @@ class AnswerGenerator:
                     cleaned_expr = self.clean_math_expression(expr_text)
                     if cleaned_expr:
                         if mode == 'display':
-                            html_content += f'<span class="equation-line">`{cleaned_expr}`</span>'
+                            out.add(f'<span class="equation-line">`{cleaned_expr}`</span>')
                         else:
-                            html_content += f'<span data-math-type="mhchem">{cleaned_expr}</span>'
+                            out.add(f'<span data-math-type="mhchem">{cleaned_expr}</span>')
             if result.strip() and result.strip() != "{}":
                 math_type = self.is_mathematical_expression(result)
                 cleaned_result = self.clean_math_expression(result)
                 if cleaned_result:
                     if mode == 'display':
-                        html_content += f'<span class="equation-line">`{cleaned_result}`</span>'
+                        out.add(f'<span class="equation-line">`{cleaned_result}`</span>')
                     else:
-                        html_content += f'<span data-math-type="mhchem">{cleaned_result}</span>'
-            return html_content
+                        out.add(f'<span data-math-type="mhchem">{cleaned_result}</span>')
+            return out.getvalue()
         except Exception as e:
             self.logger.error(f"Error processing MATH_IN_TEXT block: {e}")
             return ""
@@ -309,23 +386,24 @@ class AnswerGenerator:
             for c in item.get("content", [])) or item.get("type") in ["bulletList", "orderedList"] and item.get("content")
             for item in editor_content)
         if not has_content: return ""
-        html_content = ""
+        out = HtmlBuilder()
         if block_type == "EXPLANATION":
             label = block.get("label", "Explanation")
-            html_content += f'<div class="explanation-block"><h2>{html.escape(label)}</h2>'
+            out.add(f'<div class="explanation-block"><h2>{html.escape(label)}</h2>')
         for item in editor_content:
             processed_item = self.process_content_item(item, mode=mode)
-            if processed_item.strip(): html_content += processed_item
+            if processed_item.strip(): out.add(processed_item)
+        html_content = out.getvalue()
         if block_type == "EXPLANATION" and html_content.strip(): html_content += '</div>'
         return html_content if html_content.strip() else ""
 
     def _process_list_block(self, block, mode='display'):
         editor_content = block.get("block", {}).get("editorContentState", {}).get("content", [])
-        html_content = ""
+        out = HtmlBuilder()
         for item in editor_content:
             processed_item = self.process_content_item(item, mode=mode)
-            if processed_item.strip(): html_content += processed_item
-        return html_content
+            if processed_item.strip(): out.add(processed_item)
+        return out.getvalue()
 
     def process_code_snippet(self, block: dict) -> str:
         try:
@@ -348,15 +426,16 @@ class AnswerGenerator:
     def process_equation_block(self, block: dict, mode='display') -> str:
         try:
             block_data = block.get("block", {})
-            equation_html = ""
+            out = HtmlBuilder()
             for eqn in block_data.get("lines", []):
                 equation_str = f"{eqn.get('left', '')} {eqn.get('operator', '')} {eqn.get('right', '')}"
                 cleaned_equation = self.clean_math_expression(equation_str)
                 if not cleaned_equation: continue
                 if mode == 'display':
-                    equation_html += f'<span class="equation-line">`{cleaned_equation}`</span>'
+                    out.add(f'<span class="equation-line">`{cleaned_equation}`</span>')
                 else:
-                    equation_html += f'<p><span data-math-type="mhchem">{cleaned_equation}</span></p>'
+                    out.add(f'<p><span data-math-type="mhchem">{cleaned_equation}</span></p>')
+            equation_html = out.getvalue()
             return equation_html if equation_html.strip() else ""
         except: return ""
 
@@ -393,13 +472,13 @@ class AnswerGenerator:
                     else:
                         return f'<span data-math-type="mhchem">{cleaned_math}</span>', "center"
             
-            if re.match(r'^[\$\¢\£\¥\€]?[-]?\s*\d{1,3}(?:,\d{3})*(?:\.\d{2})?$', content):
+            if _CURRENCY_RE.match(content):
                 return html.escape(content), "right"
-            if re.match(r'^\d+(?:\.\d+)?%$', content):
+            if _PERCENT_RE.match(content):
                 return html.escape(content), "right"
-            if re.match(r'^[-]?\d{1,3}(?:,\d{3})*(?:\.\d+)?$', content):
+            if _NUMBER_RE.match(content):
                 return html.escape(content), "right"
-            if re.match(r'^\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}$', content):
+            if _DATE_RE.match(content):
                 return html.escape(content), "center"
             
             header_keywords = ['date', 'account', 'name', 'debit', 'credit', 'transaction', 'amount', 
@@ -453,7 +532,7 @@ class AnswerGenerator:
             if not entries:
                 return ""
             
-            table_html = '<div class="table-container"><table class="data-table accounting-table">'
+            out = HtmlBuilder('<div class="table-container"><table class="data-table accounting-table">')
             has_content = False
 
             for entry_idx, entry in enumerate(entries):
@@ -486,7 +565,7 @@ class AnswerGenerator:
                 if headers:
                     header_keys = [k for k in headers.keys() if k.startswith('0-')]
                     if header_keys:
-                        table_html += "<thead><tr>"
+                        out.add("<thead><tr>")
                         header_keys.sort(key=lambda x: int(x.split('-')[1]))
                         for key in header_keys:
                             cell = headers[key]
@@ -499,8 +578,8 @@ class AnswerGenerator:
                             colspan_attr = f' colspan="{colspan}"' if colspan > 1 else ""
                             rowspan_attr = f' rowspan="{rowspan}"' if rowspan > 1 else ""
                             
-                            table_html += f'<th{colspan_attr}{rowspan_attr} class="table-header" style="text-align: {align}; font-weight: bold; background-color: #f8f9fa;">{cell_content}</th>'
-                        table_html += "</tr></thead>"
+                            out.add(f'<th{colspan_attr}{rowspan_attr} class="table-header" style="text-align: {align}; font-weight: bold; background-color: #f8f9fa;">{cell_content}</th>')
+                        out.add("</tr></thead>")
                 
                 if body_cells:
                     rows_data = {}
@@ -514,9 +593,9 @@ class AnswerGenerator:
                             continue
                     
                     if rows_data:
-                        table_html += "<tbody>"
+                        out.add("<tbody>")
                         for row_idx in sorted(rows_data.keys()):
-                            table_html += f'<tr class="table-row row-{row_idx}">'
+                            out.add(f'<tr class="table-row row-{row_idx}">')
                             row_data = rows_data[row_idx]
                             for col_idx in range(max_col + 1):
                                 if col_idx in row_data:
@@ -536,20 +615,20 @@ class AnswerGenerator:
                                     elif align == "center":
                                         cell_class += " centered-cell"
                                     
-                                    table_html += f'<td{colspan_attr}{rowspan_attr} class="{cell_class}" style="text-align: {align}; padding: 8px; border: 1px solid #dee2e6;">{cell_content}</td>'
+                                    out.add(f'<td{colspan_attr}{rowspan_attr} class="{cell_class}" style="text-align: {align}; padding: 8px; border: 1px solid #dee2e6;">{cell_content}</td>')
                                 else:
-                                    table_html += '<td class="table-cell empty-cell" style="padding: 8px; border: 1px solid #dee2e6;"></td>'
-                            table_html += "</tr>"
-                        table_html += "</tbody>"
+                                    out.add('<td class="table-cell empty-cell" style="padding: 8px; border: 1px solid #dee2e6;"></td>')
+                            out.add("</tr>")
+                        out.add("</tbody>")
 
-            table_html += "</table></div>"
+            out.add("</table></div>")
             
             if not has_content:
                 self.logger.debug("Accounting table has no valid content, returning empty string")
                 return ""
             
-            self.logger.info("Successfully processed accounting table")
-            return table_html
+            self.logger.debug("Successfully processed accounting table")
+            return out.getvalue()
             
         except Exception as e:
             self.logger.error(f"Error processing accounting table: {e}")
@@ -605,16 +684,16 @@ class AnswerGenerator:
                 return ""
 
             shadow_grid = [[False for _ in range(col_count)] for _ in range(row_count)]
-            html = '<div class="table-container"><table class="data-table generic-table">'
+            out = HtmlBuilder('<div class="table-container"><table class="data-table generic-table">')
             has_content = False
 
             for r in range(row_count):
                 if r == 0:
-                    html += "<thead>"
+                    out.add("<thead>")
                 elif r == 1:
-                    html += "<tbody>"
+                    out.add("<tbody>")
                 
-                html += f'<tr class="table-row row-{r}">'
+                out.add(f'<tr class="table-row row-{r}">')
                 
                 for c in range(col_count):
                     if shadow_grid[r][c]:
@@ -641,21 +720,21 @@ class AnswerGenerator:
                         rowspan_attr = f' rowspan="{rowspan}"' if rowspan > 1 else ""
                         colspan_attr = f' colspan="{colspan}"' if colspan > 1 else ""
                         
-                        html += f'<{tag}{rowspan_attr}{colspan_attr} style="{style}">{cell_content}</{tag}>'
+                        out.add(f'<{tag}{rowspan_attr}{colspan_attr} style="{style}">{cell_content}</{tag}>')
                     else:
-                        html += '<td></td>'
+                        out.add('<td></td>')
 
-                html += "</tr>"
+                out.add("</tr>")
 
                 if r == 0:
-                    html += "</thead>"
+                    out.add("</thead>")
 
             if row_count > 1:
-                html += "</tbody>"
+                out.add("</tbody>")
                 
-            html += "</table></div>"
+            out.add("</table></div>")
 
-            return html if has_content else ""
+            return out.getvalue() if has_content else ""
 
         except Exception as e:
             print(f"Error processing generic table: {e}")
@@ -676,7 +755,7 @@ class AnswerGenerator:
         try:
             content = content_item.get("content", [])
             if not content: return ""
-            paragraph_html = "<p>"
+            out = HtmlBuilder("<p>")
             has_valid_content = False
             for item in content:
                 if item.get("type") == "text":
@@ -701,7 +780,7 @@ class AnswerGenerator:
                         if mark.get("type") == "bold": text = f"<strong>{text}</strong>"
                         elif mark.get("type") == "italic": text = f"<i>{text}</i>"
                         elif mark.get("type") == "code": text = f"<code>{text}</code>"
-                    paragraph_html += text
+                    out.add(text)
                     has_valid_content = True
                 elif item.get("type") == "inlineMath":
                     math_text = item.get("content", [{}])[0].get("text", "")
@@ -717,36 +796,33 @@ class AnswerGenerator:
                         span_start = '<span data-math-type="mhchem">'
                         span_end = '</span>'
                     text = span_start + delim + math_text + delim + span_end
-                    paragraph_html += text
+                    out.add(text)
                     has_valid_content = True
                 elif item.get("type") == "hardBreak":
-                    paragraph_html += "<br>"
+                    out.add("<br>")
                     has_valid_content = True
-            paragraph_html += "</p>"
-            return paragraph_html if has_valid_content else ""
+            out.add("</p>")
+            return out.getvalue() if has_valid_content else ""
         except: return ""
 
     def process_bullet_list(self, content_item: dict, mode='display', indent_level: int = 0) -> str:
         try:
             content = content_item.get("content", [])
             if not content: return ""
-            list_html = f'<ul class="{f"nested-list-{indent_level}" if indent_level > 0 else "" }">'
+            out = HtmlBuilder(f'<ul class="{f"nested-list-{indent_level}" if indent_level > 0 else "" }">')
             has_valid_content = False
             for list_item in content:
                 if list_item.get("type") == "listItem":
-                    item_html = "<li>"
-                    item_has_content = False
+                    item_parts = []
                     for item in list_item.get("content", []):
                         processed_item = self.process_content_item(item, mode=mode)
                         if processed_item.strip():
-                            item_html += processed_item
-                            item_has_content = True
-                    item_html += "</li>"
-                    if item_has_content:
-                        list_html += item_html
+                            item_parts.append(processed_item)
+                    if item_parts:
+                        out.add("<li>", *item_parts, "</li>")
                         has_valid_content = True
-            list_html += "</ul>"
-            return list_html if has_valid_content else ""
+            out.add("</ul>")
+            return out.getvalue() if has_valid_content else ""
         except: return ""
 
     def process_ordered_list(self, content_item: dict, mode='display', indent_level: int = 0) -> str:
@@ -754,30 +830,27 @@ class AnswerGenerator:
             content = content_item.get("content", [])
             if not content: return ""
             start = content_item.get("attrs", {}).get("start", 1)
-            list_html = f'<ul class="{f"nested-list-{indent_level}" if indent_level > 0 else "" }">'
+            out = HtmlBuilder(f'<ul class="{f"nested-list-{indent_level}" if indent_level > 0 else "" }">')
             has_valid_content = False
             for list_item in content:
                 if list_item.get("type") == "listItem":
-                    item_html = "<li>"
-                    item_has_content = False
+                    item_parts = []
                     for item in list_item.get("content", []):
                         processed_item = self.process_content_item(item, mode=mode)
                         if processed_item.strip():
-                            item_html += processed_item
-                            item_has_content = True
-                    item_html += "</li>"
-                    if item_has_content:
-                        list_html += item_html
+                            item_parts.append(processed_item)
+                    if item_parts:
+                        out.add("<li>", *item_parts, "</li>")
                         has_valid_content = True
-            list_html += "</ol>"
-            return list_html if has_valid_content else ""
+            out.add("</ol>")
+            return out.getvalue() if has_valid_content else ""
         except: return ""
 
     def process_heading(self, content_item: dict, mode='display') -> str:
         try:
             level = content_item.get("attrs", {}).get("level", 3)
             content = content_item.get("content", [])
-            heading_text = ""
+            heading_parts = []
             for item in content:
                 if item.get("type") == "text":
                     text = item.get("text", "")
@@ -798,7 +871,8 @@ class AnswerGenerator:
                     else: text = html.escape(text)
                     for mark in item.get("marks", []):
                         if mark.get("type") == "bold": text = f"<strong>{text}</strong>"
-                    heading_text += text
+                    heading_parts.append(text)
+            heading_text = ''.join(heading_parts)
             return f"<h{level}>{heading_text}</h{level}>" if heading_text else ""
         except: return ""
 
@@ -848,34 +922,95 @@ class AnswerGenerator:
             return "\n".join(line.rstrip() for line in markdown_lines if line.strip() and line.strip() != "{}")
         except: return ""
 
+    def render_blocks(self, blocks, mode='display'):
+        """
+        Yields process_block_enhanced() output for each block, in order.
+        Identical heavy blocks (drawings, circuits, tables) are rendered once per call.
+        With RENDER_WORKERS set and at least PARALLEL_RENDER_MIN_BLOCKS distinct heavy
+        blocks, those are rendered in a process pool while the rest are rendered here;
+        a failing pool falls back to rendering inline.
+        """
+        # Light blocks render faster than they hash, so they get no key
+        keys = [_block_key(block) if block.get("type") in _POOL_BLOCK_TYPES else None for block in blocks]
+        heavy = {key: block for key, block in zip(keys, blocks) if key is not None}
+
+        # key -> (future, index in that future's batch)
+        pending = {}
+        if RENDER_WORKERS > 0 and len(heavy) >= PARALLEL_RENDER_MIN_BLOCKS:
+            # A couple of batches per worker: one task per block costs more in IPC than it saves
+            items = list(heavy.items())
+            batch_size = -(-len(items) // (RENDER_WORKERS * 2))
+            pool = _get_render_pool()
+            try:
+                for start in range(0, len(items), batch_size):
+                    batch = items[start:start + batch_size]
+                    future = pool.submit(_render_blocks_in_worker, [block for _, block in batch], mode)
+                    for i, (key, _) in enumerate(batch):
+                        pending[key] = (future, i)
+            except Exception as e:
+                self.logger.error(f"Render pool unavailable, rendering inline: {e}")
+                _reset_render_pool(pool)
+                pending = {}
+
+        rendered = {}
+        for key, block in zip(keys, blocks):
+            if key is None:
+                yield self.process_block_enhanced(block, mode=mode)
+                continue
+            if key not in rendered and key in pending:
+                future, i = pending.pop(key)
+                try:
+                    rendered[key] = future.result(timeout=RENDER_POOL_TIMEOUT)[i]
+                except Exception as e:
+                    # Don't wait on the other batches of a stuck/broken pool
+                    self.logger.error(f"Pooled render failed, rendering inline: {e}")
+                    pending.clear()
+            if key not in rendered:
+                rendered[key] = self.process_block_enhanced(block, mode=mode)
+            yield rendered[key]
+
+    def iter_sqna_content_html(self, content_obj: dict, mode='display'):
+        """Yields the answer HTML one step / final answer / block at a time"""
+        steps = []
+        if "stepByStep" in content_obj and "steps" in content_obj["stepByStep"]:
+            steps = content_obj["stepByStep"]["steps"]
+        final_blocks = []
+        if "finalAnswer" in content_obj and "blocks" in content_obj["finalAnswer"]:
+            final_blocks = content_obj["finalAnswer"].get("blocks") or []
+        top_blocks = content_obj.get("blocks") or []
+
+        # One pass over every block of the solution, so render_blocks can dedupe / parallelize across steps
+        # ("blocks": null shows up in some steps; those are skipped like empty ones)
+        rendered = self.render_blocks([b for step in steps for b in step.get("blocks") or []] + list(final_blocks) + list(top_blocks), mode=mode)
+
+        if steps:
+            for i, step in enumerate(steps):
+                step_title = step.get("title", "").strip()
+                step_blocks = step.get("blocks") or []
+                if not step_blocks: continue
+                step_parts = []
+                for _ in step_blocks:
+                    processed_block = next(rendered)
+                    if processed_block.strip(): step_parts.append(processed_block)
+                if step_parts:
+                    step_header = f'<div class="step-header">Step {i + 1} of {len(steps)}'
+                    if step_title: step_header += f': {html.escape(step_title)}'
+                    step_header += '</div>'
+                    yield step_header + ''.join(step_parts)
+        if "finalAnswer" in content_obj and "blocks" in content_obj["finalAnswer"]:
+            final_parts = []
+            for _ in final_blocks:
+                processed_block = next(rendered)
+                if processed_block.strip(): final_parts.append(processed_block)
+            final_answer_html = ''.join(final_parts)
+            if final_answer_html.strip(): yield '<div class="final-answer"><h3>Final Answer</h3>' + final_answer_html + "</div>"
+        for _ in top_blocks:
+            processed_block = next(rendered)
+            if processed_block.strip(): yield processed_block
+
     def process_sqna_content_for_html(self, content_obj: dict, mode='display') -> str:
         try:
-            html_content = ""
-            if "stepByStep" in content_obj and "steps" in content_obj["stepByStep"]:
-                for i, step in enumerate(content_obj["stepByStep"]["steps"]):
-                    step_title = step.get("title", "").strip()
-                    step_blocks = step.get("blocks", [])
-                    if not step_blocks: continue
-                    step_html = ""
-                    for block in step_blocks:
-                        processed_block = self.process_block_enhanced(block, mode=mode)
-                        if processed_block.strip(): step_html += processed_block
-                    if step_html:
-                        step_header = f'<div class="step-header">Step {i + 1} of {len(content_obj["stepByStep"]["steps"])}'
-                        if step_title: step_header += f': {html.escape(step_title)}'
-                        step_header += '</div>'
-                        html_content += step_header + step_html
-            if "finalAnswer" in content_obj and "blocks" in content_obj["finalAnswer"]:
-                final_answer_html = ""
-                for block in content_obj["finalAnswer"].get("blocks", []):
-                    processed_block = self.process_block_enhanced(block, mode=mode)
-                    if processed_block.strip(): final_answer_html += processed_block
-                if final_answer_html.strip(): html_content += '<div class="final-answer"><h3>Final Answer</h3>' + final_answer_html + "</div>"
-            if "blocks" in content_obj:
-                for block in content_obj["blocks"]:
-                    processed_block = self.process_block_enhanced(block, mode=mode)
-                    if processed_block.strip(): html_content += processed_block
-            return html_content or ""
+            return ''.join(self.iter_sqna_content_html(content_obj, mode=mode))
         except: return ""
 
     # ==============================================================================
@@ -896,20 +1031,21 @@ class AnswerGenerator:
                 self.logger.warning("No viewBox or shapes found in drawing/circuit")
                 return ""
                 
-            shape_types = [shape.get('type', 'unknown') for shape in shapes]
-            self.logger.info(f"Processing {len(shapes)} shapes: {set(shape_types)}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                shape_types = [shape.get('type', 'unknown') for shape in shapes]
+                self.logger.debug(f"Processing {len(shapes)} shapes: {set(shape_types)}")
             
             viewBox_str = f"{viewBox.get('x', 0)} {viewBox.get('y', 0)} {viewBox.get('w', 100)} {viewBox.get('h', 100)}"
-            svg_html = f'<svg width="100%" height="auto" viewBox="{viewBox_str}" xmlns="http://www.w3.org/2000/svg" xmlns:xhtml="http://www.w3.org/1999/xhtml">'
+            svg = HtmlBuilder(f'<svg width="100%" height="auto" viewBox="{viewBox_str}" xmlns="http://www.w3.org/2000/svg" xmlns:xhtml="http://www.w3.org/1999/xhtml">')
             
-            svg_html += '''<defs>
+            svg.add('''<defs>
                 <marker id="arrow-end" markerWidth="10" markerHeight="7" refX="10" refY="3.5" orient="auto">
                     <polygon points="0 0, 10 3.5, 0 7" fill="black"/>
                 </marker>
                 <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="5" refY="3.5" orient="auto" markerUnits="strokeWidth">
                     <path d="M0,0 L0,7 L10,3.5 z" fill="#000"/>
                 </marker>
-            </defs>'''
+            </defs>''')
 
             def get_style(style):
                 base_style = {'fill': 'transparent', 'stroke': 'black', 'stroke-width': 2}
@@ -926,7 +1062,6 @@ class AnswerGenerator:
                 return ';'.join(f"{k}:{v}" for k,v in final_style.items())
 
             def processShape(shape, parent_x=0, parent_y=0):
-                nonlocal svg_html
                 if not shape: return
                 
                 shape_type = shape.get('type', 'unknown')
@@ -959,7 +1094,7 @@ class AnswerGenerator:
                         x2 = points[1].get("x", 0) + x
                         y2 = points[1].get("y", 0) + y
                         marker = ' marker-end="url(#arrowhead)"' if shape.get('style', {}).get('markerEnd') else ''
-                        svg_html += f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" style="{style}"{marker} transform="{transform}"/>'
+                        svg.add(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" style="{style}"{marker} transform="{transform}"/>')
                         
                 elif shape_type == "Connection":
                     points = shape.get('points', [])
@@ -967,35 +1102,35 @@ class AnswerGenerator:
                         points_str = [f"{p.get('x', 0) + x},{p.get('y', 0) + y}" for p in points]
                         if points_str:
                             marker = ' marker-end="url(#arrowhead)"' if shape.get('style', {}).get('markerEnd') else ''
-                            svg_html += f'<polyline points="{" ".join(points_str)}" style="{style}"{marker} transform="{transform}"/>'
+                            svg.add(f'<polyline points="{" ".join(points_str)}" style="{style}"{marker} transform="{transform}"/>')
                 
                 elif shape_type in ["Square", "Rect"]:
-                    svg_html += f'<rect x="{x}" y="{y}" width="{w}" height="{h}" style="{style}" transform="{transform}"/>'
+                    svg.add(f'<rect x="{x}" y="{y}" width="{w}" height="{h}" style="{style}" transform="{transform}"/>')
                     
                 elif shape_type == "Circle":
                     cx = x + w / 2
                     cy = y + h / 2
                     r = min(w, h) / 2
-                    svg_html += f'<circle cx="{cx}" cy="{cy}" r="{r}" style="{style}" transform="{transform}"/>'
+                    svg.add(f'<circle cx="{cx}" cy="{cy}" r="{r}" style="{style}" transform="{transform}"/>')
                     
                 elif shape_type == "Ellipse":
                     cx = x + w / 2
                     cy = y + h / 2
                     rx, ry = w / 2, h / 2
-                    svg_html += f'<ellipse cx="{cx}" cy="{cy}" rx="{rx}" ry="{ry}" style="{style}" transform="{transform}"/>'
+                    svg.add(f'<ellipse cx="{cx}" cy="{cy}" rx="{rx}" ry="{ry}" style="{style}" transform="{transform}"/>')
                     
                 elif shape_type == "Path":
                     d = shape.get("d", "")
                     if d: 
                         path_transform = f"translate({x} {y}) {transform}"
-                        svg_html += f'<path d="{html.escape(d)}" style="{style}" transform="{path_transform.strip()}"/>'
+                        svg.add(f'<path d="{html.escape(d)}" style="{style}" transform="{path_transform.strip()}"/>')
                         
                 elif shape_type in ["Polygon", "Polyline"]:
                     points = shape.get("points", [])
                     if points:
                         points_str = " ".join(f"{p.get('x', 0) + x},{p.get('y', 0) + y}" for p in points)
                         marker = ' marker-end="url(#arrowhead)"' if shape.get('style', {}).get('markerEnd') and shape_type == "Polyline" else ''
-                        svg_html += f'<{shape_type.lower()} points="{points_str}" style="{style}"{marker} transform="{transform}"/>'
+                        svg.add(f'<{shape_type.lower()} points="{points_str}" style="{style}"{marker} transform="{transform}"/>')
                         
                 elif shape_type == "Text":
                     text_value = ""
@@ -1006,7 +1141,7 @@ class AnswerGenerator:
                         font_size = shape.get('style', {}).get("fontSize", "14px")
                         text_anchor = shape.get('style', {}).get("textAnchor", "start")
                         # Vertically align text within its bounding box
-                        svg_html += f'<text x="{x}" y="{y + h/2}" font-size="{font_size}" text-anchor="{text_anchor}" dominant-baseline="central" style="fill:black;stroke:none;" transform="{transform}">{html.escape(text_value)}</text>'
+                        svg.add(f'<text x="{x}" y="{y + h/2}" font-size="{font_size}" text-anchor="{text_anchor}" dominant-baseline="central" style="fill:black;stroke:none;" transform="{transform}">{html.escape(text_value)}</text>')
                         
                 elif shape_type == "Math":
                     math_text = ""
@@ -1021,7 +1156,7 @@ class AnswerGenerator:
                             math_w = w if w > 0 else max(50, len(cleaned_math) * 9)
                             math_h = h if h > 0 else 30
                             # The y-coordinate is already correct, no adjustment needed
-                            svg_html += f'<foreignObject x="{x}" y="{y}" width="{math_w}" height="{math_h}" transform="{transform}"><xhtml:div style="height:100%;display:flex;align-items:center;justify-content:center;font-size:{font_size};"><span class="equation-line">`{html.escape(cleaned_math)}`</span></xhtml:div></foreignObject>'
+                            svg.add(f'<foreignObject x="{x}" y="{y}" width="{math_w}" height="{math_h}" transform="{transform}"><xhtml:div style="height:100%;display:flex;align-items:center;justify-content:center;font-size:{font_size};"><span class="equation-line">`{html.escape(cleaned_math)}`</span></xhtml:div></foreignObject>')
                             
                 elif shape_type == "PythagorasSVG":
                     svg_shape_name = shape.get("SVGShapeName", "")
@@ -1043,7 +1178,7 @@ class AnswerGenerator:
                             for i in range(6):
                                 path += f"l {w/2 if i%2==0 else -w/2},{segment_h} "
                             path += f"l 0,{lead}"
-                        svg_html += f'<path d="{path}" style="{style}" transform="{transform}"/>'
+                        svg.add(f'<path d="{path}" style="{style}" transform="{transform}"/>')
 
                     elif svg_shape_name == "Inductor":
                         if w >= h: # Horizontal
@@ -1054,28 +1189,28 @@ class AnswerGenerator:
                             mid_x = x + w/2; num_coils = 4; coil_h = h / num_coils
                             path = f"M {mid_x},{y}"
                             for _ in range(num_coils): path += f" c {w}, {coil_h*0.25} {w}, {coil_h*0.75} 0,{coil_h}"
-                        svg_html += f'<path d="{path}" style="{style}" transform="{transform}"/>'
+                        svg.add(f'<path d="{path}" style="{style}" transform="{transform}"/>')
                         
                     elif svg_shape_name in ["Capacitor", "Polarized Capacitor"]:
                         if w > h: # Horizontal
                             plate_gap = 4; mid_y = y + h/2; line_len = (w - plate_gap) / 2
-                            svg_html += f'<path d="M {x},{mid_y} L {x+line_len},{mid_y} M {x+line_len},{y} L {x+line_len},{y+h} M {x+w-line_len},{y} L {x+w-line_len},{y+h} M {x+w-line_len},{mid_y} L {x+w},{mid_y}" style="{style}" transform="{transform}"/>'
-                            if svg_shape_name == "Polarized Capacitor": svg_html += f'<text x="{x + line_len - 12}" y="{y}" font-size="16" style="fill:black; stroke:none;" transform="{transform}">+</text>'
+                            svg.add(f'<path d="M {x},{mid_y} L {x+line_len},{mid_y} M {x+line_len},{y} L {x+line_len},{y+h} M {x+w-line_len},{y} L {x+w-line_len},{y+h} M {x+w-line_len},{mid_y} L {x+w},{mid_y}" style="{style}" transform="{transform}"/>')
+                            if svg_shape_name == "Polarized Capacitor": svg.add(f'<text x="{x + line_len - 12}" y="{y}" font-size="16" style="fill:black; stroke:none;" transform="{transform}">+</text>')
                         else: # Vertical
                             plate_gap = 4; mid_x = x + w/2; line_len = (h - plate_gap) / 2
-                            svg_html += f'<path d="M {mid_x},{y} L {mid_x},{y+line_len} M {x},{y+line_len} L {x+w},{y+line_len} M {x},{y+h-line_len} L {x+w},{y+h-line_len} M {mid_x},{y+h-line_len} L {mid_x},{y+h}" style="{style}" transform="{transform}"/>'
-                            if svg_shape_name == "Polarized Capacitor": svg_html += f'<text x="{x+w+2}" y="{y+line_len+5}" font-size="16" style="fill:black; stroke:none;" transform="{transform}">+</text>'
+                            svg.add(f'<path d="M {mid_x},{y} L {mid_x},{y+line_len} M {x},{y+line_len} L {x+w},{y+line_len} M {x},{y+h-line_len} L {x+w},{y+h-line_len} M {mid_x},{y+h-line_len} L {mid_x},{y+h}" style="{style}" transform="{transform}"/>')
+                            if svg_shape_name == "Polarized Capacitor": svg.add(f'<text x="{x+w+2}" y="{y+line_len+5}" font-size="16" style="fill:black; stroke:none;" transform="{transform}">+</text>')
                              
                     elif svg_shape_name == "DC Voltage Source":
                         cx, cy = x + w/2, y + h/2
                         if w > h: # Horizontal
                             plate_gap = w/5; short_plate_h = h*0.5; plate_x1 = cx-plate_gap/2; plate_x2 = cx+plate_gap/2
-                            svg_html += f'<path d="M {x},{cy} L {plate_x1},{cy} M {plate_x1},{y} L {plate_x1},{y+h} M {plate_x2},{y+(h-short_plate_h)/2} L {plate_x2},{y+(h+short_plate_h)/2} M {plate_x2},{cy} L {x+w},{cy}" style="{style}" transform="{transform}"/>'
-                            svg_html += f'<text x="{plate_x1}" y="{y-2}" font-size="{h/2}" text-anchor="middle" style="fill:black; stroke:none;" transform="{transform}">+</text>'
+                            svg.add(f'<path d="M {x},{cy} L {plate_x1},{cy} M {plate_x1},{y} L {plate_x1},{y+h} M {plate_x2},{y+(h-short_plate_h)/2} L {plate_x2},{y+(h+short_plate_h)/2} M {plate_x2},{cy} L {x+w},{cy}" style="{style}" transform="{transform}"/>')
+                            svg.add(f'<text x="{plate_x1}" y="{y-2}" font-size="{h/2}" text-anchor="middle" style="fill:black; stroke:none;" transform="{transform}">+</text>')
                         else: # Vertical
                             plate_gap = h/5; short_plate_w = w*0.5; plate_y1 = cy-plate_gap/2; plate_y2 = cy+plate_gap/2
-                            svg_html += f'<path d="M {cx},{y} L {cx},{plate_y1} M {x},{plate_y1} L {x+w},{plate_y1} M {x+(w-short_plate_w)/2},{plate_y2} L {x+(w+short_plate_w)/2},{plate_y2} M {cx},{plate_y2} L {cx},{y+h}" style="{style}" transform="{transform}"/>'
-                            svg_html += f'<text x="{x+w+2}" y="{plate_y1+4}" font-size="{w*0.75}" style="fill:black; stroke:none;" transform="{transform}">+</text>'
+                            svg.add(f'<path d="M {cx},{y} L {cx},{plate_y1} M {x},{plate_y1} L {x+w},{plate_y1} M {x+(w-short_plate_w)/2},{plate_y2} L {x+(w+short_plate_w)/2},{plate_y2} M {cx},{plate_y2} L {cx},{y+h}" style="{style}" transform="{transform}"/>')
+                            svg.add(f'<text x="{x+w+2}" y="{plate_y1+4}" font-size="{w*0.75}" style="fill:black; stroke:none;" transform="{transform}">+</text>')
                         
                     elif svg_shape_name == "Semicircle":
                         # Arcs are tricky with transforms, better to draw as path
@@ -1083,15 +1218,15 @@ class AnswerGenerator:
                             d = f"M{x},{y+h/2} A{w/2},{h/2} 0 0,1 {x+w},{y+h/2}"
                         else:
                             d = f"M{x+w/2},{y} A{w/2},{h/2} 0 0,1 {x+w/2},{y+h}"
-                        svg_html += f'<path d="{d}" style="{style}" transform="{transform}"/>'
+                        svg.add(f'<path d="{d}" style="{style}" transform="{transform}"/>')
                         
                     else: # Fallback for unknown shapes
-                        svg_html += f'<rect x="{x}" y="{y}" width="{w}" height="{h}" style="{style}" transform="{transform}"/>'
-                        svg_html += f'<text x="{x + w/2}" y="{y + h/2}" font-size="10" text-anchor="middle" dominant-baseline="central" style="fill:blue;stroke:none;" transform="{transform}">{svg_shape_name}</text>'
+                        svg.add(f'<rect x="{x}" y="{y}" width="{w}" height="{h}" style="{style}" transform="{transform}"/>')
+                        svg.add(f'<text x="{x + w/2}" y="{y + h/2}" font-size="10" text-anchor="middle" dominant-baseline="central" style="fill:blue;stroke:none;" transform="{transform}">{svg_shape_name}</text>')
                         
                 elif shape_type == "IsocelesTriangle":
                     points_str = f"{x + w/2},{y} {x},{y + h} {x + w},{y + h}"
-                    svg_html += f'<polygon points="{points_str}" style="{style}" transform="{transform}"/>'
+                    svg.add(f'<polygon points="{points_str}" style="{style}" transform="{transform}"/>')
                     
                 elif shape_type in ["CompoundShape", "Group"]:
                     inner_shapes = shape.get("shapes", {})
@@ -1108,10 +1243,10 @@ class AnswerGenerator:
                 if shape and shape.get('type'):
                     processShape(shape)
                     
-            svg_html += '</svg>'
+            svg.add('</svg>')
             
-            self.logger.info("Successfully processed drawing/circuit with corrected coordinate handling and symbols.")
-            return svg_html
+            self.logger.debug("Successfully processed drawing/circuit with corrected coordinate handling and symbols.")
+            return svg.getvalue()
             
         except Exception as e:
             self.logger.error(f"Error processing drawing/circuit block: {e}")
@@ -1125,9 +1260,8 @@ class AnswerGenerator:
     def _convert_asciimath_to_latex_for_copy(self, asciimath_str: str) -> str:
         if not asciimath_str: return ""
         latex_str = asciimath_str.replace('frac{', r'\frac{').replace(' \times ', r'\times ').replace('text{', r'\text{')
-        latex_str = re.sub(r'_([A-Za-z0-9]+)', r'_{\1}', latex_str)
-        latex_str = re.sub(r'\^([A-Za-z0-9]+)', r'^{\1}', latex_str)
-        latex_str = re.sub(r'\(([A-Za-z]+)\)/\(([A-Za-z]+(?:-[A-Za-z]+)?)\)', r'(\1)/(\2)', latex_str)
+        latex_str = _LATEX_SUBSCRIPT_RE.sub(r'_{\1}', latex_str)
+        latex_str = _LATEX_SUPERSCRIPT_RE.sub(r'^{\1}', latex_str)
         for key, val in self.symbol_map.items(): latex_str = latex_str.replace(key.strip('()'), val)
         return latex_str.replace('lambda', r'\lambda')
 
@@ -1342,7 +1476,7 @@ class AnswerGenerator:
                     step_header += "**"
                     text_content.append(step_header)
                     
-                    for block in step.get("blocks", []):
+                    for block in step.get("blocks") or []:
                         process_block(block)
                     
                     text_content.append("")
@@ -1365,34 +1499,29 @@ class AnswerGenerator:
             self.logger.error(f"Error converting answer to clean text: {e}")
             return ""
 
-    def generate_html_string(self, question_data_obj) -> str:
-        """
-        Generates HTML string directly for web rendering.
-        """
-        try:
-            # Extract raw question content
-            q_content_raw = (
-                question_data_obj.get('content', {}).get('body') or
-                question_data_obj.get('content', {}).get('textContent') or
-                question_data_obj.get('content', {}).get('transcribedData') or
-                ""
-            )
-                
-            # Format Answer
-            formatted_answer = self.format_answer_content(question_data_obj)
-            answer_content = self.process_sqna_content_for_html(formatted_answer, mode='display')
-                
-            # Process images in question
-            question_soup = BeautifulSoup(q_content_raw, 'html.parser')
-            for img in question_soup.find_all('img'):
-                if 'src' in img.attrs:
-                    img['style'] = 'max-width: 100%; height: auto; border-radius: 12px;'
-                else: 
-                    img.decompose()
-            formatted_question_content = str(question_soup)
-                
-            # Construct Final HTML
-            html_content = f'''
+    def _solution_page_parts(self, question_data_obj):
+        """Returns: (page head up to the answer, formatted answer, page tail)"""
+        # Extract raw question content
+        q_content_raw = (
+            question_data_obj.get('content', {}).get('body') or
+            question_data_obj.get('content', {}).get('textContent') or
+            question_data_obj.get('content', {}).get('transcribedData') or
+            ""
+        )
+
+        # Format Answer
+        formatted_answer = self.format_answer_content(question_data_obj)
+
+        # Process images in question
+        question_soup = BeautifulSoup(q_content_raw, 'html.parser')
+        for img in question_soup.find_all('img'):
+            if 'src' in img.attrs:
+                img['style'] = 'max-width: 100%; height: auto; border-radius: 12px;'
+            else: 
+                img.decompose()
+        formatted_question_content = str(question_soup)
+
+        head = f'''
             <div class="solution-container animate-fade-in">
                 <div class="mb-8">
                     <h2 class="text-2xl font-bold text-slate-800 mb-4 border-b pb-2">Question</h2>
@@ -1404,12 +1533,37 @@ class AnswerGenerator:
                 <div>
                     <h2 class="text-2xl font-bold text-slate-800 mb-4 border-b pb-2">Solution</h2>
                     <div class="prose max-w-none text-slate-700 bg-white p-6 rounded-xl border border-slate-200 shadow-sm" id="solution-content">
-                        {answer_content}
+                        '''
+        tail = '''
                     </div>
                 </div>
             </div>
             '''
-            return html_content
+        return head, formatted_answer, tail
+
+    def generate_html_iter(self, question_data_obj):
+        """
+        Yields the page HTML in chunks (question, then the answer step by step, then
+        the closing markup) so the view can stream it with flask.stream_template.
+        Joined, the chunks equal generate_html_string(), except that an answer block
+        failing halfway keeps the steps already sent instead of blanking the answer.
+        """
+        head, formatted_answer, tail = self._solution_page_parts(question_data_obj)
+        yield head
+        try:
+            yield from self.iter_sqna_content_html(formatted_answer, mode='display')
+        except Exception as e:
+            self.logger.error(f"Error rendering answer content: {e}")
+        yield tail
+
+    def generate_html_string(self, question_data_obj) -> str:
+        """
+        Generates HTML string directly for web rendering.
+        """
+        try:
+            head, formatted_answer, tail = self._solution_page_parts(question_data_obj)
+            answer_content = self.process_sqna_content_for_html(formatted_answer, mode='display')
+            return head + answer_content + tail
         except Exception as e:
             self.logger.error(f"Error generating HTML: {e}")
             return f"<div class='p-4 bg-red-50 text-red-600 rounded'>Error formatting solution: {str(e)}</div>"
@@ -0,0 +1,106 @@
+"""
+Prometheus metrics, served in the text format at /metrics
+- Background jobs: Chegg checker batch duration, jobs checked by result (solved
+  rate = solved / all), pending-job backlog
+- Chegg: requests and captcha blocks per proxy (captcha rate), failed posts
+- AI: Gemini model fallbacks (quota, timeout, error) per feature and model
+- Video tutoring: active Socket.IO rooms and participants
+- Uploads: bytes received per kind
+
+Multi-process (gunicorn): export PROMETHEUS_MULTIPROC_DIR pointing at an empty,
+writable directory before the workers start (clear it on every deploy). It has to
+be in the process environment (not only .env): prometheus_client reads it when it
+is first imported. Each worker then writes its samples there and /metrics adds them
+up across workers; gunicorn.conf.py's child_exit hook drops the live gauges of dead
+workers. Without the variable, /metrics reports this process only.
+
+Access: a bearer token (METRICS_TOKEN) for the scraper, or a logged-in super admin.
+"""
+
+import os
+import hmac
+from urllib.parse import urlparse
+from prometheus_client import (Counter, Gauge, Histogram, CollectorRegistry, REGISTRY,
+                               generate_latest, CONTENT_TYPE_LATEST, multiprocess)
+
+# Same lookup prometheus_client does when it is imported (see above)
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR') or os.getenv('prometheus_multiproc_dir')
+
+# ─── Background jobs ────────────────────────────────────────────────────
+CHECKER_BATCH_SECONDS = Histogram(
+    'checker_batch_duration_seconds', 'Time to check one batch of pending jobs on Chegg',
+    buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300))
+CHECKER_JOBS = Counter(
+    'checker_jobs_checked_total', 'Pending jobs checked, by result', ['result'])
+PENDING_JOBS = Gauge(
+    'pending_jobs', 'Jobs waiting for an expert answer (as of the last checker run)',
+    multiprocess_mode='mostrecent')
+
+# ─── Chegg ──────────────────────────────────────────────────────────────
+CHEGG_REQUESTS = Counter(
+    'chegg_requests_total', 'Requests to Chegg, by proxy and kind', ['proxy', 'kind'])
+CHEGG_CAPTCHAS = Counter(
+    'chegg_captcha_total', 'Chegg responses blocked by a captcha, by proxy and kind', ['proxy', 'kind'])
+CHEGG_POST_FAILURES = Counter(
+    'chegg_post_failures_total', 'Failed Chegg API posts (safe_post), by proxy and reason', ['proxy', 'reason'])
+
+# ─── AI ─────────────────────────────────────────────────────────────────
+AI_FALLBACKS = Counter(
+    'ai_model_fallbacks_total', 'Gemini calls that fell through to the next model', ['feature', 'model', 'reason'])
+
+# ─── Video tutoring ─────────────────────────────────────────────────────
+VIDEO_ROOMS = Gauge('video_rooms_active', 'Socket.IO rooms with at least one participant',
+                    multiprocess_mode='livesum')
+VIDEO_PARTICIPANTS = Gauge('video_room_participants', 'Participants connected to video rooms',
+                           multiprocess_mode='livesum')
+
+# ─── Uploads ────────────────────────────────────────────────────────────
+UPLOAD_BYTES = Counter('upload_bytes_total', 'Bytes of uploaded files saved, by kind', ['kind'])
+
+
+def proxy_label(proxy):
+    """host:port of a proxy URL (credentials left out), or 'direct'"""
+    if not proxy:
+        return 'direct'
+    parsed = urlparse(proxy if '://' in proxy else f'http://{proxy}')
+    if not parsed.hostname:
+        return 'unknown'
+    return f'{parsed.hostname}:{parsed.port}' if parsed.port else parsed.hostname
+
+
+def record_chegg_request(proxy, kind, captcha=False):
+    label = proxy_label(proxy)
+    CHEGG_REQUESTS.labels(proxy=label, kind=kind).inc()
+    if captcha:
+        CHEGG_CAPTCHAS.labels(proxy=label, kind=kind).inc()
+
+
+def record_upload(kind, path):
+    """Count a saved upload's size (missing files are ignored)"""
+    try:
+        UPLOAD_BYTES.labels(kind=kind).inc(os.path.getsize(path))
+    except OSError:
+        pass
+
+
+def set_video_rooms(room_users):
+    """Update the room gauges from signaling.room_users"""
+    VIDEO_ROOMS.set(sum(1 for users in room_users.values() if users))
+    VIDEO_PARTICIPANTS.set(sum(len(users) for users in room_users.values()))
+
+
+def render():
+    """Returns: (body, content type) for /metrics"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def authorized(request, user):
+    token = os.getenv('METRICS_TOKEN', '')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    return user.is_authenticated and user.role == 'super_admin'
@@ -0,0 +1,528 @@
+"""baseline schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 21:26:15.536712
+
+The schema as db.create_all() built it before migrations were added.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# Databases created with db.create_all() before migrations existed already have
+# most of these tables: upgrade() only adds what is missing, so they can run
+# `flask db upgrade` like a fresh database instead of being stamped by hand.
+_existing_tables = set()
+
+
+def _create_table(name, *columns):
+    if name not in _existing_tables:
+        op.create_table(name, *columns)
+
+
+def _create_index(name, table, columns, unique=False):
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+    if name not in existing:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def _relax_legacy_json_columns(bind):
+    """questions_json / details_json became optional when quiz rows moved to their own tables"""
+    inspector = sa.inspect(bind)
+    for table, column in (('quiz_session', 'questions_json'), ('quiz_attempt', 'details_json')):
+        info = {c['name']: c for c in inspector.get_columns(table)}.get(column)
+        if info and not info['nullable']:
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.alter_column(column, existing_type=sa.Text(), nullable=True)
+
+
+def upgrade():
+    global _existing_tables
+    bind = op.get_bind()
+    _existing_tables = set(sa.inspect(bind).get_table_names())
+    legacy = 'user' in _existing_tables
+
+    _create_table('global_subject',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    _create_table('grade',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('display_order', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('job_cursor',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    _create_table('quiz_question',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=100), nullable=False),
+    sa.Column('grade', sa.String(length=50), nullable=False),
+    sa.Column('difficulty', sa.String(length=20), nullable=True),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.Column('options_json', sa.Text(), nullable=False),
+    sa.Column('answer', sa.String(length=5), nullable=False),
+    sa.Column('explanation', sa.Text(), nullable=True),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash')
+    )
+    _create_index('ix_quiz_question_pool', 'quiz_question', ['subject', 'grade', 'difficulty'], unique=False)
+
+    _create_table('trending_category',
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('category')
+    )
+    _create_table('trending_question',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('question_hash', sa.String(length=64), nullable=False),
+    sa.Column('question', sa.String(length=200), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=True),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'question_hash', name='uq_trending_question_day')
+    )
+    _create_table('tutor',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=150), nullable=False),
+    sa.Column('password', sa.String(length=255), nullable=False),
+    sa.Column('google_id', sa.String(length=100), nullable=True),
+    sa.Column('full_name', sa.String(length=150), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('display_name', sa.String(length=100), nullable=True),
+    sa.Column('bio', sa.Text(), nullable=True),
+    sa.Column('profile_image', sa.String(length=500), nullable=True),
+    sa.Column('qualification', sa.String(length=200), nullable=True),
+    sa.Column('experience_years', sa.Integer(), nullable=True),
+    sa.Column('college', sa.String(length=200), nullable=True),
+    sa.Column('id_proof_path', sa.String(length=500), nullable=True),
+    sa.Column('subjects', sa.String(length=500), nullable=True),
+    sa.Column('teaching_grades', sa.String(length=500), nullable=True),
+    sa.Column('languages', sa.String(length=200), nullable=True),
+    sa.Column('is_approved', sa.Boolean(), nullable=True),
+    sa.Column('is_available', sa.Boolean(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_profile_complete', sa.Boolean(), nullable=True),
+    sa.Column('rating', sa.Float(), nullable=True),
+    sa.Column('total_sessions', sa.Integer(), nullable=True),
+    sa.Column('total_minutes', sa.Integer(), nullable=True),
+    sa.Column('total_earnings', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('approved_at', sa.DateTime(), nullable=True),
+    sa.Column('last_online', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('google_id')
+    )
+    _create_table('subject',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('grade_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['grade_id'], ['grade.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('user',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=150), nullable=False),
+    sa.Column('password', sa.String(length=512), nullable=False),
+    sa.Column('role', sa.String(length=50), nullable=True),
+    sa.Column('credits', sa.Integer(), nullable=True),
+    sa.Column('manager_id', sa.Integer(), nullable=True),
+    sa.Column('google_id', sa.String(length=100), nullable=True),
+    sa.Column('full_name', sa.String(length=150), nullable=True),
+    sa.Column('email', sa.String(length=150), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('bio', sa.Text(), nullable=True),
+    sa.Column('profile_picture', sa.String(length=500), nullable=True),
+    sa.Column('grade_id', sa.Integer(), nullable=True),
+    sa.Column('active_subscription_id', sa.Integer(), nullable=True),
+    sa.Column('student_type', sa.String(length=50), nullable=True),
+    sa.Column('parent_name', sa.String(length=150), nullable=True),
+    sa.Column('parent_phone', sa.String(length=20), nullable=True),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('school_name', sa.String(length=150), nullable=True),
+    sa.Column('class_grade', sa.String(length=50), nullable=True),
+    sa.Column('disability_certificate_path', sa.String(length=255), nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('is_profile_complete', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['active_subscription_id'], ['subscription.id'], name='fk_user_active_subscription', use_alter=True),
+    sa.ForeignKeyConstraint(['grade_id'], ['grade.id'], ),
+    sa.ForeignKeyConstraint(['manager_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('google_id'),
+    sa.UniqueConstraint('username')
+    )
+    _create_table('chat_conversation',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('document',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('doc_type', sa.String(length=50), nullable=True),
+    sa.Column('file_path', sa.String(length=500), nullable=False),
+    sa.Column('file_type', sa.String(length=20), nullable=False),
+    sa.Column('extracted_text', sa.Text(), nullable=True),
+    sa.Column('formatted_content', sa.Text(), nullable=True),
+    sa.Column('thumbnail_path', sa.String(length=500), nullable=True),
+    sa.Column('downloads', sa.Integer(), nullable=True),
+    sa.Column('is_approved', sa.Boolean(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('file_hash', sa.String(length=64), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('feedback',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('is_approved', sa.Boolean(), nullable=True),
+    sa.Column('rating', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=100), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('result_message', sa.Text(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('service_account_name', sa.String(length=100), nullable=True),
+    sa.Column('chegg_link', sa.String(length=500), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('notification',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(length=255), nullable=False),
+    sa.Column('link', sa.String(length=500), nullable=True),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('quiz_attempt',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=100), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.Column('total_questions', sa.Integer(), nullable=True),
+    sa.Column('details_json', sa.Text(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('quiz_session',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=100), nullable=False),
+    sa.Column('grade', sa.String(length=50), nullable=False),
+    sa.Column('difficulty', sa.String(length=20), nullable=True),
+    sa.Column('questions_json', sa.Text(), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('is_completed', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('school_class',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('grade_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('teacher_id', sa.Integer(), nullable=True),
+    sa.Column('room_id', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('scheduled_date', sa.Date(), nullable=False),
+    sa.Column('start_time', sa.String(length=10), nullable=False),
+    sa.Column('end_time', sa.String(length=10), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('ended_at', sa.DateTime(), nullable=True),
+    sa.Column('peak_attendance', sa.Integer(), nullable=True),
+    sa.Column('recording_url', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['grade_id'], ['grade.id'], ),
+    sa.ForeignKeyConstraint(['subject_id'], ['subject.id'], ),
+    sa.ForeignKeyConstraint(['teacher_id'], ['tutor.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('room_id')
+    )
+    _create_table('service_account',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('cookie_data', sa.Text(), nullable=False),
+    sa.Column('proxy', sa.String(length=255), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('questions_posted', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('subscription',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('plan_type', sa.String(length=50), nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=True),
+    sa.Column('end_date', sa.DateTime(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('tutor_credits', sa.Integer(), nullable=True),
+    sa.Column('expert_credits', sa.Integer(), nullable=True),
+    sa.Column('ai_credits', sa.Integer(), nullable=True),
+    sa.Column('tutor_credits_used', sa.Integer(), nullable=True),
+    sa.Column('expert_credits_used', sa.Integer(), nullable=True),
+    sa.Column('ai_credits_used', sa.Integer(), nullable=True),
+    sa.Column('ai_used', sa.Integer(), nullable=True),
+    sa.Column('expert_used', sa.Integer(), nullable=True),
+    sa.Column('tutor_sessions_used', sa.Integer(), nullable=True),
+    sa.Column('payment_id', sa.String(length=100), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('transaction',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('currency', sa.String(length=10), nullable=True),
+    sa.Column('provider', sa.String(length=50), nullable=False),
+    sa.Column('transaction_id', sa.String(length=100), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('transaction_id')
+    )
+    _create_table('tutoring_session',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('room_id', sa.String(length=50), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('tutor_id', sa.Integer(), nullable=False),
+    sa.Column('question', sa.Text(), nullable=True),
+    sa.Column('subject', sa.String(length=100), nullable=True),
+    sa.Column('rate_per_minute', sa.Integer(), nullable=True),
+    sa.Column('credits_paid', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('ended_at', sa.DateTime(), nullable=True),
+    sa.Column('duration_minutes', sa.Integer(), nullable=True),
+    sa.Column('recording_path', sa.String(length=500), nullable=True),
+    sa.Column('chat_log', sa.Text(), nullable=True),
+    sa.Column('student_rating', sa.Integer(), nullable=True),
+    sa.Column('student_feedback', sa.Text(), nullable=True),
+    sa.Column('tutor_notes', sa.Text(), nullable=True),
+    sa.Column('is_flagged', sa.Boolean(), nullable=True),
+    sa.Column('flag_reason', sa.String(length=200), nullable=True),
+    sa.Column('reviewed_by_admin', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['student_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['tutor_id'], ['tutor.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('room_id')
+    )
+    _create_table('video_course',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('thumbnail_path', sa.String(length=500), nullable=True),
+    sa.Column('price', sa.Float(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('display_order', sa.Integer(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('chat_history',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('conversation_id', sa.Integer(), nullable=True),
+    sa.Column('ai_provider', sa.String(length=20), nullable=False),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.Column('answer', sa.Text(), nullable=True),
+    sa.Column('category', sa.String(length=50), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['conversation_id'], ['chat_conversation.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('class_attendance',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('class_id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('joined_at', sa.DateTime(), nullable=True),
+    sa.Column('left_at', sa.DateTime(), nullable=True),
+    sa.Column('duration_minutes', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['class_id'], ['school_class.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('course_purchase',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('amount_paid', sa.Float(), nullable=True),
+    sa.Column('transaction_id', sa.String(length=100), nullable=True),
+    sa.Column('purchased_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['course_id'], ['video_course.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('course_video',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('file_path', sa.String(length=500), nullable=False),
+    sa.Column('file_size_mb', sa.Float(), nullable=True),
+    sa.Column('duration_seconds', sa.Integer(), nullable=True),
+    sa.Column('display_order', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['course_id'], ['video_course.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('credit_ledger',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('entry_type', sa.String(length=20), nullable=False),
+    sa.Column('source', sa.String(length=10), nullable=False),
+    sa.Column('pool', sa.String(length=10), nullable=True),
+    sa.Column('subscription_id', sa.Integer(), nullable=True),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=100), nullable=True),
+    sa.Column('ref_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['ref_id'], ['credit_ledger.id'], ),
+    sa.ForeignKeyConstraint(['subscription_id'], ['subscription.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_credit_ledger_ref', 'credit_ledger', ['ref_id'], unique=False)
+    _create_index('ix_credit_ledger_user_created', 'credit_ledger', ['user_id', 'created_at'], unique=False)
+
+    _create_table('document_unlock',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['document.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('quiz_response',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('attempt_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=100), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('user_ans', sa.String(length=5), nullable=True),
+    sa.Column('is_correct', sa.Boolean(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['attempt_id'], ['quiz_attempt.id'], ),
+    sa.ForeignKeyConstraint(['question_id'], ['quiz_question.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_quiz_response_attempt', 'quiz_response', ['attempt_id', 'position'], unique=False)
+    _create_index('ix_quiz_response_question', 'quiz_response', ['question_id', 'is_correct'], unique=False)
+    _create_index('ix_quiz_response_user_subject', 'quiz_response', ['user_id', 'subject'], unique=False)
+
+    _create_table('quiz_session_question',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['quiz_question.id'], ),
+    sa.ForeignKeyConstraint(['session_id'], ['quiz_session.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('session_id', 'position', name='uq_quiz_session_position')
+    )
+
+    # user <-> subscription reference each other; on databases with ALTER the
+    # user side is added once both tables exist (SQLite keeps it inline)
+    if not legacy and bind.dialect.supports_alter:
+        op.create_foreign_key('fk_user_active_subscription', 'user', 'subscription',
+                              ['active_subscription_id'], ['id'])
+
+    if legacy:
+        _relax_legacy_json_columns(bind)
+
+
+def downgrade():
+    if op.get_bind().dialect.supports_alter:
+        op.drop_constraint('fk_user_active_subscription', 'user', type_='foreignkey')
+    op.drop_table('quiz_session_question')
+    with op.batch_alter_table('quiz_response', schema=None) as batch_op:
+        batch_op.drop_index('ix_quiz_response_user_subject')
+        batch_op.drop_index('ix_quiz_response_question')
+        batch_op.drop_index('ix_quiz_response_attempt')
+
+    op.drop_table('quiz_response')
+    op.drop_table('document_unlock')
+    with op.batch_alter_table('credit_ledger', schema=None) as batch_op:
+        batch_op.drop_index('ix_credit_ledger_user_created')
+        batch_op.drop_index('ix_credit_ledger_ref')
+
+    op.drop_table('credit_ledger')
+    op.drop_table('course_video')
+    op.drop_table('course_purchase')
+    op.drop_table('class_attendance')
+    op.drop_table('chat_history')
+    op.drop_table('video_course')
+    op.drop_table('tutoring_session')
+    op.drop_table('transaction')
+    op.drop_table('subscription')
+    op.drop_table('service_account')
+    op.drop_table('school_class')
+    op.drop_table('quiz_session')
+    op.drop_table('quiz_attempt')
+    op.drop_table('notification')
+    op.drop_table('job')
+    op.drop_table('feedback')
+    op.drop_table('document')
+    op.drop_table('chat_conversation')
+    op.drop_table('user')
+    op.drop_table('subject')
+    op.drop_table('tutor')
+    op.drop_table('trending_question')
+    op.drop_table('trending_category')
+    with op.batch_alter_table('quiz_question', schema=None) as batch_op:
+        batch_op.drop_index('ix_quiz_question_pool')
+
+    op.drop_table('quiz_question')
+    op.drop_table('job_cursor')
+    op.drop_table('grade')
+    op.drop_table('global_subject')
@@ -1,6 +1,8 @@
+import json
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+import entitlements
 
 db = SQLAlchemy()
 
@@ -22,7 +24,8 @@ class User(UserMixin, db.Model):
     grade_id = db.Column(db.Integer, db.ForeignKey('grade.id'), nullable=True)  # Enrolled grade for school
     
     # Subscription
-    active_subscription_id = db.Column(db.Integer, db.ForeignKey('subscription.id'), nullable=True)
+    active_subscription_id = db.Column(db.Integer, db.ForeignKey('subscription.id', use_alter=True, name='fk_user_active_subscription'), nullable=True)
+    active_subscription = db.relationship('Subscription', foreign_keys=[active_subscription_id], post_update=True)
     
     # New Registration Fields
     student_type = db.Column(db.String(50), default='grade') # grade, higher_ed, disabled
@@ -35,54 +38,26 @@ class User(UserMixin, db.Model):
     is_verified = db.Column(db.Boolean, default=True)
     is_profile_complete = db.Column(db.Boolean, default=False) # Profile editable only once
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Kept in sync by notifications.py
     
     service_accounts = db.relationship('ServiceAccount', backref='owner', lazy=True, foreign_keys='ServiceAccount.owner_id')
 
+    __table_args__ = (
+        db.Index('ix_user_email', 'email'),
+        db.Index('ix_user_role', 'role'),
+        db.Index('ix_user_manager', 'manager_id'),
+        db.Index('ix_user_created_at', 'created_at'),
+    )
+
     def can_access(self, feature):
         """
         Checks if the user can access a specific feature based on their subscription.
         Features: 'ai_tutor', 'expert_ask', 'video_tutor', 'school', 'unblur', 'notes'
         Uses per-feature credit pools stored on the Subscription.
         Fallback: Checks self.credits (earned via uploads) if plan credits are exhausted.
+        The answer comes from the request's entitlements snapshot (see entitlements.py).
         """
-        # 1. Super Admin / Admin Bypass
-        if self.role in ['admin', 'super_admin']:
-            return True
-
-        # 2. Exception: Verified Disabled Students for 'school' feature
-        if feature == 'school' and self.student_type == 'disabled' and self.is_verified:
-            return True
-
-        if not self.active_subscription_id:
-            return False
-            
-        sub = Subscription.query.get(self.active_subscription_id)
-        if not sub or not sub.is_active or sub.end_date < datetime.utcnow():
-            return False
-
-        # 3. Feature-specific credit pool checks and Fallback
-        
-        # --- SCHOOL ACCESS (only school_1200 plan) ---
-        if feature == 'school':
-            return sub.plan_type == 'school_1200'
-
-        # --- UNLIMITED FEATURES (all paid plans) ---
-        if feature in ['unblur', 'notes']:
-            return True
-
-        # --- AI TUTOR: check credit pool OR wallet ---
-        if feature == 'ai_tutor':
-            return sub.ai_credits_used < sub.ai_credits or self.credits > 0
-
-        # --- EXPERT ASK: check credit pool OR wallet ---
-        if feature == 'expert_ask':
-            return sub.expert_credits_used < sub.expert_credits or self.credits > 0
-
-        # --- VIDEO TUTOR: check credit pool OR wallet ---
-        if feature == 'video_tutor':
-            return sub.tutor_credits_used < sub.tutor_credits or self.credits > 0
-            
-        return False
+        return entitlements.for_user(self).can_access(feature)
 
 
 class ServiceAccount(db.Model):
@@ -93,6 +68,10 @@ class ServiceAccount(db.Model):
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     questions_posted = db.Column(db.Integer, default=0)  # Auto-rotation: switch account after 20
 
+    __table_args__ = (
+        db.Index('ix_service_account_owner', 'owner_id'),
+    )
+
 class Job(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -104,6 +83,12 @@ class Job(db.Model):
     service_account_name = db.Column(db.String(100), nullable=True)
     chegg_link = db.Column(db.String(500), nullable=True) # URL of the posted question
 
+    __table_args__ = (
+        db.Index('ix_job_user_timestamp', 'user_id', 'timestamp'),  # Dashboard / history lists
+        db.Index('ix_job_status', 'status'),                        # Pending-job poller, solved counts
+        db.Index('ix_job_timestamp', 'timestamp'),                  # Super admin global feed
+    )
+
 class Notification(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -111,10 +96,18 @@ class Notification(db.Model):
     link = db.Column(db.String(500), nullable=True)  # Link to the solved answer
     is_read = db.Column(db.Boolean, default=False)   # False = Unread (Dark), True = Read (Light)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    dedup_key = db.Column(db.String(64), nullable=True)  # Alerts with the same key aren't repeated while unread
 
     # Relationship to user
     user = db.relationship('User', backref=db.backref('notifications', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_notification_user_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_notification_user_unread', 'user_id', 'is_read'),
+        db.Index('ix_notification_user_dedup', 'user_id', 'dedup_key', 'is_read'),
+        db.Index('ix_notification_read_timestamp', 'is_read', 'timestamp'),
+    )
+
 class ChatConversation(db.Model):
     """Groups chat messages into distinct conversations for the sidebar"""
     id = db.Column(db.Integer, primary_key=True)
@@ -126,6 +119,10 @@ class ChatConversation(db.Model):
     user = db.relationship('User', backref=db.backref('chat_conversations', lazy=True))
     messages = db.relationship('ChatHistory', backref='conversation', lazy=True, order_by='ChatHistory.timestamp')
 
+    __table_args__ = (
+        db.Index('ix_chat_conversation_user_updated', 'user_id', 'updated_at'),
+    )
+
 class ChatHistory(db.Model):
     """Stores AI Tutor conversations for history and analytics"""
     id = db.Column(db.Integer, primary_key=True)
@@ -139,6 +136,29 @@ class ChatHistory(db.Model):
     
     user = db.relationship('User', backref=db.backref('chat_history', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_chat_history_conversation_timestamp', 'conversation_id', 'timestamp'),
+        db.Index('ix_chat_history_user_provider_timestamp', 'user_id', 'ai_provider', 'timestamp'),
+    )
+
+class TrendingCategory(db.Model):
+    """Running count of AI Tutor questions per category (maintained by trending.refresh_trending)"""
+    category = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class TrendingQuestion(db.Model):
+    """Daily count of identical AI Tutor questions (maintained by trending.refresh_trending)"""
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    question_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of category + full question text
+    question = db.Column(db.String(200), nullable=False)  # Truncated, for display only
+    category = db.Column(db.String(50), nullable=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('day', 'question_hash', name='uq_trending_question_day'),
+    )
+
 class Document(db.Model):
     """Stores uploaded documents in the library"""
     id = db.Column(db.Integer, primary_key=True)
@@ -158,6 +178,11 @@ class Document(db.Model):
     
     user = db.relationship('User', backref=db.backref('documents', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_document_approved_timestamp', 'is_approved', 'timestamp'),  # Library listing
+        db.Index('ix_document_user_hash', 'user_id', 'file_hash'),               # Duplicate upload check, upload counts
+    )
+
 class DocumentUnlock(db.Model):
     """Tracks which users have unlocked which documents"""
     id = db.Column(db.Integer, primary_key=True)
@@ -168,6 +193,10 @@ class DocumentUnlock(db.Model):
     user = db.relationship('User', backref=db.backref('unlocks', lazy=True))
     document = db.relationship('Document', backref=db.backref('unlocks', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_document_unlock_user_document', 'user_id', 'document_id'),
+    )
+
 class Feedback(db.Model):
     """Stores user feedback for the landing page"""
     id = db.Column(db.Integer, primary_key=True)
@@ -179,6 +208,10 @@ class Feedback(db.Model):
     
     user = db.relationship('User', backref=db.backref('feedbacks', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_feedback_approved_created', 'is_approved', 'created_at'),
+    )
+
 
 # ============================================
 # VIDEO TUTORING MODELS
@@ -233,6 +266,10 @@ class Tutor(db.Model):
     # Relationships
     sessions = db.relationship('TutoringSession', backref='tutor', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_tutor_created_at', 'created_at'),
+    )
+
 
 class TutoringSession(db.Model):
     """Tracks video tutoring sessions between students and tutors"""
@@ -279,6 +316,12 @@ class TutoringSession(db.Model):
     # Relationships
     student = db.relationship('User', backref=db.backref('tutoring_sessions', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_tutoring_session_tutor_status', 'tutor_id', 'status', 'created_at'),
+        db.Index('ix_tutoring_session_tutor_created', 'tutor_id', 'created_at'),
+        db.Index('ix_tutoring_session_student_created', 'student_id', 'created_at'),
+    )
+
 
 # ============================================
 # ONLINE SCHOOL MODELS
@@ -345,6 +388,11 @@ class SchoolClass(db.Model):
     grade = db.relationship('Grade', backref=db.backref('school_classes', lazy=True))
     attendees = db.relationship('ClassAttendance', backref='school_class', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_school_class_grade_date', 'grade_id', 'scheduled_date', 'start_time'),
+        db.Index('ix_school_class_teacher_date', 'teacher_id', 'scheduled_date'),
+    )
+
 
 class ClassAttendance(db.Model):
     """Tracks student attendance in school classes"""
@@ -360,6 +408,10 @@ class ClassAttendance(db.Model):
     # Relationships
     student = db.relationship('User', backref=db.backref('class_attendance', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_class_attendance_class_student', 'class_id', 'student_id'),
+    )
+
 
 # ============================================
 # PAYMENT & SUBSCRIPTION MODELS
@@ -392,6 +444,10 @@ class Subscription(db.Model):
     
     user = db.relationship('User', backref=db.backref('subscriptions', lazy=True), foreign_keys=[user_id])
 
+    __table_args__ = (
+        db.Index('ix_subscription_user_active', 'user_id', 'is_active'),
+    )
+
 class Transaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -404,6 +460,24 @@ class Transaction(db.Model):
     
     user = db.relationship('User', backref=db.backref('transactions', lazy=True))
 
+class CreditLedger(db.Model):
+    """Append-only record of every credit movement (see credit_ledger.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    entry_type = db.Column(db.String(20), nullable=False)  # 'charge', 'reserve', 'commit', 'refund', 'grant'
+    source = db.Column(db.String(10), nullable=False)      # 'plan' or 'wallet'
+    pool = db.Column(db.String(10), nullable=True)         # 'ai', 'expert', 'tutor' for plan credits
+    subscription_id = db.Column(db.Integer, db.ForeignKey('subscription.id'), nullable=True)
+    amount = db.Column(db.Integer, nullable=False)         # Negative = spent, positive = given back/granted
+    reason = db.Column(db.String(100), nullable=True)
+    ref_id = db.Column(db.Integer, db.ForeignKey('credit_ledger.id'), nullable=True)  # Reservation a commit/refund settles
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_credit_ledger_user_created', 'user_id', 'created_at'),
+        db.Index('ix_credit_ledger_ref', 'ref_id'),
+    )
+
 
 # ============================================
 # VIDEO COURSES MODELS
@@ -439,6 +513,10 @@ class CourseVideo(db.Model):
     display_order = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_course_video_course_order', 'course_id', 'display_order'),
+    )
+
 
 class CoursePurchase(db.Model):
     """Tracks which users have purchased which courses"""
@@ -451,6 +529,10 @@ class CoursePurchase(db.Model):
 
     user = db.relationship('User', backref=db.backref('course_purchases', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_course_purchase_user_course', 'user_id', 'course_id'),
+    )
+
 
 # ============================================
 # AI QUIZ MODELS
@@ -464,14 +546,38 @@ class QuizSession(db.Model):
     grade = db.Column(db.String(50), nullable=False)
     difficulty = db.Column(db.String(20), default='hard')
     
-    # JSON Blob of questions: [{q: '...', options: {...}, answer: 'A'}, ...]
-    questions_json = db.Column(db.Text, nullable=False) 
+    # Legacy JSON blob of questions, only set on sessions created before quiz_session_question existed
+    questions_json = db.Column(db.Text, nullable=True) 
     
     start_time = db.Column(db.DateTime, default=datetime.utcnow)
     is_completed = db.Column(db.Boolean, default=False)
     
     user = db.relationship('User', backref=db.backref('quiz_sessions', lazy=True))
 
+class QuizQuestion(db.Model):
+    """Pre-generated question bank, pooled per (subject, grade, difficulty)"""
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(100), nullable=False)
+    grade = db.Column(db.String(50), nullable=False)
+    difficulty = db.Column(db.String(20), default='hard')
+    
+    question = db.Column(db.Text, nullable=False)
+    options_json = db.Column(db.Text, nullable=False)  # {"A": "...", "B": "...", "C": "...", "D": "..."}
+    answer = db.Column(db.String(5), nullable=False)
+    explanation = db.Column(db.Text, nullable=True)
+    
+    # SHA-256 of the normalized question text, used to skip duplicates and seen questions
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_quiz_question_pool', 'subject', 'grade', 'difficulty'),
+    )
+    
+    @property
+    def options(self):
+        return json.loads(self.options_json)
+
 class QuizAttempt(db.Model):
     """Stores completed quiz results"""
     id = db.Column(db.Integer, primary_key=True)
@@ -480,9 +586,57 @@ class QuizAttempt(db.Model):
     score = db.Column(db.Integer, nullable=False) # e.g. 8 (out of 10)
     total_questions = db.Column(db.Integer, default=10)
     
-    # JSON Blob of results: [{q: '...', user_ans: 'A', correct_ans: 'A', correct: True}, ...]
+    # Legacy JSON blob of results, only set on attempts created before quiz_response existed
     details_json = db.Column(db.Text, nullable=True) 
     
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     
     user = db.relationship('User', backref=db.backref('quiz_attempts', lazy=True))
+
+class QuizSessionQuestion(db.Model):
+    """Questions served in a quiz session, in display order"""
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('quiz_session.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('quiz_question.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)  # 0-based, matches the answer keys posted by the quiz page
+    
+    question = db.relationship('QuizQuestion')
+    
+    __table_args__ = (
+        db.UniqueConstraint('session_id', 'position', name='uq_quiz_session_position'),
+    )
+
+class QuizResponse(db.Model):
+    """One answered question of a completed attempt (one row per question)"""
+    id = db.Column(db.Integer, primary_key=True)
+    attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempt.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('quiz_question.id'), nullable=False)
+    subject = db.Column(db.String(100), nullable=False)  # Denormalized from the attempt for per-subject reports
+    position = db.Column(db.Integer, nullable=False)
+    
+    user_ans = db.Column(db.String(5), nullable=True)  # None = unanswered
+    is_correct = db.Column(db.Boolean, nullable=False, default=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    question = db.relationship('QuizQuestion')
+    
+    __table_args__ = (
+        db.Index('ix_quiz_response_attempt', 'attempt_id', 'position'),
+        db.Index('ix_quiz_response_user_subject', 'user_id', 'subject'),
+        db.Index('ix_quiz_response_question', 'question_id', 'is_correct'),
+    )
+
+class JobCursor(db.Model):
+    """High-water mark for background jobs that process a table incrementally"""
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DailyStats(db.Model):
+    """Per-day rollup of signups and plans for the admin stats (days before yesterday, see stats.py)"""
+    day = db.Column(db.Date, primary_key=True)
+    signups = db.Column(db.Integer, nullable=False, default=0)        # Student accounts created that day
+    tutor_signups = db.Column(db.Integer, nullable=False, default=0)  # Tutor registrations that day
+    active_plans = db.Column(db.Integer, nullable=False, default=0)   # Subscriptions running on that day
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,107 @@
+"""
+Notifications
+- notify(user_id, message, link, dedup_key): queue a notification and bump the
+  recipient's unread counter (User.unread_notifications) in the same transaction.
+  With a dedup_key nothing is added while an alert with that key is still unread
+  for the user (an indexed lookup, not a scan of the user's messages)
+- notify_super_admins(...): the same alert to every super admin
+- mark_all_read(user_id): marks the unread rows read and zeroes the counter; a
+  user with a zero counter costs no UPDATE at all
+- compact_notifications(): scheduler job - deletes read notifications older than
+  NOTIFICATION_RETENTION_DAYS in batches, then re-syncs counters that drifted
+
+notify*() only add to the session; callers commit with the rest of their work.
+"""
+
+import os
+import hashlib
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, and_
+from models import db, User, Notification
+
+# Read notifications older than this many days are deleted by the compaction job
+# (default of NOTIFICATION_RETENTION_DAYS, read on every run so .env applies)
+NOTIFICATION_RETENTION_DAYS = 30
+
+BATCH_SIZE = 5000
+
+
+def dedup_key_for(message):
+    """Stable key for an alert text (used when the caller has no natural key)"""
+    return hashlib.sha256(message.encode('utf-8')).hexdigest()
+
+
+def _bump_unread(user_id, amount):
+    User.query.filter_by(id=user_id)\
+              .update({User.unread_notifications: User.unread_notifications + amount}, synchronize_session=False)
+
+
+def notify(user_id, message, link=None, dedup_key=None):
+    """
+    Queue a notification for user_id (the caller commits).
+    Returns: the new Notification, or None if an unread one with dedup_key exists
+    """
+    if dedup_key:
+        exists = db.session.query(Notification.id).filter_by(
+            user_id=user_id, dedup_key=dedup_key, is_read=False
+        ).first()
+        if exists:
+            return None
+
+    notification = Notification(user_id=user_id, message=message[:255], link=link, dedup_key=dedup_key)
+    db.session.add(notification)
+    _bump_unread(user_id, 1)
+    return notification
+
+
+def notify_super_admins(message, link=None, dedup_key=None):
+    """Queue the same alert for every super admin. Returns: number of notifications added"""
+    admin_ids = [row.id for row in db.session.query(User.id).filter_by(role='super_admin')]
+    return sum(1 for admin_id in admin_ids if notify(admin_id, message, link, dedup_key) is not None)
+
+
+def mark_all_read(user_id):
+    """Mark all of the user's notifications read (the caller commits)"""
+    unread = db.session.query(User.unread_notifications).filter_by(id=user_id).scalar()
+    if not unread:
+        return
+    Notification.query.filter_by(user_id=user_id, is_read=False)\
+                      .update({'is_read': True}, synchronize_session=False)
+    User.query.filter_by(id=user_id).update({'unread_notifications': 0}, synchronize_session=False)
+
+
+def sync_unread_counts():
+    """Recompute User.unread_notifications where it disagrees with the notification rows"""
+    actual = select(func.count(Notification.id))\
+        .where(and_(Notification.user_id == User.id, Notification.is_read == False))\
+        .scalar_subquery()
+    result = db.session.execute(
+        User.__table__.update().where(User.unread_notifications != actual).values(unread_notifications=actual)
+    )
+    return result.rowcount
+
+
+def compact_notifications(max_batches=20):
+    """
+    Delete read notifications past the retention window and fix drifted counters.
+    Must run inside an app context.
+    Returns: (deleted, counters_fixed)
+    """
+    retention_days = int(os.getenv('NOTIFICATION_RETENTION_DAYS', NOTIFICATION_RETENTION_DAYS))
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = 0
+    for _ in range(max_batches):
+        ids = [row.id for row in db.session.query(Notification.id)
+                                           .filter(Notification.is_read == True, Notification.timestamp < cutoff)
+                                           .limit(BATCH_SIZE)]
+        if not ids:
+            break
+        Notification.query.filter(Notification.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+        if len(ids) < BATCH_SIZE:
+            break
+
+    fixed = sync_unread_counts()
+    db.session.commit()
+    return deleted, fixed
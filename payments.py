@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash
 from flask_login import login_required, current_user
 from models import db, User, Subscription, Transaction
+import entitlements
 import stripe
 import razorpay
 from datetime import datetime, timedelta
@@ -141,6 +142,7 @@ def payment_success(provider, plan_id):
     # Update User's active subscription ID
     current_user.active_subscription_id = new_sub.id
     db.session.commit()
+    entitlements.invalidate(current_user.id)
     
     # Record Transaction (Placeholder ID)
     txn_id = request.args.get('session_id') or request.args.get('razorpay_payment_id') or f"txn_{int(datetime.utcnow().timestamp())}"
@@ -0,0 +1,237 @@
+"""
+Request instrumentation (opt-in: PERF_INSTRUMENTATION=1)
+- Per request: wall time, SQL statement count and time (SQLAlchemy cursor events),
+  outbound HTTP calls through requests (Chegg, Gemini, Brevo, Stripe...) with their
+  latency, and template render time
+- Every instrumented response gets a Server-Timing header (visible in the browser's
+  network panel) and one "[PERF] {json}" log line
+- Per-route totals and recent samples are kept in memory for the super admin
+  /lone-admin/perf page (slowest routes first); they are per worker process
+- debug(message) replaces ad-hoc "DEBUG:" prints: with instrumentation on the message
+  goes into the request's log line (or is printed outside requests), otherwise it is dropped
+
+Wall time stops when the view returns, so the body of a streamed response
+(stream_template) is not included. Async httpx calls are not counted.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from urllib.parse import urlparse
+from flask import g, request, has_app_context
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+
+PERF_ENABLED = os.getenv('PERF_INSTRUMENTATION', '0') == '1'
+PERF_LOG_MIN_MS = float(os.getenv('PERF_LOG_MIN_MS', '0'))  # Only log requests slower than this
+PERF_SAMPLES = int(os.getenv('PERF_SAMPLES', '200'))       # Recent durations kept per route
+
+# Host suffix -> service name in the HTTP breakdown
+HTTP_SERVICES = {
+    'chegg.com': 'chegg',
+    'googleapis.com': 'gemini',
+    'openai.com': 'openai',
+    'brevo.com': 'brevo',
+    'stripe.com': 'stripe',
+    'razorpay.com': 'razorpay',
+}
+
+_routes_lock = threading.Lock()
+_routes = {}
+_original_send = None
+
+
+def _current():
+    """This request's measurements, or None outside an instrumented request"""
+    if not has_app_context():
+        return None
+    return g.get('_perf')
+
+
+def service_name(url):
+    host = urlparse(url).hostname or ''
+    for suffix, name in HTTP_SERVICES.items():
+        if host == suffix or host.endswith('.' + suffix):
+            return name
+    return host
+
+
+def debug(message):
+    """Debug output that only appears with instrumentation on"""
+    if not PERF_ENABLED:
+        return
+    perf = _current()
+    if perf is not None:
+        perf['notes'].append(str(message)[:300])
+    else:
+        print(f"[DEBUG] {message}")
+
+
+# ─── Hooks ──────────────────────────────────────────────────────────────
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_perf_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_perf_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    perf = _current()
+    if perf is not None:
+        perf['sql_count'] += 1
+        perf['sql_time'] += elapsed
+
+
+def _timed_send(self, prepared, **kwargs):
+    perf = _current()
+    if perf is None:
+        return _original_send(self, prepared, **kwargs)
+    start = time.perf_counter()
+    status = None
+    try:
+        response = _original_send(self, prepared, **kwargs)
+        status = response.status_code
+        return response
+    finally:
+        perf['http'].append({
+            'service': service_name(prepared.url),
+            'method': prepared.method,
+            'ms': round((time.perf_counter() - start) * 1000, 2),
+            'status': status,
+        })
+
+
+def _before_render(sender, template, context, **extra):
+    perf = _current()
+    if perf is not None:
+        perf['tpl_start'][id(template)] = time.perf_counter()
+
+
+def _rendered(sender, template, context, **extra):
+    perf = _current()
+    if perf is None:
+        return
+    start = perf['tpl_start'].pop(id(template), None)
+    if start is not None:
+        perf['tpl_time'] += time.perf_counter() - start
+        perf['templates'].append(template.name)
+
+
+def _start_request():
+    g._perf = {
+        'start': time.perf_counter(),
+        'sql_count': 0, 'sql_time': 0.0,
+        'http': [],
+        'tpl_start': {}, 'tpl_time': 0.0, 'templates': [],
+        'notes': [],
+    }
+
+
+def _finish_request(response):
+    perf = g.pop('_perf', None)
+    if perf is None:
+        return response
+    total_ms = (time.perf_counter() - perf['start']) * 1000
+    sql_ms = perf['sql_time'] * 1000
+    http_ms = sum(call['ms'] for call in perf['http'])
+    tpl_ms = perf['tpl_time'] * 1000
+
+    timings = [
+        f'app;dur={total_ms:.1f}',
+        f'db;dur={sql_ms:.1f};desc="{perf["sql_count"]} queries"',
+        f'http;dur={http_ms:.1f};desc="{len(perf["http"])} calls"',
+        f'tpl;dur={tpl_ms:.1f}',
+    ]
+    response.headers.add('Server-Timing', ', '.join(timings))
+
+    endpoint = request.endpoint or request.path
+    _aggregate(f'{request.method} {endpoint}', total_ms, perf['sql_count'], sql_ms, http_ms, tpl_ms)
+
+    if total_ms >= PERF_LOG_MIN_MS:
+        record = {
+            'method': request.method, 'path': request.path, 'endpoint': endpoint,
+            'status': response.status_code, 'ms': round(total_ms, 1),
+            'sql': perf['sql_count'], 'sql_ms': round(sql_ms, 1),
+            'http': perf['http'], 'tpl_ms': round(tpl_ms, 1), 'templates': perf['templates'],
+        }
+        if perf['notes']:
+            record['notes'] = perf['notes']
+        print(f"[PERF] {json.dumps(record, separators=(',', ':'))}")
+    return response
+
+
+# ─── Aggregates ─────────────────────────────────────────────────────────
+def _aggregate(route, total_ms, sql_count, sql_ms, http_ms, tpl_ms):
+    with _routes_lock:
+        stats = _routes.get(route)
+        if stats is None:
+            stats = _routes[route] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'sql': 0, 'sql_ms': 0.0,
+                                      'http_ms': 0.0, 'tpl_ms': 0.0, 'samples': deque(maxlen=PERF_SAMPLES)}
+        stats['count'] += 1
+        stats['total_ms'] += total_ms
+        stats['max_ms'] = max(stats['max_ms'], total_ms)
+        stats['sql'] += sql_count
+        stats['sql_ms'] += sql_ms
+        stats['http_ms'] += http_ms
+        stats['tpl_ms'] += tpl_ms
+        stats['samples'].append(total_ms)
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[round((len(ordered) - 1) * fraction)]
+
+
+def slowest_routes(limit=50):
+    """Per-route averages and recent p50/p95, slowest p95 first"""
+    with _routes_lock:
+        snapshot = [(route, dict(stats, samples=list(stats['samples']))) for route, stats in _routes.items()]
+
+    rows = []
+    for route, stats in snapshot:
+        count = stats['count']
+        rows.append({
+            'route': route,
+            'count': count,
+            'avg_ms': round(stats['total_ms'] / count, 1),
+            'p50_ms': round(_percentile(stats['samples'], 0.5), 1),
+            'p95_ms': round(_percentile(stats['samples'], 0.95), 1),
+            'max_ms': round(stats['max_ms'], 1),
+            'avg_sql': round(stats['sql'] / count, 1),
+            'avg_sql_ms': round(stats['sql_ms'] / count, 1),
+            'avg_http_ms': round(stats['http_ms'] / count, 1),
+            'avg_tpl_ms': round(stats['tpl_ms'] / count, 1),
+        })
+    rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return rows[:limit]
+
+
+def reset():
+    with _routes_lock:
+        _routes.clear()
+
+
+def init_app(app, db):
+    """Install the hooks when PERF_INSTRUMENTATION=1 (call after db.init_app)"""
+    global _original_send
+    if not PERF_ENABLED:
+        return
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    import requests
+    if _original_send is None:
+        _original_send = requests.Session.send
+        requests.Session.send = _timed_send
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_request)  # Before the other hooks
+    app.after_request(_finish_request)
+    print("[PERF] Request instrumentation enabled")
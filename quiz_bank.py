@@ -0,0 +1,252 @@
+"""
+Quiz bank module
+- Pool of validated AI-generated questions per (subject, grade, difficulty)
+- Instant quiz draws that skip questions the student has already seen
+- Background refill of pools that fall below the low-water mark
+- Per-subject / per-question accuracy reports (SQL aggregates over quiz_response)
+"""
+
+import os
+import json
+import random
+import hashlib
+from sqlalchemy.exc import IntegrityError
+from models import db, QuizQuestion, QuizAttempt, QuizResponse, Subject, Grade
+from ai_tutor import generate_quiz
+
+QUIZ_SIZE = 5
+
+# Refill a pool when it has fewer than this many questions
+POOL_LOW_WATER = int(os.getenv('QUIZ_POOL_LOW_WATER', '25'))
+
+# Cap Gemini calls per scheduler run so the refill never eats the whole free quota
+MAX_GENERATIONS_PER_RUN = int(os.getenv('QUIZ_POOL_MAX_GENERATIONS', '4'))
+
+DEFAULT_DIFFICULTY = 'hard'
+
+
+def question_hash(question_text):
+    """Stable hash of the question text (case/whitespace-insensitive)"""
+    normalized = ' '.join((question_text or '').lower().split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def pool_size(subject, grade, difficulty=DEFAULT_DIFFICULTY):
+    """Number of questions currently banked for a pool"""
+    return QuizQuestion.query.filter_by(subject=subject, grade=grade, difficulty=difficulty).count()
+
+
+def _bank(subject, grade, difficulty, questions):
+    """
+    Store questions in the pool, reusing rows for ones already banked.
+    A refill and a cold-pool start (or two cold starts) can bank the same question at
+    once; each insert runs in its own savepoint, and one that loses the race on the
+    unique content_hash picks up the row the other request stored.
+    Returns: (rows in input order, number of new rows)
+    """
+    by_hash = {}
+    for q in questions or []:
+        by_hash.setdefault(question_hash(q['question']), q)
+    if not by_hash:
+        return [], 0
+
+    rows = {
+        row.content_hash: row for row in
+        QuizQuestion.query.filter(QuizQuestion.content_hash.in_(list(by_hash.keys()))).all()
+    }
+
+    added = 0
+    for h, q in by_hash.items():
+        if h in rows:
+            continue
+        row = QuizQuestion(
+            subject=subject,
+            grade=grade,
+            difficulty=difficulty,
+            question=q['question'],
+            options_json=json.dumps(q['options']),
+            answer=q['answer'],
+            explanation=q.get('explanation'),
+            content_hash=h
+        )
+        try:
+            with db.session.begin_nested():
+                db.session.add(row)
+            rows[h] = row
+            added += 1
+        except IntegrityError:
+            # Banked by a concurrent request in the meantime
+            rows[h] = QuizQuestion.query.filter_by(content_hash=h).first()
+
+    db.session.commit()
+    return [rows[h] for h in by_hash if rows[h] is not None], added
+
+
+def add_questions(subject, grade, difficulty, questions):
+    """
+    Store validated questions (as returned by generate_quiz) in the pool.
+    Duplicates of already banked questions are skipped.
+    Returns: number of questions added
+    """
+    return _bank(subject, grade, difficulty, questions)[1]
+
+
+def bank_quiz(subject, grade, difficulty, questions):
+    """Bank freshly generated questions and return their QuizQuestion rows (cold-pool fallback)"""
+    return _bank(subject, grade, difficulty, questions)[0]
+
+
+def seen_question_ids(user_id, subject):
+    """Ids of every banked question the user has already answered in this subject"""
+    return {
+        qid for (qid,) in db.session.query(QuizResponse.question_id)
+        .filter_by(user_id=user_id, subject=subject).distinct().all()
+    }
+
+
+def _legacy_seen_hashes(user_id, subject):
+    """Hashes of questions answered in attempts saved before quiz_response existed"""
+    seen = set()
+    attempts = QuizAttempt.query.filter(
+        QuizAttempt.user_id == user_id,
+        QuizAttempt.subject == subject,
+        QuizAttempt.details_json.isnot(None)
+    ).with_entities(QuizAttempt.details_json).all()
+    for (details_json,) in attempts:
+        try:
+            for detail in json.loads(details_json):
+                seen.add(question_hash(detail.get('question')))
+        except (ValueError, AttributeError):
+            continue
+    return seen
+
+
+def draw_quiz(user_id, subject, grade, difficulty=DEFAULT_DIFFICULTY, size=QUIZ_SIZE):
+    """
+    Pick `size` questions from the pool, preferring ones the user hasn't seen.
+    Seen questions are only reused when the pool has run out of fresh ones.
+    Returns: list of QuizQuestion rows, empty if the pool is too small
+    """
+    candidates = db.session.query(QuizQuestion.id, QuizQuestion.content_hash).filter_by(
+        subject=subject, grade=grade, difficulty=difficulty
+    ).all()
+    if len(candidates) < size:
+        return []
+
+    seen_ids = seen_question_ids(user_id, subject)
+    seen_hashes = _legacy_seen_hashes(user_id, subject)
+    is_seen = lambda qid, h: qid in seen_ids or h in seen_hashes
+    fresh = [qid for qid, h in candidates if not is_seen(qid, h)]
+    stale = [qid for qid, h in candidates if is_seen(qid, h)]
+
+    random.shuffle(fresh)
+    chosen = fresh[:size]
+    if len(chosen) < size:
+        chosen += random.sample(stale, size - len(chosen))
+
+    rows = {row.id: row for row in QuizQuestion.query.filter(QuizQuestion.id.in_(chosen)).all()}
+    return [rows[qid] for qid in chosen if qid in rows]
+
+
+def refill_pool(subject, grade, difficulty=DEFAULT_DIFFICULTY, max_generations=1):
+    """
+    Generate questions into a pool until it reaches the low-water mark.
+    Returns: number of Gemini generations used
+    """
+    used = 0
+    while used < max_generations and pool_size(subject, grade, difficulty) < POOL_LOW_WATER:
+        used += 1
+        questions = generate_quiz(subject, grade, difficulty=difficulty)
+        if not add_questions(subject, grade, difficulty, questions):
+            break  # Quota exhausted or only duplicates came back, try again next run
+    return used
+
+
+def refill_low_pools():
+    """
+    Background job: top up every active subject's pool that is below the low-water mark.
+    Emptiest pools go first, one generation each, up to MAX_GENERATIONS_PER_RUN.
+    Must run inside an app context.
+    """
+    pools = db.session.query(Subject.name, Grade.name).join(Grade, Subject.grade_id == Grade.id)\
+                      .filter(Subject.is_active == True, Grade.is_active == True).distinct().all()
+    if not pools:
+        return
+
+    counts = dict(
+        ((s, g), c) for s, g, c in db.session.query(
+            QuizQuestion.subject, QuizQuestion.grade, db.func.count(QuizQuestion.id)
+        ).filter_by(difficulty=DEFAULT_DIFFICULTY).group_by(QuizQuestion.subject, QuizQuestion.grade).all()
+    )
+
+    low_pools = sorted(
+        (counts.get((s, g), 0), s, g) for s, g in pools if counts.get((s, g), 0) < POOL_LOW_WATER
+    )
+
+    budget = MAX_GENERATIONS_PER_RUN
+    for _, subject, grade in low_pools:
+        if budget <= 0:
+            break
+        budget -= refill_pool(subject, grade, DEFAULT_DIFFICULTY, max_generations=1)
+
+    if low_pools:
+        print(f"[Quiz Bank] {len(low_pools)} pool(s) below {POOL_LOW_WATER}, used {MAX_GENERATIONS_PER_RUN - budget} generation(s)")
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  REPORTS
+# ═══════════════════════════════════════════════════════════════════════
+def _accuracy(correct, answered):
+    return round(100.0 * correct / answered, 1) if answered else 0.0
+
+
+def subject_accuracy(user_id=None):
+    """
+    Accuracy per subject, for one student or (user_id=None) across all students.
+    Returns: [{'subject', 'answered', 'correct', 'accuracy'}], weakest subject first
+    """
+    correct_sum = db.func.sum(db.case((QuizResponse.is_correct == True, 1), else_=0))
+    query = db.session.query(
+        QuizResponse.subject, db.func.count(QuizResponse.id), correct_sum
+    )
+    if user_id is not None:
+        query = query.filter(QuizResponse.user_id == user_id)
+
+    rows = query.group_by(QuizResponse.subject).all()
+    report = [{
+        'subject': subject,
+        'answered': answered,
+        'correct': int(correct or 0),
+        'accuracy': _accuracy(correct or 0, answered)
+    } for subject, answered, correct in rows]
+    return sorted(report, key=lambda r: r['accuracy'])
+
+
+def question_accuracy(subject=None, grade=None, min_responses=5, limit=50):
+    """
+    Per-question accuracy across all students, hardest questions first.
+    Questions with fewer than `min_responses` answers are left out as noise.
+    """
+    correct_sum = db.func.sum(db.case((QuizResponse.is_correct == True, 1), else_=0))
+    answered = db.func.count(QuizResponse.id)
+    query = db.session.query(
+        QuizQuestion.id, QuizQuestion.subject, QuizQuestion.grade, QuizQuestion.question,
+        answered, correct_sum
+    ).join(QuizResponse, QuizResponse.question_id == QuizQuestion.id)
+
+    if subject:
+        query = query.filter(QuizQuestion.subject == subject)
+    if grade:
+        query = query.filter(QuizQuestion.grade == grade)
+
+    rows = query.group_by(QuizQuestion.id).having(answered >= min_responses)\
+                .order_by((1.0 * correct_sum / answered).asc()).limit(limit).all()
+    return [{
+        'question_id': qid,
+        'subject': subj,
+        'grade': grd,
+        'question': text,
+        'answered': n,
+        'correct': int(c or 0),
+        'accuracy': _accuracy(c or 0, n)
+    } for qid, subj, grd, text, n, c in rows]
@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash
 from flask_login import login_required, current_user
-from models import db, QuizSession, QuizAttempt, Subject
+from models import db, QuizSession, QuizAttempt, QuizSessionQuestion, QuizResponse, QuizQuestion, Subject
 from ai_tutor import generate_quiz
+from quiz_bank import draw_quiz, bank_quiz, subject_accuracy, question_accuracy
 import json
 import datetime
 
@@ -25,10 +26,15 @@ def quiz_home():
 def start_quiz(subject_id):
     subject = Subject.query.get_or_404(subject_id)
     
-    # 1. Generate Quiz via AI
-    quiz_data = generate_quiz(subject.name, subject.grade.name, difficulty='hard')
+    # 1. Draw from the pre-generated bank (instant)
+    quiz_questions = draw_quiz(current_user.id, subject.name, subject.grade.name, difficulty='hard')
     
-    if not quiz_data:
+    # Cold pool: generate on the spot and bank the questions for the next students
+    if not quiz_questions:
+        quiz_data = generate_quiz(subject.name, subject.grade.name, difficulty='hard')
+        quiz_questions = bank_quiz(subject.name, subject.grade.name, 'hard', quiz_data)
+    
+    if not quiz_questions:
         flash("AI is busy building your difficult quiz! Please try again in a moment.", "error")
         return redirect(url_for('quiz_bp.quiz_home'))
         
@@ -37,14 +43,26 @@ def start_quiz(subject_id):
         user_id=current_user.id,
         subject=subject.name,
         grade=subject.grade.name,
-        questions_json=json.dumps(quiz_data),
+        difficulty='hard',
         start_time=datetime.datetime.utcnow()
     )
     db.session.add(new_session)
+    db.session.flush()
+    
+    for position, q in enumerate(quiz_questions):
+        db.session.add(QuizSessionQuestion(session_id=new_session.id, question_id=q.id, position=position))
     db.session.commit()
     
     return redirect(url_for('quiz_bp.take_quiz', session_id=new_session.id))
 
+def _session_questions(quiz_session):
+    """Questions of a session in display order (QuizQuestion rows, or dicts for legacy sessions)"""
+    if quiz_session.questions_json:
+        return json.loads(quiz_session.questions_json)
+    return QuizQuestion.query.join(QuizSessionQuestion, QuizSessionQuestion.question_id == QuizQuestion.id)\
+                             .filter(QuizSessionQuestion.session_id == quiz_session.id)\
+                             .order_by(QuizSessionQuestion.position).all()
+
 @quiz_bp.route('/quiz/take/<int:session_id>')
 @login_required
 def take_quiz(session_id):
@@ -57,7 +75,7 @@ def take_quiz(session_id):
         flash("You have already completed this quiz.", "info")
         return redirect(url_for('quiz_bp.quiz_home'))
         
-    questions = json.loads(quiz_session.questions_json)
+    questions = _session_questions(quiz_session)
     
     return render_template('quiz/active_quiz.html', 
                            quiz_session=quiz_session, 
@@ -78,6 +96,51 @@ def submit_quiz(session_id):
     data = request.get_json()
     answers = data.get('answers', {}) # { "0": "A", "1": "C", ... }
     
+    if quiz_session.questions_json:
+        return _submit_legacy_quiz(quiz_session, answers)
+    
+    attempt = QuizAttempt(
+        user_id=current_user.id,
+        subject=quiz_session.subject,
+        score=0,
+        total_questions=0
+    )
+    db.session.add(attempt)
+    db.session.flush()
+    
+    session_questions = db.session.query(QuizSessionQuestion.position, QuizQuestion.id, QuizQuestion.answer)\
+                                  .join(QuizQuestion, QuizSessionQuestion.question_id == QuizQuestion.id)\
+                                  .filter(QuizSessionQuestion.session_id == quiz_session.id).all()
+    
+    for position, question_id, correct_ans in session_questions:
+        user_ans = answers.get(str(position))
+        db.session.add(QuizResponse(
+            attempt_id=attempt.id,
+            user_id=current_user.id,
+            question_id=question_id,
+            subject=quiz_session.subject,
+            position=position,
+            user_ans=user_ans,
+            is_correct=(user_ans == correct_ans)
+        ))
+    db.session.flush()
+    
+    # Score straight from the stored responses
+    total, score = db.session.query(
+        db.func.count(QuizResponse.id),
+        db.func.sum(db.case((QuizResponse.is_correct == True, 1), else_=0))
+    ).filter(QuizResponse.attempt_id == attempt.id).one()
+    attempt.total_questions = total
+    attempt.score = int(score or 0)
+    
+    # Mark session completed
+    quiz_session.is_completed = True
+    db.session.commit()
+    
+    return jsonify({'redirect_url': url_for('quiz_bp.quiz_result', attempt_id=attempt.id)})
+
+def _submit_legacy_quiz(quiz_session, answers):
+    """Score a session started before questions were stored per row"""
     questions = json.loads(quiz_session.questions_json)
     score = 0
     results_details = []
@@ -98,7 +161,6 @@ def submit_quiz(session_id):
             'explanation': q.get('explanation', 'No explanation provided.')
         })
         
-    # Save Attempt
     attempt = QuizAttempt(
         user_id=current_user.id,
         subject=quiz_session.subject,
@@ -106,8 +168,6 @@ def submit_quiz(session_id):
         total_questions=len(questions),
         details_json=json.dumps(results_details)
     )
-    
-    # Mark session completed
     quiz_session.is_completed = True
     
     db.session.add(attempt)
@@ -122,5 +182,38 @@ def quiz_result(attempt_id):
     if attempt.user_id != current_user.id:
         return "Unauthorized", 403
         
-    details = json.loads(attempt.details_json)
+    if attempt.details_json:
+        details = json.loads(attempt.details_json)
+    else:
+        rows = db.session.query(QuizResponse, QuizQuestion)\
+                         .join(QuizQuestion, QuizResponse.question_id == QuizQuestion.id)\
+                         .filter(QuizResponse.attempt_id == attempt.id)\
+                         .order_by(QuizResponse.position).all()
+        details = [{
+            'question': q.question,
+            'user_ans': r.user_ans,
+            'correct_ans': q.answer,
+            'is_correct': r.is_correct,
+            'explanation': q.explanation or 'No explanation provided.'
+        } for r, q in rows]
     return render_template('quiz/result.html', attempt=attempt, details=details)
+
+@quiz_bp.route('/quiz/api/my-stats')
+@login_required
+def my_quiz_stats():
+    return jsonify({'subjects': subject_accuracy(current_user.id)})
+
+@quiz_bp.route('/api/admin/quiz-stats')
+@login_required
+def admin_quiz_stats():
+    if current_user.role not in ['admin', 'super_admin']:
+        return jsonify({"error": "Unauthorized"}), 403
+        
+    subject = request.args.get('subject')
+    grade = request.args.get('grade')
+    min_responses = request.args.get('min_responses', 5, type=int)
+    
+    return jsonify({
+        'subjects': subject_accuracy(),
+        'hardest_questions': question_accuracy(subject, grade, min_responses=min_responses)
+    })
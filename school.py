@@ -9,6 +9,7 @@ from datetime import datetime, date
 import uuid
 # Import signaling helper
 from signaling import get_room_count
+import perf
 import os
 
 school_bp = Blueprint('school', __name__, url_prefix='/school')
@@ -676,13 +677,13 @@ def admin_list_teachers():
     query = Tutor.query.filter_by(is_approved=True, is_active=True)
     tutors = query.all()
     
-    print(f"DEBUG: admin_list_teachers called with grade_id={grade_id}, subject={request.args.get('subject')}", flush=True)
+    perf.debug(f"admin_list_teachers called with grade_id={grade_id}, subject={request.args.get('subject')}")
     
     # Filter by grade if requested
     if grade_id:
         grade = Grade.query.get(grade_id)
         if grade:
-            print(f"DEBUG: Filtering for Grade: {grade.name}", flush=True)
+            perf.debug(f"Filtering for Grade: {grade.name}")
             # Filter tutors who have this grade in their teaching_grades
             # If they haven't set preferences (empty), assume they teach ALL
             filtered = []
@@ -694,14 +695,14 @@ def admin_list_teachers():
                     if grade.name in grades_list:
                         filtered.append(t)
                     else:
-                        print(f"DEBUG: Skipped {t.display_name} (Grades: {grades_list})", flush=True)
+                        perf.debug(f"Skipped {t.display_name} (Grades: {grades_list})")
             tutors = filtered
             
     # Filter by subject if requested
     subject_filter = request.args.get('subject')
     if subject_filter:
         subject_filter = subject_filter.lower().strip()
-        print(f"DEBUG: Filtering for Subject: {subject_filter}", flush=True)
+        perf.debug(f"Filtering for Subject: {subject_filter}")
         filtered = []
         for t in tutors:
             if t.subjects:
@@ -711,10 +712,10 @@ def admin_list_teachers():
                 if any(subject_filter in s for s in t_subjects):
                     filtered.append(t)
                 else:
-                    print(f"DEBUG: Skipped {t.display_name} (Subjects: {t_subjects})", flush=True)
+                    perf.debug(f"Skipped {t.display_name} (Subjects: {t_subjects})")
         tutors = filtered
 
-    print(f"DEBUG: Returning {len(tutors)} tutors", flush=True)
+    perf.debug(f"Returning {len(tutors)} tutors")
     return jsonify({
         "teachers": [{
             "id": t.id,
@@ -4,6 +4,7 @@ Handles real-time peer connection establishment for video tutoring sessions
 """
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask import request
+import metrics
 
 # Initialize SocketIO (will be attached to app in app.py)
 socketio = SocketIO(cors_allowed_origins="*")
@@ -58,6 +59,7 @@ def handle_disconnect():
             
             if len(users) == 0:
                 del room_users[room_id]
+    metrics.set_video_rooms(room_users)
     
     # Clean up name and type
     if request.sid in user_names:
@@ -96,6 +98,7 @@ def handle_join_room(data):
     
     if request.sid not in room_users[room_id]:
         room_users[room_id].append(request.sid)
+    metrics.set_video_rooms(room_users)
     
     user_names[request.sid] = user_name
     user_types[request.sid] = user_type
@@ -129,6 +132,7 @@ def handle_leave_room(data):
         
         if room_id in room_users and request.sid in room_users[room_id]:
             room_users[room_id].remove(request.sid)
+        metrics.set_video_rooms(room_users)
         
         emit('user_left', {
             'sid': request.sid,
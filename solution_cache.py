@@ -0,0 +1,204 @@
+"""
+Solution cache module
+- Disk cache of unblurred Chegg solutions, keyed by the resolved question UUID
+- Each entry keeps the raw question_data (so it can be re-rendered) and the rendered HTML
+- Entries expire after SOLUTION_CACHE_TTL_HOURS; the directory is kept under
+  SOLUTION_CACHE_MAX_MB by evicting least recently used entries
+- Legacy numeric IDs (…-q12345) are mapped to their UUID once and remembered
+"""
+
+import os
+import re
+import json
+import time
+import tempfile
+import threading
+
+CACHE_DIR = os.getenv('SOLUTION_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'solutions'))
+LEGACY_DIR = os.path.join(CACHE_DIR, 'legacy')
+
+TTL_SECONDS = int(float(os.getenv('SOLUTION_CACHE_TTL_HOURS', '168')) * 3600)
+MAX_BYTES = int(float(os.getenv('SOLUTION_CACHE_MAX_MB', '512')) * 1024 * 1024)
+
+# Bump whenever AnswerGenerator output changes so cached HTML is re-rendered from question_data
+RENDER_VERSION = 2
+
+# Don't rescan the directory for eviction more often than this (per worker)
+SWEEP_INTERVAL = 60
+
+_UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+_LEGACY_RE = re.compile(r'^\d+$')
+
+_sweep_lock = threading.Lock()
+_last_sweep = 0
+
+
+def _entry_path(question_id):
+    return os.path.join(CACHE_DIR, f"{question_id.lower()}.json")
+
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def resolve_question_id(url, extract):
+    """
+    Turn a Chegg URL into the cache key without any network call.
+    extract: chegg_processor.extract_uuid_from_url
+    Returns: (raw_id, uuid) - uuid is None for a legacy ID that hasn't been resolved yet
+    """
+    raw_id = extract(url)
+    if not raw_id:
+        return None, None
+    if _UUID_RE.match(raw_id):
+        return raw_id, raw_id.lower()
+
+    try:
+        with open(os.path.join(LEGACY_DIR, raw_id), encoding='utf-8') as f:
+            uuid = f.read().strip()
+        return raw_id, uuid if _UUID_RE.match(uuid) else None
+    except OSError:
+        return raw_id, None
+
+
+def remember_legacy_id(legacy_id, uuid):
+    """Store a legacy ID -> UUID resolution (these never change)"""
+    if legacy_id and _LEGACY_RE.match(legacy_id) and uuid and _UUID_RE.match(uuid):
+        try:
+            _write_atomic(os.path.join(LEGACY_DIR, legacy_id), uuid.lower())
+        except OSError as e:
+            print(f"[Solution Cache] Could not store legacy id {legacy_id}: {e}")
+
+
+def get(question_id):
+    """
+    Cached entry for a question UUID, or None if missing/expired.
+    Entry: {'question_id', 'question_data', 'html', 'render_version', 'cached_at'}
+    """
+    if not question_id or not _UUID_RE.match(question_id):
+        return None
+
+    path = _entry_path(question_id)
+    try:
+        with open(path, encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - entry.get('cached_at', 0) > TTL_SECONDS:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    # Reading counts as a use for LRU eviction
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return entry
+
+
+def get_html(question_id, render):
+    """
+    Rendered HTML for a cached question, re-rendering (and re-caching) entries
+    produced by an older AnswerGenerator. render: answer_generator.generate_html_string
+    Returns: html or None on a miss
+    """
+    entry = get(question_id)
+    if not entry:
+        return None
+    if entry.get('render_version') == RENDER_VERSION and entry.get('html'):
+        return entry['html']
+
+    html = render(entry['question_data'])
+    put(question_id, entry['question_data'], html)
+    return html
+
+
+def put(question_id, question_data, html, legacy_id=None):
+    """
+    Cache a fetched solution (and the legacy ID it was resolved from, if any).
+    html may be None when the render is still streaming; get_html() renders it on the next hit.
+    """
+    if not question_id or not _UUID_RE.match(question_id):
+        return
+
+    entry = {
+        'question_id': question_id.lower(),
+        'question_data': question_data,
+        'html': html,
+        'render_version': RENDER_VERSION,
+        'cached_at': time.time()
+    }
+    try:
+        _write_atomic(_entry_path(question_id), json.dumps(entry))
+    except (OSError, TypeError, ValueError) as e:
+        print(f"[Solution Cache] Could not store {question_id}: {e}")
+        return
+
+    if legacy_id:
+        remember_legacy_id(legacy_id, question_id)
+
+    _maybe_sweep()
+
+
+def _maybe_sweep():
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < SWEEP_INTERVAL or not _sweep_lock.acquire(blocking=False):
+        return
+    try:
+        _last_sweep = now
+        sweep()
+    finally:
+        _sweep_lock.release()
+
+
+def sweep():
+    """
+    Drop expired entries, then evict least recently used ones until the
+    directory is back under 90% of MAX_BYTES.
+    Returns: number of entries removed
+    """
+    now = time.time()
+    entries = []
+    try:
+        with os.scandir(CACHE_DIR) as it:
+            for e in it:
+                if e.is_file() and e.name.endswith('.json'):
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+    except OSError:
+        return 0
+
+    removed = 0
+    total = sum(size for _, size, _ in entries)
+    entries.sort()  # Oldest access first
+
+    target = MAX_BYTES * 0.9
+    for mtime, size, path in entries:
+        # mtime is bumped on every read, so only entries nobody touched for a TTL can be expired by it;
+        # fresher entries still expire on read via cached_at
+        if total <= target and now - mtime <= TTL_SECONDS:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+
+    if removed:
+        print(f"[Solution Cache] Evicted {removed} entries, {total / 1024 / 1024:.1f} MB left")
+    return removed
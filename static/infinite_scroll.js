@@ -0,0 +1,40 @@
+// Infinite scroll for keyset-paginated history lists.
+// The server renders the first page; the endpoint returns {<key>: [...], next_cursor}.
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.innerText = value == null ? '' : value;
+    return div.innerHTML.replace(/"/g, '&quot;');
+}
+
+function infiniteScroll({ url, key, cursor, list, sentinel, render, onLoad }) {
+    if (!list || !sentinel) return;
+    let next = cursor;
+    let loading = false;
+    if (!next) {
+        sentinel.classList.add('hidden');
+        return;
+    }
+
+    const observer = new IntersectionObserver(async (entries) => {
+        if (!entries.some(e => e.isIntersecting) || loading || !next) return;
+        loading = true;
+        try {
+            const res = await fetch(`${url}?cursor=${encodeURIComponent(next)}`);
+            const data = await res.json();
+            list.insertAdjacentHTML('beforeend', (data[key] || []).map(render).join(''));
+            next = data.next_cursor;
+            if (onLoad) onLoad(list);
+        } catch (e) {
+            console.error(`Error loading ${url}:`, e);
+            next = null;
+        }
+        loading = false;
+        observer.unobserve(sentinel);
+        if (next) {
+            observer.observe(sentinel);  // Fires again right away if the sentinel is still in view
+        } else {
+            sentinel.classList.add('hidden');
+        }
+    }, { rootMargin: '0px 0px 300px 0px' });
+    observer.observe(sentinel);
+}
@@ -5,15 +5,16 @@ let isFirstLoad = true;
 async function checkNotifications() {
     try {
         const res = await fetch('/get-notifications');
-        const data = await res.json();
+        const payload = await res.json();
+        const data = payload.notifications || [];
 
         const unread = data.filter(n => !n.is_read);
 
-        // 1. Update Badge
+        // 1. Update Badge (server-side counter, which also covers unread beyond the latest 20)
         const badge = document.getElementById('notif-badge');
         if (badge) {
-            badge.innerText = unread.length;
-            if (unread.length > 0) {
+            badge.innerText = payload.unread;
+            if (payload.unread > 0) {
                 badge.classList.remove('hidden');
             } else {
                 badge.classList.add('hidden');
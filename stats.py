@@ -0,0 +1,140 @@
+"""
+Aggregate stats for the landing page, the super admin dashboard and /api/admin/stats
+- get_totals(): site-wide counters (students, documents, completed jobs, tutors,
+  active plans) from one round trip, cached in-process for STATS_CACHE_TTL seconds
+- get_day_stats(day): signups, tutor registrations and running plans for one day.
+  Today and yesterday (still changing, late commits around midnight) are computed
+  live and cached like the totals; older days are read from the daily_stats rollup
+  (a single-row lookup), computed once from the source tables when missing
+- refresh_stats(): scheduler job that stores the newest final day and refreshes
+  the caches (optional: get_day_stats doesn't rely on it)
+
+"Active plans" for a day counts subscriptions whose start..end range covers it, so
+past days keep the figure they had even after plans expire.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from models import db, User, Document, Job, Tutor, Subscription, DailyStats
+
+# How long a worker reuses the last computed totals / live day stats (STATS_CACHE_TTL)
+DEFAULT_CACHE_TTL = 60
+
+# Days this far back or more no longer change and are stored in daily_stats
+FINAL_AFTER_DAYS = 2
+
+STAFF_ROLES = ('admin', 'super_admin')
+
+_cache = {'data': None, 'expires': 0}
+_day_cache = {}  # day -> (expires, counts) for today and yesterday
+
+
+def _cache_ttl():
+    return int(os.getenv('STATS_CACHE_TTL', DEFAULT_CACHE_TTL))
+
+
+def _count(model, *criteria):
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+
+def _compute_totals():
+    row = db.session.execute(select(
+        _count(User, User.role == 'user').label('users'),
+        _count(User, User.role.notin_(STAFF_ROLES)).label('students'),
+        _count(Document).label('documents'),
+        _count(Job, Job.status == 'Completed').label('completed_jobs'),
+        _count(Tutor).label('tutors'),
+        _count(Subscription, Subscription.is_active == True).label('active_plans'),
+    )).one()
+    return dict(row._mapping)
+
+
+def get_totals():
+    """Site-wide counters, at most STATS_CACHE_TTL seconds old"""
+    now = time.time()
+    if _cache['data'] is None or now >= _cache['expires']:
+        _cache['data'] = _compute_totals()
+        _cache['expires'] = now + _cache_ttl()
+    return _cache['data']
+
+
+def _compute_day(day):
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    row = db.session.execute(select(
+        _count(User, User.role.notin_(STAFF_ROLES), User.created_at >= start, User.created_at < end).label('signups'),
+        _count(Tutor, Tutor.created_at >= start, Tutor.created_at < end).label('tutor_signups'),
+        _count(Subscription, Subscription.start_date < end, Subscription.end_date >= start).label('active_plans'),
+    )).one()
+    return dict(row._mapping)
+
+
+def _is_final(entry):
+    """A stored row counts only if it was computed after its day stopped changing"""
+    final_from = datetime.combine(entry.day + timedelta(days=FINAL_AFTER_DAYS), datetime.min.time())
+    return entry.updated_at is not None and entry.updated_at >= final_from
+
+
+def _store_day(day, entry=None):
+    counts = _compute_day(day)
+    if entry is None:
+        entry = DailyStats(day=day)
+        db.session.add(entry)
+    entry.signups = counts['signups']
+    entry.tutor_signups = counts['tutor_signups']
+    entry.active_plans = counts['active_plans']
+    entry.updated_at = datetime.utcnow()  # Set even when the counts didn't change
+    return counts
+
+
+def _live_day(day):
+    now = time.time()
+    cached = _day_cache.get(day)
+    if cached is None or now >= cached[0]:
+        for old in [d for d in _day_cache if d < day - timedelta(days=FINAL_AFTER_DAYS)]:
+            del _day_cache[old]
+        cached = (now + _cache_ttl(), _compute_day(day))
+        _day_cache[day] = cached
+    return cached[1]
+
+
+def get_day_stats(day):
+    """
+    Stats for one day (a date). Future days are all zero.
+    Returns: dict with signups, tutor_signups, active_plans
+    """
+    today = datetime.utcnow().date()
+    if day > today:
+        return {'signups': 0, 'tutor_signups': 0, 'active_plans': 0}
+    if day > today - timedelta(days=FINAL_AFTER_DAYS):
+        return _live_day(day)
+
+    entry = db.session.get(DailyStats, day)
+    if entry is not None and _is_final(entry):
+        return {'signups': entry.signups, 'tutor_signups': entry.tutor_signups, 'active_plans': entry.active_plans}
+
+    # Missing, or stored while the day was still changing
+    counts = _store_day(day, entry)
+    try:
+        db.session.commit()
+    except Exception:
+        # Another worker stored the same day first; what we computed is just as good
+        db.session.rollback()
+    return counts
+
+
+def refresh_stats():
+    """
+    Store the newest final day and refresh the totals / live day caches.
+    Must run inside an app context.
+    """
+    day = datetime.utcnow().date() - timedelta(days=FINAL_AFTER_DAYS)
+    entry = db.session.get(DailyStats, day)
+    if entry is None or not _is_final(entry):
+        _store_day(day, entry)
+        db.session.commit()
+    _cache['expires'] = 0
+    _day_cache.clear()
+    get_totals()
@@ -0,0 +1,155 @@
+"""
+Trending topics module
+- Keeps per-category totals and per-day question counts for the AI Tutor
+- refresh_trending() folds in only the ChatHistory rows added since the last run
+  (tracked in job_cursor), so the dashboard never scans chat_history
+- get_trending_topics() serves the dashboard from a short in-process cache
+"""
+
+import os
+import time
+import hashlib
+from datetime import datetime, timedelta
+from collections import Counter
+from models import db, ChatHistory, TrendingCategory, TrendingQuestion, JobCursor
+
+CURSOR_NAME = 'trending'
+
+# Popular questions are counted over this many days (today included)
+TRENDING_DAYS = 7
+
+# How long a worker reuses the last computed trending block
+TRENDING_CACHE_TTL = int(os.getenv('TRENDING_CACHE_TTL', '300'))
+
+# Rows newer than this are left for the next run, so an id that commits late isn't skipped
+SETTLE_SECONDS = 10
+
+BATCH_SIZE = 5000
+
+_cache = {'data': None, 'expires': 0}
+
+
+def _question_key(question, category):
+    return hashlib.sha256(f"{category}\n{question}".encode('utf-8')).hexdigest()
+
+
+def _fold_batch(rows):
+    """Add a batch of (id, question, category, timestamp) rows to the counters"""
+    category_counts = Counter()
+    question_counts = Counter()
+    question_info = {}
+
+    for _, question, category, timestamp in rows:
+        category = category or 'general'
+        category_counts[category] += 1
+
+        key = (timestamp.date(), _question_key(question, category))
+        question_counts[key] += 1
+        question_info.setdefault(key, (question[:200], category))
+
+    existing = {
+        c.category: c for c in
+        TrendingCategory.query.filter(TrendingCategory.category.in_(list(category_counts))).all()
+    }
+    for category, n in category_counts.items():
+        if category in existing:
+            existing[category].count += n
+        else:
+            db.session.add(TrendingCategory(category=category, count=n))
+
+    days = {day for day, _ in question_counts}
+    hashes = {h for _, h in question_counts}
+    existing = {
+        (q.day, q.question_hash): q for q in
+        TrendingQuestion.query.filter(TrendingQuestion.day.in_(days),
+                                      TrendingQuestion.question_hash.in_(hashes)).all()
+    }
+    for key, n in question_counts.items():
+        if key in existing:
+            existing[key].count += n
+        else:
+            question, category = question_info[key]
+            db.session.add(TrendingQuestion(day=key[0], question_hash=key[1],
+                                            question=question, category=category, count=n))
+
+
+def refresh_trending(max_batches=20):
+    """
+    Fold new ChatHistory rows into the trending tables and drop expired days.
+    Safe to run from several workers: a batch is only committed if the cursor
+    hasn't moved underneath it. Must run inside an app context.
+    Returns: number of chat rows processed
+    """
+    settled_before = datetime.utcnow() - timedelta(seconds=SETTLE_SECONDS)
+    processed = 0
+
+    for _ in range(max_batches):
+        cursor = db.session.get(JobCursor, CURSOR_NAME)
+        if cursor is None:
+            cursor = JobCursor(name=CURSOR_NAME, last_id=0)
+            db.session.add(cursor)
+            db.session.flush()
+        start_id = cursor.last_id
+
+        rows = db.session.query(
+            ChatHistory.id, ChatHistory.question, ChatHistory.category, ChatHistory.timestamp
+        ).filter(
+            ChatHistory.id > start_id,
+            ChatHistory.timestamp <= settled_before
+        ).order_by(ChatHistory.id).limit(BATCH_SIZE).all()
+
+        if not rows:
+            break
+
+        _fold_batch(rows)
+
+        advanced = JobCursor.query.filter_by(name=CURSOR_NAME, last_id=start_id)\
+                                  .update({'last_id': rows[-1][0]}, synchronize_session=False)
+        if not advanced:
+            # Another worker got this batch first
+            db.session.rollback()
+            break
+
+        db.session.commit()
+        processed += len(rows)
+
+        if len(rows) < BATCH_SIZE:
+            break
+
+    cutoff = (datetime.utcnow() - timedelta(days=TRENDING_DAYS)).date()
+    TrendingQuestion.query.filter(TrendingQuestion.day < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+
+    if processed:
+        _cache['expires'] = 0
+    return processed
+
+
+def _compute_trending():
+    category_counts = TrendingCategory.query.order_by(TrendingCategory.count.desc()).limit(5).all()
+
+    since = (datetime.utcnow() - timedelta(days=TRENDING_DAYS - 1)).date()
+    total = db.func.sum(TrendingQuestion.count)
+    popular_questions = db.session.query(
+        TrendingQuestion.question,
+        TrendingQuestion.category,
+        total
+    ).filter(
+        TrendingQuestion.day >= since
+    ).group_by(
+        TrendingQuestion.question_hash, TrendingQuestion.question, TrendingQuestion.category
+    ).order_by(total.desc()).limit(5).all()
+
+    return {
+        "categories": [{"name": c.category, "count": c.count} for c in category_counts],
+        "popular_questions": [{"question": q[0][:80], "category": q[1], "count": int(q[2])} for q in popular_questions]
+    }
+
+
+def get_trending_topics():
+    """Get most searched topics for dashboard analytics"""
+    now = time.time()
+    if _cache['data'] is None or now >= _cache['expires']:
+        _cache['data'] = _compute_trending()
+        _cache['expires'] = now + TRENDING_CACHE_TTL
+    return _cache['data']
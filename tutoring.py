@@ -9,7 +9,11 @@ from datetime import datetime, date
 import uuid
 import os
 
+from sqlalchemy import or_, func
 from models import db, Tutor, TutoringSession, User, SchoolClass
+import credit_ledger
+import perf
+import metrics
 from flask_login import login_required, current_user
 
 tutoring_bp = Blueprint('tutoring', __name__, url_prefix='/tutoring')
@@ -720,14 +724,6 @@ def api_end_session(room_id):
     if not tutoring_session:
         return jsonify({'success': False, 'error': 'Session not found'}), 404
     
-    if tutoring_session.status == 'completed':
-        return jsonify({
-            'success': True,
-            'message': 'Session already ended',
-            'duration_minutes': tutoring_session.duration_minutes or 0,
-            'credits_charged': tutoring_session.credits_paid or 0
-        })
-    
     # Calculate duration
     now = datetime.utcnow()
     if tutoring_session.started_at:
@@ -735,33 +731,42 @@ def api_end_session(room_id):
         duration_minutes = max(1, int(duration))  # Minimum 1 minute
     else:
         duration_minutes = 0
-    
-    # Deduct 1 tutor credit (Plan -> Wallet)
-    from models import Subscription
-    student = db.session.get(User, tutoring_session.student_id)
     credits_to_charge = 1  # 1 credit per session regardless of duration
     
-    if student and student.active_subscription_id:
-        sub = Subscription.query.get(student.active_subscription_id)
-        if sub:
-            if sub.tutor_credits_used < sub.tutor_credits:
-                sub.tutor_credits_used += 1
-            elif student.credits > 0:
-                student.credits -= 1
+    # Claim the session: both participants can press End, only the request whose
+    # UPDATE completes it goes on to bill (the other one waits on the row, then matches nothing)
+    claimed = TutoringSession.query.filter(
+        TutoringSession.id == tutoring_session.id,
+        or_(TutoringSession.status.is_(None), TutoringSession.status != 'completed')
+    ).update({
+        'status': 'completed',
+        'ended_at': now,
+        'duration_minutes': duration_minutes,
+        'credits_paid': credits_to_charge
+    }, synchronize_session=False)
     
-    # Add to tutor earnings (80% to tutor, 20% platform fee)
-    tutor = db.session.get(Tutor, tutoring_session.tutor_id)
-    if tutor:
-        tutor_earnings = int(credits_to_charge * 0.80)
-        tutor.total_earnings += tutor_earnings
-        tutor.total_sessions += 1
-        tutor.total_minutes += duration_minutes
+    if claimed != 1:
+        db.session.rollback()
+        db.session.refresh(tutoring_session)
+        return jsonify({
+            'success': True,
+            'message': 'Session already ended',
+            'duration_minutes': tutoring_session.duration_minutes or 0,
+            'credits_charged': tutoring_session.credits_paid or 0
+        })
     
-    # Update session
-    tutoring_session.status = 'completed'
-    tutoring_session.ended_at = now
-    tutoring_session.duration_minutes = duration_minutes
-    tutoring_session.credits_paid = credits_to_charge
+    # Add to tutor earnings (80% to tutor, 20% platform fee)
+    tutor_earnings = int(credits_to_charge * 0.80)
+    Tutor.query.filter_by(id=tutoring_session.tutor_id).update({
+        'total_earnings': func.coalesce(Tutor.total_earnings, 0) + tutor_earnings,
+        'total_sessions': func.coalesce(Tutor.total_sessions, 0) + 1,
+        'total_minutes': func.coalesce(Tutor.total_minutes, 0) + duration_minutes
+    }, synchronize_session=False)
+    
+    # Deduct 1 tutor credit (Plan -> Wallet); the ledger commits the claim and totals with it
+    student = db.session.get(User, tutoring_session.student_id)
+    if student and student.active_subscription_id:
+        credit_ledger.charge(student.id, 'tutor', reason=f'Tutoring session #{tutoring_session.id}')
     
     db.session.commit()
     
@@ -775,19 +780,19 @@ def api_end_session(room_id):
 @tutoring_bp.route('/api/session/<room_id>/upload-recording', methods=['POST'])
 def api_upload_recording(room_id):
     """Upload session recording"""
-    print(f"DEBUG: Upload request received for room {room_id}")
+    perf.debug(f"Upload request received for room {room_id}")
     
     tutoring_session = TutoringSession.query.filter_by(room_id=room_id).first()
     if not tutoring_session:
-        print("DEBUG: Session not found")
+        perf.debug("Session not found")
         return jsonify({'success': False, 'error': 'Session not found'}), 404
     
     if 'recording' not in request.files:
-        print("DEBUG: No recording file in request")
+        perf.debug("No recording file in request")
         return jsonify({'success': False, 'error': 'No recording file'}), 400
     
     file = request.files['recording']
-    print(f"DEBUG: File received: {file.filename}, Content-Type: {file.content_type}")
+    perf.debug(f"File received: {file.filename}, Content-Type: {file.content_type}")
     
     if file.filename:
         # Save recording
@@ -798,21 +803,22 @@ def api_upload_recording(room_id):
         
         try:
             file.save(file_path)
-            print(f"DEBUG: File saved to {file_path}, Size: {os.path.getsize(file_path)}")
+            metrics.record_upload('recording', file_path)
+            perf.debug(f"File saved to {file_path}, Size: {os.path.getsize(file_path)}")
             
             # Store web-accessible relative path (not filesystem path)
             # Templates link as href="/{{ recording_path }}" and Nginx serves /uploads from disk
             web_path = f"uploads/recordings/{filename}"
             tutoring_session.recording_path = web_path
             db.session.commit()
-            print("DEBUG: Database updated with recording path")
+            perf.debug("Database updated with recording path")
             
             return jsonify({'success': True, 'path': web_path})
         except Exception as e:
-            print(f"DEBUG: Error saving file: {e}")
+            print(f"[Tutoring] Recording upload failed for room {room_id}: {e}")
             return jsonify({'success': False, 'error': str(e)}), 500
     
-    print("DEBUG: Invalid filename")
+    perf.debug("Invalid filename")
     return jsonify({'success': False, 'error': 'Invalid file'}), 400
 
 
@@ -0,0 +1,218 @@
+"""
+Shared AI client - single place that talks to Gemini and OpenAI.
+
+Every AI call in the app (AI Tutor chat, quiz generation, library OCR/formatting)
+goes through this module so that:
+  - API keys are read and configured once, at import
+  - HTTP connections are pooled (one requests.Session for sync callers,
+    one httpx.AsyncClient per event loop for asyncio callers)
+  - OpenAI clients are built once instead of per request
+
+Sync entry points:   gemini_generate, gemini_generate_text, openai_chat
+Async entry points:  agemini_generate, agemini_generate_text, aopenai_chat
+"""
+import os
+import asyncio
+import threading
+import weakref
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ─── Configuration ──────────────────────────────────────────────────
+GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
+
+GEMINI_API_BASE = 'https://generativelanguage.googleapis.com/v1beta/models'
+
+# Max pooled connections per host (gunicorn worker / eventlet hub)
+AI_HTTP_POOL_SIZE = int(os.getenv('AI_HTTP_POOL_SIZE', '20'))
+
+_lock = threading.Lock()
+_session = None
+_openai_client = None
+
+# Async clients are bound to the loop that created them
+_async_clients = weakref.WeakKeyDictionary()
+_async_openai_clients = weakref.WeakKeyDictionary()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  CLIENT FACTORIES (lazy, created once)
+# ═══════════════════════════════════════════════════════════════════════
+def get_session() -> requests.Session:
+    """Pooled requests.Session shared by all sync AI calls."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=AI_HTTP_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'Content-Type': 'application/json'})
+                _session = session
+    return _session
+
+
+def get_async_client():
+    """httpx.AsyncClient for the running event loop."""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            headers={'Content-Type': 'application/json'},
+            limits=httpx.Limits(max_connections=AI_HTTP_POOL_SIZE, max_keepalive_connections=AI_HTTP_POOL_SIZE),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def get_openai_client():
+    """Shared OpenAI client (None if the key or library is missing)."""
+    global _openai_client
+    if _openai_client is None and OPENAI_API_KEY:
+        with _lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                _openai_client = OpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
+
+
+def get_async_openai_client():
+    """AsyncOpenAI client for the running event loop."""
+    if not OPENAI_API_KEY:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_openai_clients.get(loop)
+    if client is None:
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        _async_openai_clients[loop] = client
+    return client
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  GEMINI
+# ═══════════════════════════════════════════════════════════════════════
+def _gemini_url(model_name):
+    return f'{GEMINI_API_BASE}/{model_name}:generateContent'
+
+
+def _gemini_headers():
+    return {'x-goog-api-key': GEMINI_API_KEY}
+
+
+def build_gemini_payload(parts, generation_config=None, system_instruction=None):
+    """
+    Build a single-turn generateContent payload.
+    parts: list of str (text) or dicts already in Gemini part format
+           (e.g. {'inlineData': {'mimeType': 'image/png', 'data': '<base64>'}})
+    """
+    payload_parts = [{'text': p} if isinstance(p, str) else p for p in parts]
+    payload = {'contents': [{'role': 'user', 'parts': payload_parts}]}
+    if system_instruction:
+        payload['systemInstruction'] = {'parts': [{'text': system_instruction}]}
+    if generation_config:
+        payload['generationConfig'] = generation_config
+    return payload
+
+
+def extract_gemini_text(data) -> str:
+    """Pull the first candidate's text out of a generateContent response body."""
+    candidates = data.get('candidates', []) if isinstance(data, dict) else []
+    if not candidates:
+        return ''
+    return candidates[0].get('content', {}).get('parts', [{}])[0].get('text', '')
+
+
+def gemini_generate(model_name: str, payload: dict, timeout: int = 30):
+    """
+    POST a generateContent request through the shared session.
+    Returns the raw requests.Response so callers can handle quota codes (429/403)
+    and model fallback themselves.
+    """
+    return get_session().post(_gemini_url(model_name), headers=_gemini_headers(), json=payload, timeout=timeout)
+
+
+async def agemini_generate(model_name: str, payload: dict, timeout: int = 30):
+    """Async version of gemini_generate. Returns an httpx.Response."""
+    client = get_async_client()
+    return await client.post(_gemini_url(model_name), headers=_gemini_headers(), json=payload, timeout=timeout)
+
+
+def _error_message(response):
+    try:
+        return response.json().get('error', {}).get('message', f'HTTP {response.status_code}')
+    except ValueError:
+        return f'HTTP {response.status_code}'
+
+
+def gemini_generate_text(model_name: str, parts: list, generation_config=None, timeout: int = 60) -> tuple:
+    """
+    One-shot text generation (used by the library OCR/formatting helpers).
+    Returns: (text, error_message)
+    """
+    if not GEMINI_API_KEY:
+        return None, "Gemini API key not configured"
+
+    payload = build_gemini_payload(parts, generation_config)
+    try:
+        response = gemini_generate(model_name, payload, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        return None, f"Gemini request failed: {e}"
+
+    if response.status_code != 200:
+        return None, f"Gemini API Error: {_error_message(response)}"
+
+    text = extract_gemini_text(response.json())
+    if not text:
+        return None, "Gemini returned an empty response."
+    return text, None
+
+
+async def agemini_generate_text(model_name: str, parts: list, generation_config=None, timeout: int = 60) -> tuple:
+    """Async version of gemini_generate_text. Returns: (text, error_message)"""
+    if not GEMINI_API_KEY:
+        return None, "Gemini API key not configured"
+
+    import httpx
+
+    payload = build_gemini_payload(parts, generation_config)
+    try:
+        response = await agemini_generate(model_name, payload, timeout=timeout)
+    except httpx.HTTPError as e:
+        return None, f"Gemini request failed: {e}"
+
+    if response.status_code != 200:
+        return None, f"Gemini API Error: {_error_message(response)}"
+
+    text = extract_gemini_text(response.json())
+    if not text:
+        return None, "Gemini returned an empty response."
+    return text, None
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  OPENAI
+# ═══════════════════════════════════════════════════════════════════════
+def openai_chat(messages: list, model: str, **kwargs) -> str:
+    """Run a chat completion on the shared client and return the message text."""
+    client = get_openai_client()
+    if client is None:
+        raise RuntimeError("OPENAI_API_KEY not configured")
+    response = client.chat.completions.create(model=model, messages=messages, **kwargs)
+    return response.choices[0].message.content
+
+
+async def aopenai_chat(messages: list, model: str, **kwargs) -> str:
+    """Async version of openai_chat."""
+    client = get_async_openai_client()
+    if client is None:
+        raise RuntimeError("OPENAI_API_KEY not configured")
+    response = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+    return response.choices[0].message.content
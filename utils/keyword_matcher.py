@@ -0,0 +1,66 @@
+"""
+Compiled multi-keyword matching.
+
+KeywordMatcher is the shared "which keyword set does this text hit first"
+matcher (AI Tutor categories and any other label -> keywords table). The
+keyword table is normalized once at construction and the text is lowercased
+once per call; earlier labels win, exactly like the old nested loops.
+
+  - substring mode (default): 'test' matches 'latest'. Scanned with str's
+    own substring search, which benchmarks/bench_categorize.py shows is
+    20x+ faster than a single compiled regex alternation on CPython.
+  - word_boundary=True: whole words/phrases only, one compiled
+    \\b(?:kw1|kw2|...)\\b regex per label.
+
+PatternSet compiles a list of regexes into one alternation, for
+"does any of these match" checks such as AnswerGenerator.is_mathematical_expression.
+"""
+import re
+
+
+class KeywordMatcher:
+    """
+    keyword_sets: ordered mapping of label -> list of keywords (earlier labels win)
+    word_boundary: only match whole words ('test' no longer matches 'latest')
+    """
+
+    def __init__(self, keyword_sets, word_boundary=False):
+        self.word_boundary = word_boundary
+        self._sets = []
+        for label, keywords in keyword_sets.items():
+            keywords = tuple(dict.fromkeys(k.lower() for k in keywords if k))
+            if not keywords:
+                continue
+            if word_boundary:
+                matcher = re.compile(rf"\b(?:{'|'.join(re.escape(k) for k in keywords)})\b").search
+            else:
+                matcher = keywords
+            self._sets.append((label, matcher))
+
+    def match(self, text, default=None):
+        """Label of the first keyword set found in text, else default"""
+        if not text:
+            return default
+        text = text.lower()
+
+        if self.word_boundary:
+            for label, search in self._sets:
+                if search(text):
+                    return label
+        else:
+            for label, keywords in self._sets:
+                for keyword in keywords:
+                    if keyword in text:
+                        return label
+        return default
+
+
+class PatternSet:
+    """A list of regexes compiled into one alternation, for "any of these match" checks"""
+
+    def __init__(self, patterns, flags=0):
+        self.patterns = list(patterns)
+        self._regex = re.compile('|'.join(f'(?:{p})' for p in self.patterns), flags)
+
+    def search(self, text):
+        return self._regex.search(text)
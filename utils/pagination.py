@@ -0,0 +1,93 @@
+"""
+Keyset ("seek") pagination for newest-first lists.
+
+paginate(query, key_columns, cursor, limit) returns one page ordered by
+key_columns descending, starting right after the row the previous page ended
+on (WHERE (k1, k2) < (last_k1, last_k2)) instead of using OFFSET. Every page
+is an index range read of `limit` rows however deep the client scrolls, and
+rows inserted in the meantime don't shift later pages.
+
+The last key column must be unique (normally the primary key) so ties on the
+first one are broken. Cursors are opaque url-safe strings; clients pass
+next_cursor back unchanged. A malformed cursor, or one whose values don't fit
+the key columns, raises ValueError.
+"""
+import json
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """?limit= value clamped to 1..MAX_PAGE_SIZE (default when missing or bad)"""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def encode_cursor(values):
+    data = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and isinstance(value.get('dt'), str):
+        return datetime.fromisoformat(value['dt'])
+    # bool is an int subclass, but no key column holds one
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return value
+    raise ValueError(f"unsupported value {value!r}")
+
+
+def decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(data, list):
+            raise ValueError("not a list")
+        return [_decode_value(v) for v in data]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def _check_type(column, value):
+    """Reject cursor values the database would fail to compare with the column"""
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:
+        return
+    if expected is float:
+        expected = (int, float)
+    if not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool):
+        raise ValueError(f"Invalid cursor: {value!r} doesn't fit {column.key}")
+
+
+def paginate(query, key_columns, cursor=None, limit=DEFAULT_PAGE_SIZE, key=None):
+    """
+    One page of query, newest first.
+    key_columns: columns to order by (descending), last one unique
+    key: row -> tuple of key values (default: attributes of the row named after the columns)
+    Returns: (rows, next_cursor) - next_cursor is None on the last page
+    """
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(key_columns):
+            raise ValueError("Invalid cursor: wrong number of values")
+        for column, value in zip(key_columns, values):
+            _check_type(column, value)
+        if len(key_columns) == 1:
+            query = query.filter(key_columns[0] < values[0])
+        else:
+            query = query.filter(tuple_(*key_columns) < tuple_(*values))
+
+    rows = query.order_by(*[column.desc() for column in key_columns]).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    if key is None:
+        key = lambda row: tuple(getattr(row, column.key) for column in key_columns)
+    return rows, encode_cursor(key(rows[-1]))
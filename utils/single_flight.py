@@ -0,0 +1,130 @@
+"""
+Single-flight request coalescing.
+
+SingleFlight.do(key, fn) makes sure only one call of fn per key is in flight:
+  - inside a worker, concurrent callers (threads or eventlet greenlets - the
+    eventlet worker monkey-patches threading) wait on the leader's Event and
+    get the leader's return value
+  - across gunicorn workers, the leader holds an O_EXCL lease file in
+    lock_dir; callers in other workers poll `check()` (e.g. a shared cache)
+    until the result shows up or the lease is released, then run fn
+    themselves only if nothing was produced
+
+Leases older than lease_ttl seconds are treated as abandoned (crashed worker).
+"""
+import os
+import re
+import time
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, lock_dir=None, lease_ttl=60, poll_interval=0.25):
+        self.lock_dir = lock_dir
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, check=None, timeout=60):
+        """
+        Run fn() once for all concurrent callers with the same key.
+        check: optional callable returning a result produced by another worker (or None)
+        Returns: (value, shared) - shared is True if this caller didn't run fn itself
+        Raises: TimeoutError if the leader didn't finish within timeout,
+                or whatever fn raised (re-raised for every waiter)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight request {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            shared = False
+            lease, found = self._acquire_lease(key, check, timeout)
+            if found is not None:
+                call.result, shared = found, True
+            else:
+                try:
+                    call.result = fn()
+                finally:
+                    self._release_lease(lease)
+            return call.result, shared
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    # ─── Cross-worker lease ─────────────────────────────────────────────
+    def _lease_path(self, key):
+        safe_key = re.sub(r'[^A-Za-z0-9_.-]', '_', str(key))
+        return os.path.join(self.lock_dir, f"{safe_key}.lock")
+
+    def _acquire_lease(self, key, check, timeout):
+        """
+        Returns: (lease_path, None) once the lease is held (lease_path is None if leases are off),
+                 or (None, result) if another worker produced the result meanwhile
+        """
+        if not self.lock_dir:
+            return None, None
+        os.makedirs(self.lock_dir, exist_ok=True)
+        path = self._lease_path(key)
+        deadline = time.time() + timeout
+
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                # The previous holder may have just finished
+                found = check() if check is not None else None
+                if found is not None:
+                    self._release_lease(path)
+                    return None, found
+                return path, None
+            except FileExistsError:
+                pass
+            except OSError:
+                return None, None  # Lock dir unusable, fall back to per-worker coalescing only
+
+            if check is not None:
+                found = check()
+                if found is not None:
+                    return None, found
+
+            try:
+                if time.time() - os.path.getmtime(path) > self.lease_ttl:
+                    os.remove(path)  # Abandoned by a crashed worker
+                    continue
+            except OSError:
+                continue  # Released between our checks, retry right away
+
+            if time.time() >= deadline:
+                raise TimeoutError(f"Timed out waiting for in-flight request {key} in another worker")
+            time.sleep(self.poll_interval)
+
+    def _release_lease(self, path):
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
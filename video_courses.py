@@ -1,9 +1,13 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, current_app
 from flask_login import login_required, current_user
-from models import db, VideoCourse, CourseVideo, CoursePurchase, Subscription
+from models import db, VideoCourse, CourseVideo, CoursePurchase
+import entitlements
+import metrics
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from types import SimpleNamespace
 import os
+import time
 import stripe
 
 video_courses_bp = Blueprint('video_courses', __name__)
@@ -11,6 +15,11 @@ video_courses_bp = Blueprint('video_courses', __name__)
 ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'webm', 'mov', 'avi', 'mkv'}
 ALLOWED_IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
 
+# How long a worker reuses the course catalog; edits made through this worker clear it at once
+CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', '300'))
+
+_catalog_cache = {'data': None, 'expires': 0}
+
 
 def allowed_video(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_VIDEO_EXTENSIONS
@@ -27,31 +36,75 @@ def get_course_dir():
     return course_dir
 
 
-def user_has_access(user, course):
-    """Check if a user can access a course"""
+def _course_counts():
+    """COUNT subqueries for a course's videos and purchases (no rows loaded)"""
+    video_count = db.select(db.func.count(CourseVideo.id))\
+                    .where(CourseVideo.course_id == VideoCourse.id).correlate(VideoCourse).scalar_subquery()
+    purchase_count = db.select(db.func.count(CoursePurchase.id))\
+                       .where(CoursePurchase.course_id == VideoCourse.id).correlate(VideoCourse).scalar_subquery()
+    return video_count, purchase_count
+
+
+def get_catalog():
+    """
+    Active courses in display order, as plain objects (id, title, description,
+    thumbnail_path, price, display_order, video_count), cached for CATALOG_CACHE_TTL
+    """
+    now = time.time()
+    if _catalog_cache['data'] is not None and now < _catalog_cache['expires']:
+        return _catalog_cache['data']
+
+    video_count, _ = _course_counts()
+    rows = db.session.query(VideoCourse.id, VideoCourse.title, VideoCourse.description, VideoCourse.thumbnail_path,
+                            VideoCourse.price, VideoCourse.display_order, video_count)\
+                     .filter(VideoCourse.is_active == True)\
+                     .order_by(VideoCourse.display_order, VideoCourse.id).all()
+    catalog = [SimpleNamespace(id=r[0], title=r[1], description=r[2], thumbnail_path=r[3],
+                               price=r[4], display_order=r[5], video_count=r[6]) for r in rows]
+    _catalog_cache['data'] = catalog
+    _catalog_cache['expires'] = now + CATALOG_CACHE_TTL
+    return catalog
+
+
+def invalidate_catalog():
+    _catalog_cache['data'] = None
+    _catalog_cache['expires'] = 0
+
+
+def resolve_course_access(user, courses, first_course_id=None):
+    """
+    Access for many courses at once: one purchase query, plus one query for the
+    free first course if the user has a plan and first_course_id isn't given.
+    Returns: {course_id: bool}
+    """
     # Admin/Super Admin bypass
     if user.role in ['admin', 'super_admin']:
-        return True
-
-    # Check if user purchased this course
-    purchase = CoursePurchase.query.filter_by(user_id=user.id, course_id=course.id).first()
-    if purchase:
-        return True
-
-    # Check if user has active subscription (gets 1 free course)
-    if user.active_subscription_id:
-        sub = Subscription.query.get(user.active_subscription_id)
-        if sub and sub.is_active and sub.end_date >= datetime.utcnow():
-            # First course by display_order is free
-            first_course = VideoCourse.query.filter_by(is_active=True).order_by(VideoCourse.display_order).first()
-            if first_course and first_course.id == course.id:
-                return True
+        return {course.id: True for course in courses}
+    if not courses:
+        return {}
+
+    # Courses the user purchased
+    purchased = {course_id for (course_id,) in
+                 db.session.query(CoursePurchase.course_id)
+                           .filter(CoursePurchase.user_id == user.id,
+                                   CoursePurchase.course_id.in_([course.id for course in courses]))}
+
+    # Active subscription gets the first course (by display_order) free
+    free_course_id = None
+    if entitlements.for_user(user).has_plan:
+        if first_course_id is None:
+            first_course_id = db.session.query(VideoCourse.id).filter_by(is_active=True)\
+                                        .order_by(VideoCourse.display_order, VideoCourse.id).limit(1).scalar()
+        free_course_id = first_course_id
 
     # Free courses (price = 0)
-    if course.price == 0:
-        return True
+    return {course.id: course.id in purchased or course.id == free_course_id or course.price == 0
+            for course in courses}
 
-    return False
+
+def user_has_access(user, course):
+    """Check if a user can access a course"""
+    return resolve_course_access(user, [course])[course.id]
 
 
 # ============================================
@@ -62,12 +115,11 @@ def user_has_access(user, course):
 @login_required
 def browse_courses():
     """Browse all active courses"""
-    courses = VideoCourse.query.filter_by(is_active=True).order_by(VideoCourse.display_order).all()
+    courses = get_catalog()
 
     # Build access map
-    access_map = {}
-    for course in courses:
-        access_map[course.id] = user_has_access(current_user, course)
+    access_map = resolve_course_access(current_user, courses,
+                                       first_course_id=courses[0].id if courses else None)
 
     return render_template('video_courses/courses.html',
                            courses=courses,
@@ -194,7 +246,8 @@ def admin_list_courses():
     if current_user.role != 'super_admin':
         return jsonify({'error': 'Unauthorized'}), 403
 
-    courses = VideoCourse.query.order_by(VideoCourse.display_order).all()
+    video_count, purchase_count = _course_counts()
+    courses = db.session.query(VideoCourse, video_count, purchase_count).order_by(VideoCourse.display_order).all()
     return jsonify({
         'courses': [{
             'id': c.id,
@@ -204,10 +257,10 @@ def admin_list_courses():
             'price': c.price,
             'is_active': c.is_active,
             'display_order': c.display_order,
-            'video_count': len(c.videos),
-            'purchase_count': len(c.purchases),
+            'video_count': videos,
+            'purchase_count': purchases,
             'created_at': c.created_at.strftime('%Y-%m-%d')
-        } for c in courses]
+        } for c, videos, purchases in courses]
     })
 
 
@@ -248,6 +301,7 @@ def admin_create_course():
     )
     db.session.add(course)
     db.session.commit()
+    invalidate_catalog()
 
     return jsonify({'success': True, 'message': f'Course "{title}" created!', 'id': course.id})
 
@@ -278,6 +332,7 @@ def admin_edit_course(course_id):
             course.thumbnail_path = f"uploads/courses/thumbnails/{filename}"
 
     db.session.commit()
+    invalidate_catalog()
     return jsonify({'success': True, 'message': f'Course updated!'})
 
 
@@ -310,6 +365,7 @@ def admin_delete_course(course_id):
 
     db.session.delete(course)
     db.session.commit()
+    invalidate_catalog()
     return jsonify({'success': True, 'message': 'Course deleted!'})
 
 
@@ -344,6 +400,7 @@ def admin_add_video(course_id):
     filename = secure_filename(f"vid_{int(datetime.utcnow().timestamp())}_{file.filename}")
     full_path = os.path.join(video_dir, filename)
     file.save(full_path)
+    metrics.record_upload('course_video', full_path)
 
     # Get file size
     file_size_mb = round(os.path.getsize(full_path) / (1024 * 1024), 2)
@@ -365,6 +422,7 @@ def admin_add_video(course_id):
     )
     db.session.add(video)
     db.session.commit()
+    invalidate_catalog()
 
     return jsonify({'success': True, 'message': f'Video "{title}" uploaded! ({file_size_mb}MB)', 'id': video.id})
 
@@ -409,4 +467,5 @@ def admin_delete_video(video_id):
 
     db.session.delete(video)
     db.session.commit()
+    invalidate_catalog()
     return jsonify({'success': True, 'message': 'Video deleted!'})